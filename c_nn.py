@@ -1,9 +1,16 @@
+import io
 import json
 import os
 import math
 import numpy as np
 from pprint import pprint
-# from c_nn_layer import *
+from c_nn_fixed import *
+from c_nn_simulation import simulator
+from c_nn_estimate import estimator, DEVICES
+from c_nn_data import *
+from c_nn_topology import *
+from c_nn_layer import *
+from c_nn_lut import *
 # from c_nn_normalization import *
 
 FNAME_CPP_HEADER       = 'nn.h'
@@ -19,24 +26,45 @@ DEFAULT_WIDTH_LUT_INPUT        = 12
 DEFAULT_WIDTH_LUT_INPUT_WHOLE  = 3
 DEFAULT_WIDTH_LUT_OUTPUT       = 32
 DEFAULT_WIDTH_LUT_OUTPUT_WHOLE = 8
-DEFAULT_RESOURCE_COUNT = 1
 
 DEFAULT_INTERFACE = "s_axilite"
 DEFAULT_DTYPE     = "float"
+DEFAULT_ABFT      = "none"
+DEFAULT_FUSION    = False
+DEFAULT_FOLDING   = False
+DEFAULT_DATAFLOW_BATCH = None
+DEFAULT_SPARSE    = False
+DEFAULT_SHIFT_TERMS = None
+DEFAULT_INTEGER_BITS = None
+DEFAULT_INTEGER_INPUT_WHOLE = 2
 
-RESOURCE_EXECUTION_MULTIPLICATION        = 1.0
-RESOURCE_EXECUTION_ADDITION              = 1.0
-RESOURCE_EXECUTION_ACTIVATION_TANSIG     = 58.0
-RESOURCE_EXECUTION_ACTIVATION_TANSIG_LUT = 1.0
-RESOURCE_EXECUTION_ACTIVATION_LINEAR     = 1.0
+SHIFT_TERMS = (1, 2)
+INTEGER_BITS = (4, 8)
+
+ABFT_MODES = ("none", "column", "row")
+ABFT_EPSILON_FLOAT  = 2.0 ** -23
+ABFT_EPSILON_DOUBLE = 2.0 ** -52
+
+# code generators of the layer resources, by layer type
+_resource_generators = {}
+
+def _resource_generator(type):
+	def register(function):
+		_resource_generators[type] = function
+		return function
+	return register
 
 
 class nn:
-	def __init__(self, fname):
-		self.json = json.load(open(fname))
+	def __init__(self, fname, sizes=None):
+		# JSON file or directory topology, the latter maps coefficients lazily,
+		# or weight exports assembled into fully connected layers of the given sizes
+		self.json = load_topology(fname, sizes)
 		self.json_test  = None
 		self.test_count = 0
-		self.layers = {}
+		self.test_stream = None
+		self.test_chunk  = DEFAULT_TEST_CHUNK
+		self.layers = []
 		self.current_layer = 0
 		self.width_network          = DEFAULT_WIDTH_NETWORK
 		self.width_network_whole    = DEFAULT_WIDTH_NETWORK_WHOLE
@@ -51,6 +79,23 @@ class nn:
 		self.dtype                  = DEFAULT_DTYPE
 		self.dtype_LUT_in           = 'ap_fixed<' + str(DEFAULT_WIDTH_LUT_INPUT) + ',' + str(DEFAULT_WIDTH_LUT_INPUT_WHOLE) + '>'
 		self.dtype_LUT_out          = 'ap_fixed<' + str(DEFAULT_WIDTH_LUT_OUTPUT) + ',' + str(DEFAULT_WIDTH_LUT_OUTPUT_WHOLE) + '>'
+		self.abft                   = DEFAULT_ABFT
+		self.abft_tolerance         = None
+		self.fusion                 = DEFAULT_FUSION
+		self.folding                = DEFAULT_FOLDING
+		self.dataflow_batch         = DEFAULT_DATAFLOW_BATCH
+		self.sparse                 = DEFAULT_SPARSE
+		self.shift_terms            = DEFAULT_SHIFT_TERMS
+		self.integer_bits           = DEFAULT_INTEGER_BITS
+		self.integer_inputs_whole   = {}
+		self.max_execution          = None
+		self.argmax_rotations       = None
+		self.argmax_score           = False
+		self.argmax_rotation        = None
+		self.coef_format            = DEFAULT_COEF_FORMAT
+		self.data_format            = DEFAULT_DATA_FORMAT
+		self.workers                = None
+		self.manifest               = None
 
 	def set_interface(self, interface):
 		if (interface != "s_axilite") and (interface != "s_axis"):
@@ -66,21 +111,254 @@ class nn:
 			self.dtype = 'ap_fixed<' + str(self.width_network) + ',' + str(self.width_network_whole) + '>'
 		else:
 			raise ValueError('Data type is not supported')
+		# the fold interval of floating point engines depends on the data type
+		if self.folding and self.max_execution is not None:
+			self.update_configuration_max_execution(self.max_execution)
 
-	def set_dtype_fixed(self,width,width_whole):
+	def set_dtype_fixed(self,width,width_whole,quantization=DEFAULT_QUANTIZATION,overflow=DEFAULT_OVERFLOW):
 		self.width_network       = width
 		self.width_network_whole = width_whole 
-		self.dtype               = 'ap_fixed<' + str(width) + ',' + str(width_whole) + '>'
+		self.dtype               = fixed_format(width, width_whole, True, quantization, overflow).type_string()
+		if self.folding and self.max_execution is not None:
+			self.update_configuration_max_execution(self.max_execution)
 
-	def set_dtype_fixed_LUT_input(self,width,width_whole):
+	def set_dtype_fixed_LUT_input(self,width,width_whole,quantization=DEFAULT_QUANTIZATION,overflow=DEFAULT_OVERFLOW):
 		self.width_lut_input       = width
 		self.width_lut_input_whole = width_whole
-		self.dtype_LUT_in          = 'ap_fixed<' + str(width) + ',' + str(width_whole) + '>'
+		self.dtype_LUT_in          = fixed_format(width, width_whole, True, quantization, overflow).type_string()
 
-	def set_dtype_fixed_LUT_output(self,width,width_whole):
+	def set_dtype_fixed_LUT_output(self,width,width_whole,quantization=DEFAULT_QUANTIZATION,overflow=DEFAULT_OVERFLOW):
 		self.width_lut_output       = width
 		self.width_lut_output_whole = width_whole
-		self.dtype_LUT_out          = 'ap_fixed<' + str(width) + ',' + str(width_whole) + '>'
+		self.dtype_LUT_out          = fixed_format(width, width_whole, True, quantization, overflow).type_string()
+
+	def set_layer_dtype_fixed(self, idx, width, width_whole, quantization=DEFAULT_QUANTIZATION, overflow=DEFAULT_OVERFLOW):
+		# outputs and coefficients of layer idx in their own fixed point type, the inputs are converted
+		# to it on entry; a width of None returns the layer to nn_t
+		if width is None:
+			self.layers[idx].dtype = None
+		else:
+			self.layers[idx].dtype = fixed_format(width, width_whole, True, quantization, overflow).type_string()
+
+	def get_layer_dtype(self, idx):
+		# data type layer idx computes in, nn_t for the network inputs before layer 0
+		if idx < 0 or self.layers[idx].dtype is None:
+			return self.dtype
+		return self.layers[idx].dtype
+
+	def has_layer_dtypes(self):
+		return any(self.layers[idx].dtype is not None for idx in range(0, self.current_layer))
+
+	def check_layer_dtypes(self):
+		if not self.has_layer_dtypes():
+			return
+		if not self.dtype.startswith("ap_fixed<"):
+			raise ValueError('Per-layer data types require a fixed point network data type')
+		if self.abft != "none" or self.dataflow_batch is not None or self.data_format == "binary":
+			raise ValueError('Per-layer data types are not supported with ABFT, dataflow generation or binary data')
+
+	def set_abft(self, mode, tolerance=None):
+		# column: checksum row of each multiplication/addition pair, checked against the sum of its outputs
+		# row:    checksum row of each multiplication, checked against every column of the partial products
+		# tolerance replaces the derived bound, absolute for fixed point and relative to the magnitude of the
+		# compared terms for float/double
+		if mode not in ABFT_MODES:
+			raise ValueError('ABFT mode is not supported')
+		self.abft           = mode
+		self.abft_tolerance = tolerance
+		if self.current_layer > 0:
+			self.__parse_configuration_set_execution_time()
+
+	def set_fusion(self, fusion):
+		# multiplication/addition pairs become one multiply-accumulate resource without the 2D partial products
+		self.fusion = fusion
+
+	def set_folding(self, folding):
+		# multiplication/addition pairs become matrix-vector engines folded by SIMD inputs and PE outputs,
+		# the factors are solved by update_configuration_max_execution
+		self.folding = folding
+		if self.max_execution is not None:
+			self.update_configuration_max_execution(self.max_execution)
+
+	def set_dataflow(self, batch):
+		# layers run as concurrent processes connected by streams, nn_top takes batch samples per call;
+		# None generates the monolithic pipelined nn_top
+		if batch is not None and batch < 1:
+			raise ValueError('Batch size must be positive')
+		self.dataflow_batch = batch
+
+	def get_dataflow_interval(self):
+		# steady state cycles per sample, bounded by the slowest process; folded engines run
+		# at their fold count, every other process at the initiation interval of its sample loop
+		intervals = []
+		for idx in range(0, self.current_layer):
+			if self.is_folded(idx):
+				intervals.append(self.layers[idx].execution)
+			elif not (idx > 0 and self.is_folded(idx-1)):
+				intervals.append(max(self.max_execution, self.layers[idx].execution))
+		return max(intervals)
+
+	def prune(self, threshold):
+		# multiplication coefficients of magnitude up to threshold become exact zeros, returns how many did
+		pruned = 0
+		for idx in range(0, self.current_layer):
+			layer = self.layers[idx]
+			if layer.type == "multiplication":
+				mask   = np.abs(layer.coef) <= threshold
+				pruned = pruned + int(np.count_nonzero(mask & (layer.coef != 0)))
+				layer.coef = np.where(mask, 0.0, layer.coef)
+		self.__update_configuration_sparse()
+		return pruned
+
+	def set_sparse(self, sparse):
+		# multiplications store only their nonzero coefficients as compressed rows and multiply only those;
+		# folded engines keep their dense coefficient banks
+		self.sparse = sparse
+		self.__update_configuration_sparse()
+
+	def is_sparse(self, idx):
+		return self.sparse and self.layers[idx].type == "multiplication" and not self.is_folded(idx)
+
+	def set_shift_add(self, terms):
+		# multiplication coefficients rounded to sums of terms signed powers of two, multiplied by shifts and adds;
+		# None keeps the multipliers
+		if terms is not None and terms not in SHIFT_TERMS:
+			raise ValueError('Shift-add term count is not supported')
+		self.shift_terms = terms
+
+	def is_shift_add(self, idx):
+		return self.shift_terms is not None and self.layers[idx].type == "multiplication"
+
+	def get_shift_add_terms(self, idx):
+		# (signs, exponents) of every coefficient of layer idx, powers of two representable in its data type
+		format = parse_fixed_format(self.get_layer_dtype(idx))
+		return power_of_two_terms(self.layers[idx].coef, self.shift_terms, -format.width_frac, format.width_whole - 2)
+
+	def check_shift_add(self):
+		if self.shift_terms is None:
+			return
+		if not self.dtype.startswith("ap_fixed<"):
+			raise ValueError('Shift-add coefficients require a fixed point network data type')
+		if self.abft != "none" or self.sparse:
+			raise ValueError('Shift-add coefficients are not supported with ABFT or sparse generation')
+
+	def set_integer(self, bits, inputs_whole=None):
+		# multiplication/addition pairs on bits wide integers: weights with one scale per output, inputs quantized
+		# to inputs_whole[idx] integer bits of the multiplication idx (DEFAULT_INTEGER_INPUT_WHOLE when missing),
+		# accumulated in INTEGER_ACCUMULATOR_WIDTH bits and requantized to nn_t; None keeps nn_t arithmetic
+		if bits is not None and bits not in INTEGER_BITS:
+			raise ValueError('Integer width is not supported')
+		self.integer_bits         = bits
+		self.integer_inputs_whole = dict(inputs_whole) if inputs_whole is not None else {}
+
+	def is_integer(self, idx):
+		return self.integer_bits is not None and self.is_fused(idx)
+
+	def get_integer_input_format(self, idx):
+		# rounding and saturating conversion of nn_t to the integer inputs of multiplication idx
+		whole = self.integer_inputs_whole.get(idx, DEFAULT_INTEGER_INPUT_WHOLE)
+		return fixed_format(self.integer_bits, whole, True, "AP_RND", "AP_SAT")
+
+	def get_integer_quantization(self, idx):
+		# (weights, bias, multipliers, shift) of the pair at idx, real outputs = accumulator * multiplier / 2**shift
+		format = self.get_integer_input_format(idx)
+		return integer_quantization(self.layers[idx].coef, self.layers[idx+1].coef, self.integer_bits,
+			format.width_frac, INTEGER_ACCUMULATOR_WIDTH, INTEGER_MULTIPLIER_WIDTH)
+
+	def check_integer(self):
+		if self.integer_bits is None:
+			return
+		if not self.dtype.startswith("ap_fixed<"):
+			raise ValueError('Integer arithmetic requires a fixed point network data type')
+		if self.abft != "none" or self.sparse or self.shift_terms is not None or self.folding or self.has_layer_dtypes():
+			raise ValueError('Integer arithmetic is not supported with ABFT, sparse, shift-add, folded or per-layer type generation')
+
+	def is_fused(self, idx):
+		# multiplication at idx is accumulated directly by the addition behind it, folded and integer pairs always are,
+		# row ABFT checks the partial products and keeps them materialized
+		if not (self.fusion or self.folding or self.integer_bits is not None) or self.abft == "row" or idx+1 >= self.current_layer:
+			return False
+		return self.layers[idx].type == "multiplication" and self.layers[idx+1].type == "addition"
+
+	def is_folded(self, idx):
+		# multiplication at idx and its addition run as one folded matrix-vector engine
+		return self.folding and self.is_fused(idx)
+
+	def get_folded_interval(self, idx, simd):
+		# cycles per fold of the engine at idx, floating point folds chain their SIMD additions
+		# into the accumulator carried on to the next fold
+		latency = RESOURCE_LATENCY_ADDITION.get(self.get_layer_dtype(idx+1))
+		if latency is None:
+			return 1
+		return simd * latency
+
+	def set_output_argmax(self, rotations=1, score=False, expected_rotation=None):
+		# outputs laid out as class*rotations+rotation are reduced on chip to the class and rotation index,
+		# optionally with the winning score and a flag telling whether the rotation is the expected one
+		if rotations is not None and rotations < 1:
+			raise ValueError('Rotation count must be positive')
+		if expected_rotation is not None and (rotations is None or expected_rotation < 0 or expected_rotation >= rotations):
+			raise ValueError('Expected rotation must be below the rotation count')
+		self.argmax_rotations = rotations
+		self.argmax_score     = score
+		self.argmax_rotation  = expected_rotation
+
+	def get_abft_tolerance(self, idx):
+		# tolerance of the comparison guarding the multiplication at idx
+		return self.__abft_tolerance(idx)
+
+	def is_abft_checked(self, idx):
+		# multiplication at idx is directly followed by its addition and guarded by a checksum
+		if self.abft == "none" or idx+1 >= self.current_layer:
+			return False
+		return self.layers[idx].type == "multiplication" and self.layers[idx+1].type == "addition"
+
+	def get_abft_guard_bits(self):
+		# integer bits abft_t adds to nn_t so that neither side of a comparison wraps or saturates while the
+		# products and running sums of the pair fit nn_t, a pair that overflowed nn_t itself is flagged;
+		# row checks add the outer products of one column, column checks every product and bias of the pair
+		guard = 0
+		for idx in range(0, self.current_layer):
+			if self.is_abft_checked(idx):
+				outer, inner = self.layers[idx].outputs_shape
+				terms = outer * (inner + 1) if self.abft == "column" else outer + 1
+				guard = max(guard, math.ceil(math.log(terms, 2)))
+		return guard
+
+	def get_abft_dtype(self):
+		# type of the checksums and the sums compared against them, nn_t widened by the guard bits;
+		# the fractional bits are those of nn_t, so the products round exactly as the layer's do
+		if self.dtype in ("float", "double"):
+			return self.dtype
+		format = parse_fixed_format(self.dtype)
+		guard  = self.get_abft_guard_bits()
+		return format.type_string(format.width + guard, format.width_whole + guard)
+
+	def set_coef_format(self, coef_format, workers=None):
+		# text format of the data/*.dat literals and the number of formatting processes
+		if coef_format not in COEF_FORMATS:
+			raise ValueError('Coefficient format is not supported')
+		self.coef_format = coef_format
+		self.workers     = workers
+
+	def set_data_format(self, data_format):
+		# binary keeps the text literals for synthesis and loads blobs at csim run time
+		if data_format not in DATA_FORMATS:
+			raise ValueError('Data format is not supported')
+		self.data_format = data_format
+
+	def set_test_stream(self, fname, chunk=DEFAULT_TEST_CHUNK):
+		# the testbench reads the vector blob fname in chunks of chunk vectors at run time and keeps running
+		# error statistics instead of embedding the test file; None embeds it again
+		if chunk < 1:
+			raise ValueError('Test chunk must be positive')
+		self.test_stream = fname
+		self.test_chunk  = chunk
+
+	def write_test_stream(self, fname, inputs, outputs, targets, chunk=DEFAULT_TEST_CHUNK):
+		# vector blob in nn_t, written incrementally from arrays of any length, and a testbench streaming it
+		self.test_count = write_test_vectors(fname, inputs, outputs, targets, self.dtype, chunk)
+		self.set_test_stream(fname, chunk)
 
 	def set_path_output(self, path):
 		self.path_output = path
@@ -106,78 +384,208 @@ class nn:
 		print("| NUMBER |                     LAYER TYPE | INPUTS | OUTPUTS | RESOURCES | EXECUTION |")
 		execution_total = 0
 		for idx in range(0, self.current_layer):
-			layer = self.layers[str(idx)]
+			layer = self.layers[idx]
 			print("| %6.1d | %30s | %6s | %7s | %9d | %9d |" 
 				%(idx, 
-				layer['type'],
-				layer['inputs'],
-				layer['outputs'],
-				layer['resources'],
-				layer['execution']))
-			execution_total = execution_total + layer['execution']
+				layer.type,
+				layer.inputs,
+				layer.outputs,
+				layer.resources,
+				layer.execution))
+			execution_total = execution_total + layer.execution
 
 		print("Total execution cycles (delay): " + str(execution_total))
+		for idx in range(0, self.current_layer):
+			if self.is_sparse(idx):
+				print("Nonzero coefficients (layer " + str(idx) + "): " + str(self.layers[idx].nonzeros) + " of " + str(self.layers[idx].outputs_count))
+		if self.shift_terms is not None:
+			print("Shift-add coefficients: " + str(self.shift_terms) + " power of two terms per multiplication")
+		if self.integer_bits is not None:
+			print("Integer arithmetic: " + str(self.integer_bits) + " bit weights and inputs, " + str(INTEGER_ACCUMULATOR_WIDTH) + " bit accumulators")
+		if self.dataflow_batch is not None and self.max_execution is not None:
+			print("Steady state interval (dataflow): " + str(self.get_dataflow_interval()) + " cycles per sample, " + str(self.dataflow_batch) + " samples per call")
 
 	def update_configuration_max_execution(self, max_execution):
 		self.max_execution = max_execution
-		for idx in self.layers:
+		self.__update_nonzeros()
+		for idx in range(0, self.current_layer):
 			execution_target = max_execution
 			layer = self.layers[idx]
 
+			# additions of a folded pair accumulate in the engine of the multiplication before them
+			if idx > 0 and self.is_folded(idx-1):
+				layer.resources = self.layers[idx-1].resources
+				layer.execution = self.__get_execution_time(idx, layer, layer.resources)
+				continue
+
 			# check physically maximum execution
-			if self.__get_min_execution_time(layer) > execution_target:
-				execution_target = self.__get_min_execution_time(layer)
-				print("NOTE: requested execution time exceeds maximum possible(" + layer['type'] + ")")
+			if layer.get_min_execution_time() + self.__get_min_execution_time_abft(idx) > execution_target:
+				execution_target = layer.get_min_execution_time() + self.__get_min_execution_time_abft(idx)
+				print("NOTE: requested execution time exceeds maximum possible(" + layer.type + ")")
 
 
-			while layer['execution'] > execution_target:
-				layer['resources'] = layer['resources'] + 1
-				self.__parse_configuration_set_execution_time()
+			# layers are independent, only this one is re-evaluated
+			if self.is_folded(idx):
+				layer.simd, layer.pe = self.__solve_folding(idx, layer, execution_target)
+				layer.resources      = layer.simd * layer.pe
+			else:
+				layer.resources = self.__solve_resources(idx, layer, execution_target)
+			layer.execution = self.__get_execution_time(idx, layer, layer.resources)
 		
 		# self.show_configuration()
 
+	def __update_configuration_sparse(self):
+		# the work of sparse layers changed, resources are solved again once an initiation interval is set
+		if self.max_execution is not None:
+			self.update_configuration_max_execution(self.max_execution)
+		elif self.current_layer > 0:
+			self.__parse_configuration_set_execution_time()
+
+	def __update_nonzeros(self):
+		for idx in range(0, self.current_layer):
+			layer = self.layers[idx]
+			layer.nonzeros = int(np.count_nonzero(layer.coef)) if self.is_sparse(idx) else None
+
+	def __solve_resources(self, idx, layer, execution_target):
+		# execution >= work/resources, so no smaller count can meet the target; the delay is not
+		# strictly monotone (adder tree carries), hence the exact scan for the first count that does
+		resources = max(DEFAULT_RESOURCE_COUNT, int(layer.get_execution_work() // execution_target))
+		while self.__get_execution_time(idx, layer, resources) > execution_target:
+			resources = resources + 1
+		return resources
+
+	def __solve_folding(self, idx, layer, execution_target):
+		# fewest multipliers first, then fewest PEs; the factors divide the layer so every bank holds whole folds
+		outer, inner = layer.outputs_shape
+		candidates = sorted((simd * pe, pe, simd) for simd in folding_factors(inner) for pe in folding_factors(outer))
+		executions = []
+		for resources, pe, simd in candidates:
+			execution = layer.get_folded_execution_time(simd, pe, self.get_folded_interval(idx, simd)) + self.__parse_configuration_get_execution_time_abft(idx, layer, resources)
+			if execution <= execution_target:
+				return simd, pe
+			executions.append(execution)
+		# target out of reach, fastest engine with the fewest multipliers (wider SIMD does not speed up floating point folds)
+		resources, pe, simd = candidates[executions.index(min(executions))]
+		return simd, pe
+
+	def estimate_resources(self):
+		# estimated DSP/LUT/FF/BRAM per layer of the current configuration
+		return estimator(self).estimate()
+
+	def show_resources(self, device=None):
+		estimator(self).show(device)
+
+	def show_lut_tanh(self, limit=None):
+		# table footprint and approximation error of the configured LUT widths
+		show_lut_tanh_report([self.dtype_LUT_in], [self.dtype_LUT_out], limit)
+
+	def check_device(self, device):
+		# resource budgets of the device exceeded by the current configuration
+		return estimator(self).check(device)
+
+	def simulate(self, inputs, batch=None):
+		# bit accurate reference of the generated nn_top, batched over the first axis of inputs
+		if batch is None:
+			return simulator(self).run(inputs)
+		return simulator(self, batch).run(inputs)
+
+	def simulate_argmax(self, inputs, batch=None):
+		# (class, rotation, score, rotation consistent) as returned by the argmax output stage
+		if batch is None:
+			return simulator(self).run_argmax(inputs, self.argmax_rotations or 1, self.argmax_rotation)
+		return simulator(self, batch).run_argmax(inputs, self.argmax_rotations or 1, self.argmax_rotation)
+
 	def generate_testbench(self):
-		# generate input data file
-		self.__gen_data_file_array_2D(self.path_testbench + "/testbench_inputs.dat", self.json_test["inputs"])
+		if not os.path.exists(self.path_testbench):
+			os.makedirs(self.path_testbench)
+		self.manifest = output_manifest(self.path_testbench)
+		files = []
+
+		if self.test_stream is not None:
+			self.__check_test_stream()
+		else:
+			# generate input data file
+			self.__gen_data_file_array_2D(files, self.path_testbench + "/testbench_inputs.dat", self.json_test["inputs"])
 
-		# generate output data file
-		self.__gen_data_file_array_2D(self.path_testbench + "/testbench_outputs.dat", self.json_test["outputs"])
+			# generate output data file
+			self.__gen_data_file_array_2D(files, self.path_testbench + "/testbench_outputs.dat", self.json_test["outputs"])
 
-		# generate target data file
-		self.__gen_data_file_array_2D(self.path_testbench + "/testbench_targets.dat", self.json_test["targets"])
+			# generate target data file
+			self.__gen_data_file_array_2D(files, self.path_testbench + "/testbench_targets.dat", self.json_test["targets"])
+
+			# the testbench is never synthesized, binary blobs replace the text files entirely
+			if self.data_format == "binary":
+				write_blob_files([(self.__gen_blob_path(fpath), kind, values) for fpath, kind, values in files], self.dtype, self.manifest)
+			else:
+				write_data_files(files, self.coef_format, self.dtype, self.workers, self.manifest)
 
 		# generate testbench file
 		fname = self.path_testbench + "/" + FNAME_CPP_TESTBENCH
 		print(fname)
-		fd = open(fname, "w")
+		fd = io.StringIO()
 
 		# includes
 		fd.write("#include <iostream>\n")
 		fd.write("#include <ap_fixed.h>\n")
+		if self.test_stream is not None:
+			fd.write("#include <math.h>\n")
+			fd.write("#include <stdint.h>\n")
+			fd.write("#include <stdio.h>\n")
+			fd.write("#include <string.h>\n")
 		fd.write("#include \"nn.h\"\n\n")
 
 		# defines
-		fd.write("#define TEST_COUNT " + str(self.test_count) + "\n\n")
+		if self.test_stream is not None:
+			self.__gen_testbench_stream(fd)
+		elif self.data_format == "binary":
+			fd.write("#define TEST_COUNT " + str(self.test_count) + "\n\n")
+			fd.write("#define TESTBENCH_DATA_PATH \"" + os.path.abspath(self.path_testbench) + "\"\n\n")
+
+			# globally declared test data, loaded at run time
+			fd.write("nn_t test_inputs[TEST_COUNT][NN_INPUT_COUNT];\n")
+			fd.write("nn_t test_outputs[TEST_COUNT][NN_OUTPUT_COUNT];\n")
+			fd.write("nn_t test_targets[TEST_COUNT][NN_OUTPUT_COUNT];\n\n")
+		else:
+			fd.write("#define TEST_COUNT " + str(self.test_count) + "\n\n")
+
+			# globally declared input test data
+			fd.write("nn_t test_inputs[TEST_COUNT][NN_INPUT_COUNT] = {\n")
+			fd.write("\t#include \"testbench_inputs.dat\"\n")
+			fd.write("};\n\n")
+
+			# globally declared output test data
+			fd.write("nn_t test_outputs[TEST_COUNT][NN_OUTPUT_COUNT] = {\n")
+			fd.write("\t#include \"testbench_outputs.dat\"\n")
+			fd.write("};\n\n")
+
+			# globally declared target test data
+			fd.write("nn_t test_targets[TEST_COUNT][NN_OUTPUT_COUNT] = {\n")
+			fd.write("\t#include \"testbench_targets.dat\"\n")
+			fd.write("};\n\n")
+
+		if self.argmax_rotations is not None:
+			self.__gen_testbench_main_argmax(fd)
+		elif self.test_stream is not None:
+			self.__gen_testbench_main_stream(fd)
+		else:
+			self.__gen_testbench_main(fd)
 
+		self.manifest.write(fname, fd.getvalue())
+		self.manifest.save()
+		self.manifest.show_summary()
+		self.manifest = None
 
-		# globally declared input test data
-		fd.write("nn_t test_inputs[TEST_COUNT][NN_INPUT_COUNT] = {\n")
-		fd.write("\t#include \"testbench_inputs.dat\"\n")
-		fd.write("};\n\n")
-
-		# globally declared output test data
-		fd.write("nn_t test_outputs[TEST_COUNT][NN_OUTPUT_COUNT] = {\n")
-		fd.write("\t#include \"testbench_outputs.dat\"\n")
-		fd.write("};\n\n")
-
-		# globally declared target test data
-		fd.write("nn_t test_targets[TEST_COUNT][NN_OUTPUT_COUNT] = {\n")
-		fd.write("\t#include \"testbench_targets.dat\"\n")
-		fd.write("};\n\n")
 
+	def __gen_testbench_main(self, fd):
 		fd.write("int main(void)\n")
 		fd.write("{\n")
 		fd.write("\tnn_t outputs[NN_OUTPUT_COUNT];\n")
+		if self.dataflow_batch is not None:
+			fd.write("\tstatic nn_t batch_inputs[NN_BATCH][NN_INPUT_COUNT];\n")
+			fd.write("\tstatic nn_t batch_outputs[NN_BATCH][NN_OUTPUT_COUNT];\n")
+		if self.abft != "none":
+			fd.write("\tbool abft_error;\n")
+			fd.write("\tint abft_error_count = 0;\n")
 		fd.write("\tdouble err_outputs[TEST_COUNT][NN_OUTPUT_COUNT];\n")
 		fd.write("\tdouble err_outputs_relative[TEST_COUNT][NN_OUTPUT_COUNT];\n")
 		fd.write("\tdouble err_targets[TEST_COUNT][NN_OUTPUT_COUNT];\n")
@@ -201,9 +609,27 @@ class nn:
 		fd.write("\tdouble err_outputs_relative_percentage_max = 0.0;\n")
 		fd.write("\tdouble err_targets_relative_percentage_max = 0.0;\n")
 		fd.write("\n")
+		self.__gen_testbench_load(fd)
 		fd.write("\tstd::cout << \"Performing tests\" << std::endl;\n")
 		fd.write("\tfor(int test=0; test<TEST_COUNT; test++){\n")
-		fd.write("\t\tnn_top(outputs,test_inputs[test]);\n")
+		if self.dataflow_batch is not None:
+			# one call per batch, the last one padded with the first tests
+			fd.write("\t\tif(test % NN_BATCH == 0){\n")
+			fd.write("\t\t\tfor(int sample=0; sample<NN_BATCH; sample++){\n")
+			fd.write("\t\t\t\tfor(int input=0; input<NN_INPUT_COUNT; input++){\n")
+			fd.write("\t\t\t\t\tbatch_inputs[sample][input] = test_inputs[(test+sample)%TEST_COUNT][input];\n")
+			fd.write("\t\t\t\t}\n")
+			fd.write("\t\t\t}\n")
+			fd.write("\t\t\tnn_top(batch_outputs,batch_inputs);\n")
+			fd.write("\t\t}\n")
+			fd.write("\t\tfor(int output=0; output<NN_OUTPUT_COUNT; output++){\n")
+			fd.write("\t\t\toutputs[output] = batch_outputs[test%NN_BATCH][output];\n")
+			fd.write("\t\t}\n")
+		elif self.abft != "none":
+			fd.write("\t\tnn_top(outputs,test_inputs[test],&abft_error);\n")
+			fd.write("\t\tabft_error_count += abft_error;\n")
+		else:
+			fd.write("\t\tnn_top(outputs,test_inputs[test]);\n")
 		fd.write("\t\tfor(int output=0; output<NN_OUTPUT_COUNT; output++){\n")
 		fd.write("\t\t\tif(test_outputs[test][output] != 0){\n")
 		fd.write("\t\t\t\terr_outputs[test][output] = (double)(test_outputs[test][output] - outputs[output]);\n")
@@ -279,14 +705,287 @@ class nn:
 		fd.write("\tstd::cout << \"Absolute Error Max: \" << err_targets_absolute_max<< \" \" << 100.0*err_targets_relative_percentage_max << \"%\" << std::endl;\n")
 		fd.write("\tstd::cout << \"Error Mean: \" << err_targets_mean << std::endl;\n")
 		fd.write("\tstd::cout << \"Error Mean Standard Deviation: \" << err_targets_std_deviation << std::endl;\n")
+		if self.abft != "none":
+			fd.write("\tstd::cout << \"ABFT errors flagged: \" << abft_error_count << \"/\" << TEST_COUNT << std::endl;\n")
+		fd.write("\n")
+		fd.write("\treturn 0;\n")
+		fd.write("}\n")
+
+	def __check_test_stream(self):
+		# the vector blob must hold nn_t rows of inputs, expected outputs and targets
+		info   = load_blob(self.test_stream)[1]
+		record = self.layers[0].inputs_count + 2 * self.layers[self.current_layer-1].outputs_count
+		if self.dtype == "float" or self.dtype == "double":
+			matches = info['kind'] == self.dtype
+		else:
+			matches = info['kind'] == "fixed" and info['format'].type_string() == parse_fixed_format(self.dtype).type_string()
+		if not matches or len(info['shape']) != 2 or info['shape'][1] != record:
+			raise ValueError('Test vectors do not match the network data type or its input and output counts')
+		self.test_count = info['shape'][0]
+
+	def __gen_testbench_stream(self, fd):
+		# one chunk of test data at a time, read from the vector blob; dataflow batches never cross a chunk
+		chunk = self.test_chunk
+		if self.dataflow_batch is not None:
+			chunk = int(math.ceil(chunk / self.dataflow_batch)) * self.dataflow_batch
+		if self.dtype == "float" or self.dtype == "double":
+			kind = self.dtype
+		else:
+			kind = "fixed"
+		fd.write("#define TEST_CHUNK        " + str(chunk) + "\n")
+		fd.write("#define TEST_RECORD       (NN_INPUT_COUNT + 2*NN_OUTPUT_COUNT)\n")
+		fd.write("#define TEST_HEADER_SIZE  " + str(BLOB_HEADER.itemsize) + "\n")
+		fd.write("#define TEST_KIND         " + str(BLOB_KINDS.index(kind)) + "\n")
+		fd.write("#define TEST_ELEMENT      " + str(np.dtype(BLOB_ELEMENT[kind]).itemsize) + "\n")
+		fd.write("#define TEST_VECTORS_PATH \"" + os.path.abspath(self.test_stream) + "\"\n\n")
+
+		fd.write("nn_t test_inputs[TEST_CHUNK][NN_INPUT_COUNT];\n")
+		fd.write("nn_t test_outputs[TEST_CHUNK][NN_OUTPUT_COUNT];\n")
+		fd.write("nn_t test_targets[TEST_CHUNK][NN_OUTPUT_COUNT];\n")
+		fd.write("unsigned char test_buffer[TEST_CHUNK*TEST_RECORD*TEST_ELEMENT];\n\n")
+
+		# header: magic, version, kind, dims, shape[dims], little-endian; rows of TEST_RECORD elements follow
+		fd.write("FILE *nn_test_open(const char *fname, long *count)\n")
+		fd.write("{\n")
+		fd.write("\tFILE *file = fopen(fname, \"rb\");\n")
+		fd.write("\tif(file == NULL){\n")
+		fd.write("\t\treturn NULL;\n")
+		fd.write("\t}\n")
+		fd.write("\tunsigned char header[TEST_HEADER_SIZE];\n")
+		fd.write("\tuint32_t version, kind, dims, shape[2];\n")
+		fd.write("\tif(fread(header, 1, TEST_HEADER_SIZE, file) != TEST_HEADER_SIZE){\n")
+		fd.write("\t\tfclose(file);\n")
+		fd.write("\t\treturn NULL;\n")
+		fd.write("\t}\n")
+		fd.write("\tmemcpy(&version, header + 4, 4);\n")
+		fd.write("\tmemcpy(&kind, header + 8, 4);\n")
+		fd.write("\tmemcpy(&dims, header + 12, 4);\n")
+		fd.write("\tmemcpy(shape, header + 16, 8);\n")
+		fd.write("\tif(memcmp(header, \"" + BLOB_MAGIC.decode() + "\", 4) != 0 || version != " + str(BLOB_VERSION) + " || kind != TEST_KIND || dims != 2 || shape[1] != TEST_RECORD){\n")
+		fd.write("\t\tfclose(file);\n")
+		fd.write("\t\treturn NULL;\n")
+		fd.write("\t}\n")
+		fd.write("\t*count = shape[0];\n")
+		fd.write("\treturn file;\n")
+		fd.write("}\n\n")
+
+		fd.write("int nn_test_read(FILE *file, int count)\n")
+		fd.write("{\n")
+		fd.write("\tif(fread(test_buffer, TEST_ELEMENT*TEST_RECORD, count, file) != (size_t)count){\n")
+		fd.write("\t\treturn -1;\n")
+		fd.write("\t}\n")
+		fd.write("\tfor(int test=0; test<count; test++){\n")
+		fd.write("\t\tfor(int i=0; i<TEST_RECORD; i++){\n")
+		fd.write("\t\t\tconst unsigned char *element = test_buffer + ((long)test*TEST_RECORD + i)*TEST_ELEMENT;\n")
+		fd.write("\t\t\tnn_t value;\n")
+		if kind == "fixed":
+			width = parse_fixed_format(self.dtype).width
+			fd.write("\t\t\tint64_t raw;\n")
+			fd.write("\t\t\tmemcpy(&raw, element, TEST_ELEMENT);\n")
+			fd.write("\t\t\tvalue.range(" + str(width - 1) + ", 0) = (ap_int<" + str(width) + ">)raw;\n")
+		else:
+			fd.write("\t\t\t" + kind + " raw;\n")
+			fd.write("\t\t\tmemcpy(&raw, element, TEST_ELEMENT);\n")
+			fd.write("\t\t\tvalue = raw;\n")
+		fd.write("\t\t\tif(i < NN_INPUT_COUNT){\n")
+		fd.write("\t\t\t\ttest_inputs[test][i] = value;\n")
+		fd.write("\t\t\t}else if(i < NN_INPUT_COUNT + NN_OUTPUT_COUNT){\n")
+		fd.write("\t\t\t\ttest_outputs[test][i - NN_INPUT_COUNT] = value;\n")
+		fd.write("\t\t\t}else{\n")
+		fd.write("\t\t\t\ttest_targets[test][i - NN_INPUT_COUNT - NN_OUTPUT_COUNT] = value;\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("\treturn 0;\n")
+		fd.write("}\n\n")
+
+	def __gen_testbench_main_stream(self, fd):
+		# error statistics updated per output, Welford's running mean and squared deviation; outputs whose
+		# reference is zero count as zero error, as in the embedded testbench
+		fd.write("struct nn_error_statistics {\n")
+		fd.write("\tlong count;\n")
+		fd.write("\tdouble mean;\n")
+		fd.write("\tdouble m2;\n")
+		fd.write("\tdouble absolute_sum;\n")
+		fd.write("\tdouble absolute_max;\n")
+		fd.write("\tdouble relative_sum;\n")
+		fd.write("\tdouble relative_max;\n")
+		fd.write("};\n\n")
+		fd.write("void nn_error_update(nn_error_statistics *statistics, double reference, double output)\n")
+		fd.write("{\n")
+		fd.write("\tdouble error = 0.0;\n")
+		fd.write("\tdouble relative = 0.0;\n")
+		fd.write("\tif(reference != 0){\n")
+		fd.write("\t\terror = reference - output;\n")
+		fd.write("\t\trelative = error/reference;\n")
+		fd.write("\t}\n")
+		fd.write("\tstatistics->count++;\n")
+		fd.write("\tdouble delta = error - statistics->mean;\n")
+		fd.write("\tstatistics->mean += delta/statistics->count;\n")
+		fd.write("\tstatistics->m2 += delta*(error - statistics->mean);\n")
+		fd.write("\tstatistics->absolute_sum += fabs(error);\n")
+		fd.write("\tstatistics->relative_sum += fabs(relative);\n")
+		fd.write("\tif(fabs(error) > statistics->absolute_max){\n")
+		fd.write("\t\tstatistics->absolute_max = fabs(error);\n")
+		fd.write("\t}\n")
+		fd.write("\tif(fabs(relative) > statistics->relative_max){\n")
+		fd.write("\t\tstatistics->relative_max = fabs(relative);\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+		fd.write("int main(void)\n")
+		fd.write("{\n")
+		fd.write("\tnn_t outputs[NN_OUTPUT_COUNT];\n")
+		if self.dataflow_batch is not None:
+			fd.write("\tstatic nn_t batch_inputs[NN_BATCH][NN_INPUT_COUNT];\n")
+			fd.write("\tstatic nn_t batch_outputs[NN_BATCH][NN_OUTPUT_COUNT];\n")
+		if self.abft != "none":
+			fd.write("\tbool abft_error;\n")
+			fd.write("\tlong abft_error_count = 0;\n")
+		fd.write("\tnn_error_statistics err_outputs = {0};\n")
+		fd.write("\tnn_error_statistics err_targets = {0};\n")
+		fd.write("\n")
+		self.__gen_testbench_load(fd)
+		fd.write("\tstd::cout << \"Performing tests\" << std::endl;\n")
+		vector, count = self.__gen_testbench_loop(fd)
+		if self.dataflow_batch is not None:
+			# one call per batch, the last one of a chunk padded with its first tests
+			fd.write("\t\tif(vector % NN_BATCH == 0){\n")
+			fd.write("\t\t\tfor(int sample=0; sample<NN_BATCH; sample++){\n")
+			fd.write("\t\t\t\tfor(int input=0; input<NN_INPUT_COUNT; input++){\n")
+			fd.write("\t\t\t\t\tbatch_inputs[sample][input] = test_inputs[(vector+sample)%test_chunk][input];\n")
+			fd.write("\t\t\t\t}\n")
+			fd.write("\t\t\t}\n")
+			fd.write("\t\t\tnn_top(batch_outputs,batch_inputs);\n")
+			fd.write("\t\t}\n")
+			fd.write("\t\tfor(int output=0; output<NN_OUTPUT_COUNT; output++){\n")
+			fd.write("\t\t\toutputs[output] = batch_outputs[vector%NN_BATCH][output];\n")
+			fd.write("\t\t}\n")
+		elif self.abft != "none":
+			fd.write("\t\tnn_top(outputs,test_inputs[vector],&abft_error);\n")
+			fd.write("\t\tabft_error_count += abft_error;\n")
+		else:
+			fd.write("\t\tnn_top(outputs,test_inputs[vector]);\n")
+		fd.write("\t\tfor(int output=0; output<NN_OUTPUT_COUNT; output++){\n")
+		fd.write("\t\t\tnn_error_update(&err_outputs, (double)test_outputs[vector][output], (double)outputs[output]);\n")
+		fd.write("\t\t\tnn_error_update(&err_targets, (double)test_targets[vector][output], (double)outputs[output]);\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		self.__gen_testbench_close(fd)
+		fd.write("\n")
+		for name, title in (("err_outputs", "Outputs"), ("err_targets", "Targets")):
+			fd.write("\tstd::cout << \"" + title + "\" << std::endl;\n")
+			fd.write("\tstd::cout << \"Absolute Error Mean: \" << " + name + ".absolute_sum/" + name + ".count << \" \" << 100.0*" + name + ".relative_sum/" + name + ".count << \"%\" << std::endl;\n")
+			fd.write("\tstd::cout << \"Absolute Error Max: \" << " + name + ".absolute_max << \" \" << 100.0*" + name + ".relative_max << \"%\" << std::endl;\n")
+			fd.write("\tstd::cout << \"Error Mean: \" << " + name + ".mean << std::endl;\n")
+			fd.write("\tstd::cout << \"Error Mean Standard Deviation: \" << sqrt(" + name + ".m2/(" + name + ".count-1)) << std::endl;\n")
+		if self.abft != "none":
+			fd.write("\tstd::cout << \"ABFT errors flagged: \" << abft_error_count << \"/\" << " + count + " << std::endl;\n")
 		fd.write("\n")
 		fd.write("\treturn 0;\n")
 		fd.write("}\n")
-		
-		fd.close()
 
+	def __gen_testbench_main_argmax(self, fd):
+		# predicted class and rotation against the argmax of the expected outputs and of the targets
+		arguments = ["&" + name for declaration, name in self.__gen_argmax_ports()]
+		fd.write("int main(void)\n")
+		fd.write("{\n")
+		for declaration, name in self.__gen_argmax_ports():
+			fd.write("\t" + declaration.replace("*", "") + ";\n")
+		if self.abft != "none":
+			fd.write("\tbool abft_error;\n")
+			fd.write("\tint abft_error_count = 0;\n")
+		fd.write("\tint match_outputs = 0;\n")
+		fd.write("\tint match_targets = 0;\n")
+		fd.write("\tint match_targets_class = 0;\n")
+		fd.write("\n")
+		self.__gen_testbench_load(fd)
+		fd.write("\tstd::cout << \"Performing tests\" << std::endl;\n")
+		vector, count = self.__gen_testbench_loop(fd)
+		if self.abft != "none":
+			fd.write("\t\tnn_top(" + ",".join(arguments) + ",test_inputs[" + vector + "],&abft_error);\n")
+			fd.write("\t\tabft_error_count += abft_error;\n")
+		else:
+			fd.write("\t\tnn_top(" + ",".join(arguments) + ",test_inputs[" + vector + "]);\n")
+		fd.write("\t\tint index_outputs = 0;\n")
+		fd.write("\t\tint index_targets = 0;\n")
+		fd.write("\t\tfor(int output=1; output<NN_OUTPUT_COUNT; output++){\n")
+		fd.write("\t\t\tif(test_outputs[" + vector + "][output] > test_outputs[" + vector + "][index_outputs]){\n")
+		fd.write("\t\t\t\tindex_outputs = output;\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t\tif(test_targets[" + vector + "][output] > test_targets[" + vector + "][index_targets]){\n")
+		fd.write("\t\t\t\tindex_targets = output;\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		if self.argmax_rotations > 1:
+			fd.write("\t\tint index = class_index*NN_ROTATION_COUNT + rotation_index;\n")
+		else:
+			fd.write("\t\tint index = class_index;\n")
+		fd.write("\t\tmatch_outputs += index == index_outputs;\n")
+		fd.write("\t\tmatch_targets += index == index_targets;\n")
+		fd.write("\t\tmatch_targets_class += class_index == index_targets/NN_ROTATION_COUNT;\n")
+		fd.write("\t}\n")
+		self.__gen_testbench_close(fd)
+		fd.write("\n")
+		fd.write("\tstd::cout << \"Argmax agreement with outputs: \" << match_outputs << \"/\" << " + count + " << std::endl;\n")
+		fd.write("\tstd::cout << \"Accuracy against targets: \" << match_targets << \"/\" << " + count + " << std::endl;\n")
+		fd.write("\tstd::cout << \"Class accuracy against targets: \" << match_targets_class << \"/\" << " + count + " << std::endl;\n")
+		if self.abft != "none":
+			fd.write("\tstd::cout << \"ABFT errors flagged: \" << abft_error_count << \"/\" << " + count + " << std::endl;\n")
+		fd.write("\n")
+		fd.write("\treturn 0;\n")
+		fd.write("}\n")
+
+	def __gen_testbench_load(self, fd):
+		# coefficient blobs, and the embedded test data blobs or the opened vector stream
+		if self.test_stream is not None:
+			if self.data_format == "binary":
+				fd.write("\tif(nn_load_coefficients(NN_DATA_PATH) != 0){\n")
+				fd.write("\t\tstd::cout << \"Error: binary data could not be loaded\" << std::endl;\n")
+				fd.write("\t\treturn 1;\n")
+				fd.write("\t}\n")
+			fd.write("\tlong test_count = 0;\n")
+			fd.write("\tint test_chunk = 0;\n")
+			fd.write("\tFILE *test_file = nn_test_open(TEST_VECTORS_PATH, &test_count);\n")
+			fd.write("\tif(test_file == NULL){\n")
+			fd.write("\t\tstd::cout << \"Error: test vectors could not be read\" << std::endl;\n")
+			fd.write("\t\treturn 1;\n")
+			fd.write("\t}\n\n")
+		elif self.data_format == "binary":
+			fd.write("\tif(nn_load_coefficients(NN_DATA_PATH) != 0 ||\n")
+			fd.write("\t\tnn_blob_load(TESTBENCH_DATA_PATH \"/testbench_inputs.bin\", &test_inputs[0][0], (long)TEST_COUNT*NN_INPUT_COUNT) != 0 ||\n")
+			fd.write("\t\tnn_blob_load(TESTBENCH_DATA_PATH \"/testbench_outputs.bin\", &test_outputs[0][0], (long)TEST_COUNT*NN_OUTPUT_COUNT) != 0 ||\n")
+			fd.write("\t\tnn_blob_load(TESTBENCH_DATA_PATH \"/testbench_targets.bin\", &test_targets[0][0], (long)TEST_COUNT*NN_OUTPUT_COUNT) != 0){\n")
+			fd.write("\t\tstd::cout << \"Error: binary data could not be loaded\" << std::endl;\n")
+			fd.write("\t\treturn 1;\n")
+			fd.write("\t}\n\n")
+
+	def __gen_testbench_loop(self, fd):
+		# opens the loop over all tests, streamed ones refill the chunk arrays at every chunk boundary;
+		# returns the index into the test arrays and the test count
+		if self.test_stream is None:
+			fd.write("\tfor(int test=0; test<TEST_COUNT; test++){\n")
+			return "test", "TEST_COUNT"
+		fd.write("\tfor(long test=0; test<test_count; test++){\n")
+		fd.write("\t\tint vector = test % TEST_CHUNK;\n")
+		fd.write("\t\tif(vector == 0){\n")
+		fd.write("\t\t\ttest_chunk = test_count - test < TEST_CHUNK ? (int)(test_count - test) : TEST_CHUNK;\n")
+		fd.write("\t\t\tif(nn_test_read(test_file, test_chunk) != 0){\n")
+		fd.write("\t\t\t\tstd::cout << \"Error: test vectors could not be read\" << std::endl;\n")
+		fd.write("\t\t\t\treturn 1;\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		return "vector", "test_count"
+
+	def __gen_testbench_close(self, fd):
+		if self.test_stream is not None:
+			fd.write("\tfclose(test_file);\n")
 
 	def generate_implementation(self):
+		self.check_layer_dtypes()
+		self.check_shift_add()
+		self.check_integer()
+
 		# generate paths
 		if not os.path.exists(self.path_output):
 			os.makedirs(self.path_output)
@@ -294,166 +993,290 @@ class nn:
 		if not os.path.exists(self.path_data):
 			os.makedirs(self.path_data)
 
+		# unchanged outputs keep their timestamps, downstream builds are not triggered
+		self.manifest = output_manifest(self.path_output)
+
 		self.__generate_data_nn()
 
 		self.__generate_header_nn()
 
 		self.__generate_source_nn()
 
+		self.manifest.save()
+		self.manifest.show_summary()
+		self.manifest = None
+
 	def __generate_data_nn(self):
+		# literals are rounded to the data type of their layer, one group per type
+		groups = {}
 		for idx in range(0,self.current_layer):
-			layer = self.layers[str(idx)]
-			if layer['type'] == "normalization_input_offset":
-				self.__gen_coef_file_array_1D(idx, layer)
-			elif layer['type'] == "normalization_input_gain":
-				self.__gen_coef_file_array_1D(idx, layer)
-			elif layer['type'] == "normalization_input_min":
-				self.__gen_coef_file_value(idx, layer)
-			elif layer['type'] == "normalization_output_offset":
-				self.__gen_coef_file_array_1D(idx, layer)
-			elif layer['type'] == "normalization_output_gain":
-				self.__gen_coef_file_array_1D(idx, layer)
-			elif layer['type'] == "normalization_output_min":
-				self.__gen_coef_file_value(idx, layer)
-			elif layer['type'] == "multiplication":
-				self.__gen_coef_file_array_2D(idx, layer)
-			elif layer['type'] == "addition":
-				self.__gen_coef_file_array_1D(idx, layer)
-			elif layer['type'] == "activation_tansig":
-				continue
-			elif layer['type'] == "activation_tansig_lut":
-				continue
-			elif layer['type'] == "activation_linear":
-				self.__gen_coef_file_array_1D(idx, layer)
-			else:
-				raise ValueError('This layer type is not supported')
-
-	def __gen_coef_file_value(self, idx, layer):
-		fpath = self.path_data + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		print("generating \"" + fpath + "\"")
-
-		fd = open(fpath, "w")
-		fd.write(str(layer['coef']))
-		fd.write("\n")
-		fd.close()
-
-	def __gen_coef_file_array_1D(self, idx, layer):
-		fpath = self.path_data + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		print("generating \"" + fpath + "\"")
-		
-		fd = open(fpath, "w")
-		for i in layer['coef']:
-			fd.write(str(i) + ",")
-		fd.write("\n")
-		fd.close()
-
-	def __gen_coef_file_array_2D(self, idx, layer):
-		fpath = self.path_data + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		print("generating \"" + fpath + "\"")
-
-		fd = open(fpath, "w")
-		for array in layer['coef']:
-			fd.write("{")
-			for i in array:
-				fd.write(str(i) + ",")
-			fd.write("},\n")
-		fd.write("\n")
-		fd.close()
+			layer = self.layers[idx]
+			if self.__has_coef_words(idx):
+				self.__gen_coef_file(groups.setdefault(self.get_layer_dtype(idx), []), idx, layer.type, *self.__gen_coef(idx))
+		files = groups.setdefault(self.dtype, [])
 
-	def __gen_data_file_array_2D(self, fpath, data):
-		print("generating \"" + fpath + "\"")
-		
-		fd = open(fpath, "w")
-		for array in data:
-			fd.write("{")
-			for i in array:
-				fd.write(str(i) + ",")
-			fd.write("},\n")
-		fd.write("\n")
-		fd.close()
-
-	def __gen_coef_instantation(self, fd, idx, layer):
-		if layer['type'] == "normalization_input_offset":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
-		elif layer['type'] == "normalization_input_gain":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
-		elif layer['type'] == "normalization_input_min":
-			self.__gen_coef_instantation_value(fd, idx, layer)
-		elif layer['type'] == "normalization_output_offset":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
-		elif layer['type'] == "normalization_output_gain":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
-		elif layer['type'] == "normalization_output_min":
-			self.__gen_coef_instantation_value(fd, idx, layer)
-		elif layer['type'] == "multiplication":
-			self.__gen_coef_instantation_array_2D(fd, idx, layer)
-		elif layer['type'] == "addition":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
-		elif layer['type'] == "activation_tansig":
-			return
-		elif layer['type'] == "activation_tansig_lut":
-			return
-		elif layer['type'] == "activation_linear":
-			self.__gen_coef_instantation_array_1D(fd, idx, layer)
+		# column indices of sparse layers, signs and shifts of shift-add layers, plain integers
+		indices = []
+		for idx in range(0,self.current_layer):
+			if self.is_sparse(idx):
+				columns = sparse_coefficients(self.layers[idx].coef)[1]
+				self.__gen_coef_file(indices, idx, self.layers[idx].type + "_columns", "array_1D", columns)
+			if self.is_shift_add(idx):
+				signs, exponents = self.get_shift_add_terms(idx)
+				for term in range(0, self.shift_terms):
+					self.__gen_coef_file(indices, idx, self.layers[idx].type + "_sign" + str(term), "array_2D", signs[..., term])
+					self.__gen_coef_file(indices, idx, self.layers[idx].type + "_shift" + str(term), "array_2D", exponents[..., term])
+			if self.is_integer(idx):
+				weights, bias, multipliers, shift = self.get_integer_quantization(idx)
+				self.__gen_coef_file(indices, idx, "multiplication", "array_2D", weights)
+				self.__gen_coef_file(indices, idx+1, "addition", "array_1D", bias)
+				self.__gen_coef_file(indices, idx+1, "requantization", "array_1D", multipliers)
+		if len(indices) > 0:
+			write_data_files(indices, "repr", "int", None, self.manifest)
+
+		# checksum coefficients, rounded to abft_t
+		if self.abft != "none":
+			files = groups.setdefault(self.get_abft_dtype(), [])
+		for idx in range(0,self.current_layer):
+			for idx_coef, name, kind, coef in self.__abft_coefficients(idx):
+				self.__gen_coef_file(files, idx_coef, name, kind, coef)
+
+		for dtype, files in groups.items():
+			write_data_files(files, self.coef_format, dtype, self.workers, self.manifest)
+			if self.data_format == "binary":
+				write_blob_files([(self.__gen_blob_path(fpath), kind, values) for fpath, kind, values in files], dtype, self.manifest)
+
+		# tanh table, exact decimal literals of lut_out_t independent of nn_t
+		if self.__has_lut_tanh():
+			fpath = self.path_data + "/" + self.__gen_lut_tanh_fname()
+			write_data_files([(fpath, "array_1D", lut_tanh(self.dtype_LUT_in, self.dtype_LUT_out))], "repr", "double", None, self.manifest)
+			self.show_lut_tanh()
+
+	def __has_coef_words(self, idx):
+		# coefficient array in the data type of layer idx; shift-add and integer layers hold plain integers instead
+		if self.layers[idx].kind.coefficients is None or self.is_shift_add(idx) or self.is_integer(idx):
+			return False
+		return not (idx > 0 and self.is_integer(idx-1))
+
+	def __gen_blob_path(self, fpath):
+		return fpath[:-len(".dat")] + ".bin"
+
+	def __gen_coef(self, idx):
+		# (layout, values) of the coefficient array of layer idx, the nonzero values for sparse layers
+		layer = self.layers[idx]
+		if not self.is_sparse(idx):
+			return layer.kind.coefficients, layer.coef
+		values = sparse_coefficients(layer.coef)[0]
+		if len(values) == 0:
+			raise ValueError('Sparse layers need at least one nonzero coefficient')
+		return "array_1D", values
+
+	def __gen_coef_file(self, files, idx, name, kind, coef):
+		fpath = self.path_data + "/l" + str(idx) + "_coef_" + name + ".dat"
+		files.append((fpath, kind, coef))
+
+	def __gen_data_file_array_2D(self, files, fpath, data):
+		files.append((fpath, "array_2D", data))
+
+	def __gen_coef_instantation(self, fd, idx, name, kind, coef, tname=None):
+		vname = "l" + str(idx) + "_coef_" + name
+		if tname is None:
+			tname = self.__gen_type(idx)
+		ipath = DIR_DATA + "/l" + str(idx) + "_coef_" + name + ".dat"
+		if kind == "value":
+			declaration = tname + " " + vname
+			initializer = (" = \n", ";\n")
+		elif kind == "array_1D":
+			declaration = tname + " " + vname + "[" + str(len(coef)) + "]"
+			initializer = (" = {\n", "};\n")
+		elif kind == "array_2D":
+			declaration = tname + " " + vname + "[" + str(len(coef)) + "]" + "[" + str(len(coef[0])) + "]"
+			initializer = (" = {\n", "};\n")
 		else:
-			raise ValueError('This layer type is not supported')
+			raise ValueError('This coefficient layout is not supported')
 
-	def __gen_coef_instantation_value(self, fd, idx, layer):
-		vname = "l" + str(idx) + "_coef_" + layer['type']
-		ipath = DIR_DATA + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		fd.write("nn_t " + vname + " = \n")
+		self.__gen_coef_instantation_binary_begin(fd)
+		fd.write(declaration + initializer[0])
 		fd.write("\t#include \"" + ipath + "\"\n")
-		fd.write(";\n\n")
+		fd.write(initializer[1])
+		self.__gen_coef_instantation_binary_end(fd, declaration)
+		fd.write("\n")
 
-	def __gen_coef_instantation_array_1D(self, fd, idx, layer):
-		vname = "l" + str(idx) + "_coef_" + layer['type']
-		ipath = DIR_DATA + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		fd.write("nn_t " + vname + "[" + str(len(layer['coef'])) + "] = {\n")
+	def __gen_index_instantation(self, fd, idx, name, dims, tname="int"):
+		# integer constants, resolved at compile time once the loops reading them are unrolled
+		vname = "l" + str(idx) + "_coef_" + name
+		ipath = DIR_DATA + "/l" + str(idx) + "_coef_" + name + ".dat"
+		fd.write("const " + tname + " " + vname + "".join("[" + str(dim) + "]" for dim in dims) + " = {\n")
 		fd.write("\t#include \"" + ipath + "\"\n")
 		fd.write("};\n\n")
 
-	def __gen_coef_instantation_array_2D(self, fd, idx, layer):
-		vname = "l" + str(idx) + "_coef_" + layer['type']
-		ipath = DIR_DATA + "/l" + str(idx) + "_coef_" + layer['type'] + ".dat"
-		fd.write("nn_t " + vname + "[" + str(len(layer['coef'])) + "]" + "[" + str(len(layer['coef'][0])) + "] = {\n")
-		fd.write("\t#include \"" + ipath + "\"\n")
-		fd.write("};\n\n")
+	def __gen_coef_instantation_binary_begin(self, fd):
+		# synthesis needs the constants, csim fills the arrays from the blobs
+		if self.data_format == "binary":
+			fd.write("#ifdef __SYNTHESIS__\n")
+
+	def __gen_coef_instantation_binary_end(self, fd, declaration):
+		if self.data_format == "binary":
+			fd.write("#else\n")
+			fd.write(declaration + ";\n")
+			fd.write("#endif\n")
+
+	def __gen_blob_coefficients(self):
+		# (first element, blob file name, element count, loader) of every coefficient array in nn.cpp
+		coefficients = []
+		for idx in range(0, self.current_layer):
+			arrays = []
+			if self.__has_coef_words(idx):
+				arrays.append((idx, self.layers[idx].type, self.__gen_coef(idx)[1], "nn_t"))
+			for idx_coef, name, kind, coef in self.__abft_coefficients(idx):
+				arrays.append((idx_coef, name, coef, "abft_t"))
+			for idx_coef, name, coef, tname in arrays:
+				vname = "l" + str(idx_coef) + "_coef_" + name
+				coefficients.append(("&" + vname + "[0]" * np.ndim(coef), vname + ".bin", int(np.size(coef)), self.__gen_blob_loader_name(tname)))
+		return coefficients
+
+	def __gen_blob_loader_name(self, tname):
+		# abft_t only needs a loader of its own when it is wider than nn_t
+		if tname == "abft_t" and self.get_abft_dtype() != self.dtype:
+			return "nn_blob_load_abft"
+		return "nn_blob_load"
+
+	def __gen_blob_loader(self, fd):
+		fd.write("#ifndef __SYNTHESIS__\n")
+		fd.write("#include <fcntl.h>\n")
+		fd.write("#include <stdint.h>\n")
+		fd.write("#include <stdio.h>\n")
+		fd.write("#include <string.h>\n")
+		fd.write("#include <sys/mman.h>\n")
+		fd.write("#include <sys/stat.h>\n")
+		fd.write("#include <unistd.h>\n\n")
+
+		if self.dtype == "float" or self.dtype == "double":
+			kind = self.dtype
+		else:
+			kind = "fixed"
+		element = np.dtype(BLOB_ELEMENT[kind]).itemsize
+		fd.write("#define NN_BLOB_HEADER_SIZE " + str(BLOB_HEADER.itemsize) + "\n")
+		fd.write("#define NN_BLOB_KIND        " + str(BLOB_KINDS.index(kind)) + "\n")
+		fd.write("#define NN_BLOB_ELEMENT     " + str(element) + "\n\n")
+
+		loaders = [("nn_t", self.dtype)]
+		if self.abft != "none" and self.get_abft_dtype() != self.dtype:
+			loaders.append(("abft_t", self.get_abft_dtype()))
+		for tname, dtype in loaders:
+			self.__gen_blob_loader_function(fd, tname, dtype, kind)
+
+		fd.write("int nn_load_coefficients(const char *path)\n")
+		fd.write("{\n")
+		fd.write("\tchar fname[4096];\n")
+		for pointer, fname, count, loader in self.__gen_blob_coefficients():
+			fd.write("\tsnprintf(fname, sizeof(fname), \"%s/" + fname + "\", path);\n")
+			fd.write("\tif(" + loader + "(fname, " + pointer + ", " + str(count) + ") != 0){\n")
+			fd.write("\t\treturn -1;\n")
+			fd.write("\t}\n")
+		fd.write("\treturn 0;\n")
+		fd.write("}\n")
+		fd.write("#endif\n\n")
+
+	def __gen_blob_loader_function(self, fd, tname, dtype, kind):
+		# header: magic, version, kind, dims, shape[dims], little-endian; data follows at NN_BLOB_HEADER_SIZE
+		fd.write("int " + self.__gen_blob_loader_name(tname) + "(const char *fname, " + tname + " *values, long count)\n")
+		fd.write("{\n")
+		fd.write("\tint fd = open(fname, O_RDONLY);\n")
+		fd.write("\tif(fd < 0){\n")
+		fd.write("\t\treturn -1;\n")
+		fd.write("\t}\n")
+		fd.write("\tstruct stat st;\n")
+		fd.write("\tif(fstat(fd, &st) != 0 || st.st_size < NN_BLOB_HEADER_SIZE){\n")
+		fd.write("\t\tclose(fd);\n")
+		fd.write("\t\treturn -1;\n")
+		fd.write("\t}\n")
+		fd.write("\tvoid *blob = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);\n")
+		fd.write("\tclose(fd);\n")
+		fd.write("\tif(blob == MAP_FAILED){\n")
+		fd.write("\t\treturn -1;\n")
+		fd.write("\t}\n\n")
+		fd.write("\tconst unsigned char *header = (const unsigned char *)blob;\n")
+		fd.write("\tuint32_t version, kind, dims, shape;\n")
+		fd.write("\tmemcpy(&version, header + 4, 4);\n")
+		fd.write("\tmemcpy(&kind, header + 8, 4);\n")
+		fd.write("\tmemcpy(&dims, header + 12, 4);\n")
+		fd.write("\tlong elements = 1;\n")
+		fd.write("\tfor(uint32_t d=0; d<dims && d<" + str(BLOB_DIMS) + "; d++){\n")
+		fd.write("\t\tmemcpy(&shape, header + 16 + 4*d, 4);\n")
+		fd.write("\t\telements *= shape;\n")
+		fd.write("\t}\n\n")
+		fd.write("\tint status = 0;\n")
+		fd.write("\tif(memcmp(header, \"" + BLOB_MAGIC.decode() + "\", 4) != 0 || version != " + str(BLOB_VERSION) + " || kind != NN_BLOB_KIND || elements != count ||\n")
+		fd.write("\t\tst.st_size < NN_BLOB_HEADER_SIZE + elements * NN_BLOB_ELEMENT){\n")
+		fd.write("\t\tstatus = -1;\n")
+		fd.write("\t}else{\n")
+		fd.write("\t\tconst unsigned char *data = header + NN_BLOB_HEADER_SIZE;\n")
+		if kind == "fixed":
+			width = parse_fixed_format(dtype).width
+			fd.write("\t\tfor(long i=0; i<count; i++){\n")
+			fd.write("\t\t\tint64_t raw;\n")
+			fd.write("\t\t\tmemcpy(&raw, data + NN_BLOB_ELEMENT*i, NN_BLOB_ELEMENT);\n")
+			fd.write("\t\t\tvalues[i].range(" + str(width - 1) + ", 0) = (ap_int<" + str(width) + ">)raw;\n")
+			fd.write("\t\t}\n")
+		else:
+			fd.write("\t\tmemcpy(values, data, count * NN_BLOB_ELEMENT);\n")
+		fd.write("\t}\n")
+		fd.write("\tmunmap(blob, st.st_size);\n")
+		fd.write("\treturn status;\n")
+		fd.write("}\n\n")
 
 	def __generate_header_nn(self):
 		print("generating \"" + self.path_output+"/"+FNAME_CPP_HEADER + "\"")
 
-		fd = open(self.path_output+"/"+FNAME_CPP_HEADER, "w")
+		fd = io.StringIO()
 		fd.write('#ifndef _' + FNAME_CPP_HEADER.replace("/", "_").replace(".", "_").upper() + '_\n')
 		fd.write('#define _' + FNAME_CPP_HEADER.replace("/", "_").replace(".", "_").upper() + '_\n\n')
 		
 		# lay out neural network constants
 		for idx in range(0, self.current_layer):
-			fd.write("#define LAYER_" + str(idx) + "_INPUTS  \t\t" + str(self.__get_inout_count(self.layers[str(idx)]['inputs'])) + "\n")
-			fd.write("#define LAYER_" + str(idx) + "_OUTPUTS \t\t" + str(self.__get_inout_count(self.layers[str(idx)]['outputs'])) + "\n")
+			fd.write("#define LAYER_" + str(idx) + "_INPUTS  \t\t" + str(self.layers[idx].inputs_count) + "\n")
+			fd.write("#define LAYER_" + str(idx) + "_OUTPUTS \t\t" + str(self.layers[idx].outputs_count) + "\n")
 
 		fd.write("\n")
 
 		# lay out additional neural network constants
 		for idx in range(0, self.current_layer):
-			if self.layers[str(idx)]['type'] == "multiplication":
-				split_inputs  = self.layers[str(idx)]['inputs'].split('x')
-				split_outputs = self.layers[str(idx)]['outputs'].split('x')
-				fd.write("#define LAYER_" + str(idx) + "_OUTPUTS_OUTER  \t" + str(split_outputs[0]) + "\n")
-				fd.write("#define LAYER_" + str(idx) + "_OUTPUTS_INNER  \t" + str(split_outputs[1]) + "\n")
-			if self.layers[str(idx)]['type'] == "addition":
-				split_inputs  = self.layers[str(idx)]['inputs'].split('x')
-				fd.write("#define LAYER_" + str(idx) + "_INPUTS_OUTER  \t" + str(split_inputs[0]) + "\n")
-				fd.write("#define LAYER_" + str(idx) + "_INPUTS_INNER  \t" + str(split_inputs[1]) + "\n")
+			if self.layers[idx].type == "multiplication":
+				outer, inner = self.layers[idx].outputs_shape
+				fd.write("#define LAYER_" + str(idx) + "_OUTPUTS_OUTER  \t" + str(outer) + "\n")
+				fd.write("#define LAYER_" + str(idx) + "_OUTPUTS_INNER  \t" + str(inner) + "\n")
+			if self.is_sparse(idx):
+				fd.write("#define LAYER_" + str(idx) + "_NONZEROS  \t" + str(self.layers[idx].nonzeros) + "\n")
+			if self.is_folded(idx):
+				fd.write("#define LAYER_" + str(idx) + "_SIMD  \t\t" + str(self.layers[idx].simd) + "\n")
+				fd.write("#define LAYER_" + str(idx) + "_PE    \t\t" + str(self.layers[idx].pe) + "\n")
+			if self.layers[idx].type == "addition":
+				outer, inner = self.layers[idx].inputs_shape
+				fd.write("#define LAYER_" + str(idx) + "_INPUTS_OUTER  \t" + str(outer) + "\n")
+				fd.write("#define LAYER_" + str(idx) + "_INPUTS_INNER  \t" + str(inner) + "\n")
 		fd.write("\n")
 
 
 		# lay out neural network inout constants
 		fd.write("#define NN_INPUT_COUNT  LAYER_0_INPUTS\n")
 		fd.write("#define NN_OUTPUT_COUNT LAYER_" + str(self.current_layer-1) + "_OUTPUTS\n\n")
+		if self.dataflow_batch is not None:
+			fd.write("#define NN_BATCH " + str(self.dataflow_batch) + "\n\n")
+
+		# lay out argmax output stage constants
+		if self.argmax_rotations is not None:
+			if self.layers[self.current_layer-1].outputs_count % self.argmax_rotations != 0:
+				raise ValueError('Output count is not a multiple of the rotation count')
+			fd.write("#define NN_ROTATION_COUNT " + str(self.argmax_rotations) + "\n")
+			fd.write("#define NN_CLASS_COUNT    (NN_OUTPUT_COUNT/NN_ROTATION_COUNT)\n")
+			if self.argmax_rotation is not None:
+				fd.write("#define NN_ROTATION_EXPECTED " + str(self.argmax_rotation) + "\n")
+			fd.write("\n")
 
 		# lay out neural network LUT constants and macros
 		for idx in range(0, self.current_layer):
-			if self.layers[str(idx)]['type'] == "activation_tansig_lut":
+			if self.layers[idx].type == "activation_tansig_lut":
 				fd.write("#define WIDTH_LUT_INPUT "        + str(self.width_lut_input) + "\n")
 				fd.write("#define WIDTH_LUT_INPUT_WHOLE "  + str(self.width_lut_input_whole) + "\n")
 				fd.write("#define WIDTH_LUT_OUTPUT "       + str(self.width_lut_output) + "\n")
@@ -467,70 +1290,163 @@ class nn:
 				fd.write("#define AP_FIXED_MIN_VALUE(width,width_whole) ((ap_fixed<width,width_whole>)(-pow(2,width_whole-1)))\n")
 				break
 
+		# lay out ABFT tolerances
+		for idx in range(0, self.current_layer):
+			if self.is_abft_checked(idx):
+				idx_check = idx + 1 if self.abft == "column" else idx
+				fd.write("#define LAYER_" + str(idx_check) + "_ABFT_TOLERANCE " + repr(self.__abft_tolerance(idx)) + "\n")
+
 		# type definition
 		fd.write("\ntypedef " + self.dtype + " nn_t;\n")
+		if self.abft != "none":
+			fd.write("typedef " + self.get_abft_dtype() + " abft_t;\n")
+		for idx in range(0, self.current_layer):
+			if self.layers[idx].dtype is not None:
+				fd.write("typedef " + self.layers[idx].dtype + " " + self.__gen_type(idx) + ";\n")
+
+		# integer pairs: weights and quantized inputs, the conversion of nn_t to them, accumulators and requantization
+		for idx in range(0, self.current_layer):
+			if self.is_integer(idx):
+				shift = self.get_integer_quantization(idx)[3]
+				width = INTEGER_ACCUMULATOR_WIDTH + INTEGER_MULTIPLIER_WIDTH
+				tname = "l" + str(idx)
+				fd.write("typedef ap_int<" + str(self.integer_bits) + "> " + tname + "_int_t;\n")
+				fd.write("typedef " + self.get_integer_input_format(idx).type_string() + " " + tname + "_quantize_t;\n")
+				fd.write("typedef ap_int<" + str(INTEGER_ACCUMULATOR_WIDTH) + "> " + tname + "_accumulator_t;\n")
+				fd.write("typedef ap_uint<" + str(INTEGER_MULTIPLIER_WIDTH) + "> " + tname + "_multiplier_t;\n")
+				fd.write("typedef ap_int<" + str(width) + "> " + tname + "_product_t;\n")
+				fd.write("typedef " + fixed_format(width, width - shift).type_string() + " " + tname + "_requantize_t;\n")
 
 		# ltype definitions for LUT
 		for idx in range(0, self.current_layer):
-			if self.layers[str(idx)]['type'] == "activation_tansig_lut":
-				fd.write("typedef ap_fixed<WIDTH_LUT_INPUT,WIDTH_LUT_INPUT_WHOLE>            lut_in_t;\n")
+			if self.layers[idx].type == "activation_tansig_lut":
+				dtype_lut_in  = parse_fixed_format(self.dtype_LUT_in).type_string("WIDTH_LUT_INPUT", "WIDTH_LUT_INPUT_WHOLE")
+				dtype_lut_out = parse_fixed_format(self.dtype_LUT_out).type_string("WIDTH_LUT_OUTPUT", "WIDTH_LUT_OUTPUT_WHOLE")
+				fd.write("typedef " + dtype_lut_in + "            lut_in_t;\n")
 				fd.write("typedef ap_ufixed<WIDTH_LUT_INPUT_CAST,WIDTH_LUT_INPUT_CAST_WHOLE> lut_in_cast_t;\n")
-				fd.write("typedef ap_fixed<WIDTH_LUT_OUTPUT,WIDTH_LUT_OUTPUT_WHOLE>          lut_out_t;\n")
+				fd.write("typedef " + dtype_lut_out + "          lut_out_t;\n")
 				break
 
 		# function declaration
-		fd.write("\nvoid nn_top(nn_t outputs[NN_OUTPUT_COUNT], nn_t inputs[NN_INPUT_COUNT]);\n")
+		fd.write("\nvoid nn_top(" + self.__gen_top_arguments() + ");\n")
+		if self.data_format == "binary":
+			fd.write("\n#ifndef __SYNTHESIS__\n")
+			fd.write("#define NN_DATA_PATH \"" + os.path.abspath(self.path_data) + "\"\n")
+			fd.write("int nn_blob_load(const char *fname, nn_t *values, long count);\n")
+			fd.write("int nn_load_coefficients(const char *path);\n")
+			fd.write("#endif\n")
 
 		fd.write("\n#endif\n")
-		fd.close()
+		self.manifest.write(self.path_output+"/"+FNAME_CPP_HEADER, fd.getvalue())
 
 	def __generate_source_nn(self):
 		print("generating \"" + self.path_output+"/"+FNAME_CPP_SOURCE + "\"")
 		
-		fd = open(self.path_output+"/"+FNAME_CPP_SOURCE, "w")
+		fd = io.StringIO()
 
 		# includes
 		fd.write("#include <hls_math.h>\n")
+		if self.dataflow_batch is not None:
+			fd.write("#include <hls_stream.h>\n")
 		fd.write("#include \"nn.h\"\n\n")
 
 		# generate constants
 		for idx in range(0, self.current_layer):
-			if self.__type_should_have_coefficients(self.layers[str(idx)]["type"]):
-				self.__gen_coef_instantation(fd, str(idx), self.layers[str(idx)])
+			layer = self.layers[idx]
+			if self.__has_coef_words(idx):
+				self.__gen_coef_instantation(fd, idx, layer.type, *self.__gen_coef(idx))
+			if self.is_sparse(idx):
+				self.__gen_index_instantation(fd, idx, layer.type + "_columns", [layer.nonzeros])
+			if self.is_shift_add(idx):
+				for term in range(0, self.shift_terms):
+					self.__gen_index_instantation(fd, idx, layer.type + "_sign" + str(term), layer.outputs_shape)
+					self.__gen_index_instantation(fd, idx, layer.type + "_shift" + str(term), layer.outputs_shape)
+			if self.is_integer(idx):
+				tname = "l" + str(idx)
+				self.__gen_index_instantation(fd, idx, "multiplication", layer.outputs_shape, tname + "_int_t")
+				self.__gen_index_instantation(fd, idx+1, "addition", [layer.outputs_shape[0]], tname + "_accumulator_t")
+				self.__gen_index_instantation(fd, idx+1, "requantization", [layer.outputs_shape[0]], tname + "_multiplier_t")
+			for idx_coef, name, kind, coef in self.__abft_coefficients(idx):
+				self.__gen_coef_instantation(fd, idx_coef, name, kind, coef, "abft_t")
+
+		# generate csim loader of the binary coefficients
+		if self.data_format == "binary":
+			self.__gen_blob_loader(fd)
 
 		# generate support functions
 		for idx in range(0, self.current_layer):
-			if self.layers[str(idx)]['type'] == "activation_tansig_lut":
+			if self.layers[idx].type == "activation_tansig_lut":
 				self.__gen_tansig_lut_support(fd)
 				break
+		if self.shift_terms is not None:
+			self.__gen_shift_add_support(fd)
 
 		# generate resources
 		for idx in range(0, self.current_layer):
-			self.__gen_resource(fd, str(idx), self.layers[str(idx)])
+			if idx > 0 and self.is_folded(idx-1):
+				self.__gen_resource_matrix_vector(fd, idx-1, self.layers[idx-1], self.layers[idx])
+			elif idx > 0 and self.is_fused(idx-1):
+				self.__gen_resource_multiply_accumulate(fd, idx-1, self.layers[idx-1], self.layers[idx])
+			elif not self.is_fused(idx):
+				_resource_generators[self.layers[idx].type](self, fd, idx, self.layers[idx])
+			if self.is_abft_checked(idx):
+				self.__gen_resource_abft_checksum_multiplication(fd, idx, self.layers[idx])
+				if self.abft == "column":
+					self.__gen_resource_abft_checksum_addition(fd, idx+1, self.layers[idx+1])
+
+		# layer processes connected by streams replace the monolithic top
+		if self.dataflow_batch is not None:
+			self.__gen_dataflow(fd)
+			self.manifest.write(self.path_output+"/"+FNAME_CPP_SOURCE, fd.getvalue())
+			return
 
 		# main hw acceleration function
-		fd.write("\n\n\nvoid nn_top(nn_t outputs[NN_OUTPUT_COUNT], nn_t inputs[NN_INPUT_COUNT])\n")
+		fd.write("\n\n\nvoid nn_top(" + self.__gen_top_arguments() + ")\n")
 		fd.write("{\n")
 
-		# generate pragmas
+		# generate pragmas, a pipelined top would unroll the fold loops of the engines
 		self.generate_pragmas_interface(fd)
-		if self.interface == "s_axilite":
+		folded = any(self.is_folded(idx) for idx in range(0, self.current_layer))
+		if self.interface == "s_axilite" and not folded:
 			self.generate_pragmas_pipeline(fd)
-		elif self.interface == "s_axis":
+		elif self.interface == "s_axis" and not folded:
 			fd.write("#pragma HLS PIPELINE II=" + str(self.max_execution) + " enable_flush\n")
 		fd.write("#pragma HLS ARRAY_PARTITION variable=inputs complete dim=1\n")
-		fd.write("#pragma HLS ARRAY_PARTITION variable=outputs complete dim=1\n")
-
-		# generate output containers
-		for idx in range(0, self.current_layer-1):
+		if self.argmax_rotations is None:
+			fd.write("#pragma HLS ARRAY_PARTITION variable=outputs complete dim=1\n")
+
+		# generate output containers, the argmax stage and the conversion to nn_t read the last layer from one as well
+		cast_outputs = self.argmax_rotations is None and self.__gen_type(self.current_layer-1) != "nn_t"
+		containers   = self.current_layer-1
+		if self.argmax_rotations is not None or cast_outputs:
+			containers = self.current_layer
+		for idx in range(0, containers):
+			if self.is_fused(idx):
+				continue
 			vname = "output_" + str(idx)
 			dname = "LAYER_" + str(idx) + "_OUTPUTS"
-			if self.layers[str(idx)]['type'] == "multiplication":
-				fd.write("\tnn_t " + vname + "[" + dname + "_OUTER][" + dname + "_INNER];\n")
+			tname = self.__gen_type(idx)
+			if self.layers[idx].type == "multiplication":
+				fd.write("\t" + tname + " " + vname + "[" + dname + "_OUTER][" + dname + "_INNER];\n")
 			else:
-				fd.write("\tnn_t " + vname + "[" + dname + "];\n")
+				fd.write("\t" + tname + " " + vname + "[" + dname + "];\n")
 			fd.write("#pragma HLS ARRAY_PARTITION variable=" + vname + " complete dim=0\n")
 
+		# generate checksum containers
+		if self.abft != "none":
+			fd.write("\tbool abft_error_flag = false;\n")
+		for idx in range(0, self.current_layer):
+			if self.is_abft_checked(idx):
+				fd.write("\tabft_t l" + str(idx) + "_abft_checksum[LAYER_" + str(idx) + "_OUTPUTS_INNER];\n")
+				fd.write("#pragma HLS ARRAY_PARTITION variable=l" + str(idx) + "_abft_checksum complete dim=0\n")
+				if self.__abft_is_relative():
+					fd.write("\tabft_t l" + str(idx) + "_abft_magnitude[LAYER_" + str(idx) + "_OUTPUTS_INNER];\n")
+					fd.write("#pragma HLS ARRAY_PARTITION variable=l" + str(idx) + "_abft_magnitude complete dim=0\n")
+				if self.abft == "column":
+					fd.write("\tabft_t l" + str(idx+1) + "_abft_checksum;\n")
+					if self.__abft_is_relative():
+						fd.write("\tabft_t l" + str(idx+1) + "_abft_magnitude;\n")
+
 		# generate resource calls
 		for idx in range(0, self.current_layer):
 			if idx == 0:
@@ -538,15 +1454,315 @@ class nn:
 			else:
 				vname_in  = "output_" + str(idx-1)
 
-			if idx == self.current_layer-1:
+			if idx == self.current_layer-1 and self.argmax_rotations is None and not cast_outputs:
 				vname_out = "outputs"
 			else:
 				vname_out = "output_" + str(idx)
 				
-			rname = "l" + str(idx) + "_resource_" + self.layers[str(idx)]['type']
-			fd.write("\n\t" + rname + "(" + vname_out + ", " + vname_in + ");\n")
+			# fused pairs read the input of the multiplication and skip its call
+			if idx > 0 and self.is_fused(idx-1):
+				vname_in = "inputs" if idx == 1 else "output_" + str(idx-2)
+				if self.get_layer_dtype(idx-2) != self.get_layer_dtype(idx-1):
+					fd.write("\n")
+					vname_in = self.__gen_cast(fd, idx-2, idx-1, vname_in)
+				rname    = "l" + str(idx) + "_resource_multiply_accumulate"
+				if self.is_folded(idx-1):
+					rname = "l" + str(idx) + "_resource_matrix_vector"
+				fd.write("\n\t" + rname + "(" + vname_out + ", " + vname_in + ");\n")
+			elif not self.is_fused(idx):
+				if self.get_layer_dtype(idx-1) != self.get_layer_dtype(idx):
+					fd.write("\n")
+					vname_in = self.__gen_cast(fd, idx-1, idx, vname_in)
+				rname = "l" + str(idx) + "_resource_" + self.layers[idx].type
+				fd.write("\n\t" + rname + "(" + vname_out + ", " + vname_in + ");\n")
+
+			# generate checksum calls and comparisons
+			if self.is_abft_checked(idx):
+				vname = "l" + str(idx) + "_abft_checksum"
+				if self.__abft_is_relative():
+					vname = vname + ", l" + str(idx) + "_abft_magnitude"
+				fd.write("\tl" + str(idx) + "_resource_abft_checksum(" + vname + ", " + vname_in + ");\n")
+				if self.abft == "row":
+					self.__gen_abft_check_row(fd, idx, vname_out)
+			if idx > 0 and self.is_abft_checked(idx-1) and self.abft == "column":
+				vname = "&l" + str(idx) + "_abft_checksum"
+				if self.__abft_is_relative():
+					vname = vname + ", &l" + str(idx) + "_abft_magnitude"
+				vname = vname + ", l" + str(idx-1) + "_abft_checksum"
+				if self.__abft_is_relative():
+					vname = vname + ", l" + str(idx-1) + "_abft_magnitude"
+				fd.write("\tl" + str(idx) + "_resource_abft_checksum(" + vname + ");\n")
+				self.__gen_abft_check_column(fd, idx, vname_out)
+
+		if self.argmax_rotations is not None:
+			self.__gen_argmax(fd, "output_" + str(self.current_layer-1))
+		elif cast_outputs:
+			fd.write("\n")
+			self.__gen_cast_loop(fd, ["NN_OUTPUT_COUNT"], "outputs", "output_" + str(self.current_layer-1))
+
+		if self.abft != "none":
+			fd.write("\n\t*abft_error = abft_error_flag;\n")
 
 		fd.write("}\n")
+		self.manifest.write(self.path_output+"/"+FNAME_CPP_SOURCE, fd.getvalue())
+
+	def __gen_type(self, idx):
+		# layers with their own data type compute in a typedef of it, all others in nn_t
+		if idx < 0 or self.layers[idx].dtype is None:
+			return "nn_t"
+		return "l" + str(idx) + "_t"
+
+	def __gen_cast_expression(self, idx_source, idx_target, expression):
+		if self.get_layer_dtype(idx_source) == self.get_layer_dtype(idx_target):
+			return expression
+		return "(" + self.__gen_type(idx_target) + ")" + expression
+
+	def __gen_cast(self, fd, idx_source, idx_target, vname):
+		# container of layer idx_source, the inputs for -1, converted to the data type of layer idx_target
+		vname_cast = "input_" + str(idx_target)
+		if idx_source < 0:
+			dnames = ["NN_INPUT_COUNT"]
+		elif self.layers[idx_source].type == "multiplication":
+			dnames = ["LAYER_" + str(idx_source) + "_OUTPUTS_OUTER", "LAYER_" + str(idx_source) + "_OUTPUTS_INNER"]
+		else:
+			dnames = ["LAYER_" + str(idx_source) + "_OUTPUTS"]
+		fd.write("\t" + self.__gen_type(idx_target) + " " + vname_cast + "".join("[" + dname + "]" for dname in dnames) + ";\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=" + vname_cast + " complete dim=0\n")
+		self.__gen_cast_loop(fd, dnames, vname_cast, vname)
+		return vname_cast
+
+	def __gen_cast_loop(self, fd, dnames, vname_out, vname_in):
+		indices = "ij"[0:len(dnames)]
+		for depth in range(0, len(dnames)):
+			fd.write("\t" * (depth+1) + "for(int " + indices[depth] + "=0; " + indices[depth] + "<" + dnames[depth] + "; " + indices[depth] + "++){\n")
+			fd.write("\t" * (depth+1) + "#pragma HLS UNROLL\n")
+		element = "".join("[" + index + "]" for index in indices)
+		fd.write("\t" * (len(dnames)+1) + vname_out + element + " = " + vname_in + element + ";\n")
+		for depth in reversed(range(0, len(dnames))):
+			fd.write("\t" * (depth+1) + "}\n")
+
+	def __gen_top_arguments(self):
+		if self.dataflow_batch is not None:
+			return "nn_t outputs[NN_BATCH][NN_OUTPUT_COUNT], nn_t inputs[NN_BATCH][NN_INPUT_COUNT]"
+		if self.argmax_rotations is not None:
+			arguments = [declaration for declaration, name in self.__gen_argmax_ports()]
+		else:
+			arguments = ["nn_t outputs[NN_OUTPUT_COUNT]"]
+		arguments.append("nn_t inputs[NN_INPUT_COUNT]")
+		if self.abft != "none":
+			arguments.append("bool *abft_error")
+		return ", ".join(arguments)
+
+	def __gen_dataflow_stages(self):
+		# (first, last) layer of every process, fused pairs share one
+		stages = []
+		for idx in range(0, self.current_layer):
+			if idx > 0 and self.is_fused(idx-1):
+				stages[-1] = (idx-1, idx)
+			else:
+				stages.append((idx, idx))
+		return stages
+
+	def __gen_dataflow(self, fd):
+		if self.abft != "none" or self.argmax_rotations is not None:
+			raise ValueError('Dataflow generation does not support ABFT or the argmax stage')
+		stages = self.__gen_dataflow_stages()
+
+		# one vector per stream entry, shaped like the output container of the stage
+		fd.write("struct nn_input_t {\n")
+		fd.write("\tnn_t data[NN_INPUT_COUNT];\n")
+		fd.write("};\n\n")
+		for first, last in stages:
+			dname = "LAYER_" + str(last) + "_OUTPUTS"
+			fd.write("struct output_" + str(last) + "_t {\n")
+			if self.layers[last].type == "multiplication":
+				fd.write("\tnn_t data[" + dname + "_OUTER][" + dname + "_INNER];\n")
+			else:
+				fd.write("\tnn_t data[" + dname + "];\n")
+			fd.write("};\n\n")
+
+		# input process
+		fd.write("void nn_read_inputs(hls::stream<nn_input_t> &outputs, nn_t inputs[NN_BATCH][NN_INPUT_COUNT])\n")
+		fd.write("{\n")
+		fd.write("\tfor(int sample=0; sample<NN_BATCH; sample++){\n")
+		fd.write("\t#pragma HLS PIPELINE II=" + str(self.max_execution) + "\n")
+		fd.write("\t\tnn_input_t vector;\n")
+		fd.write("\t\tfor(int i=0; i<NN_INPUT_COUNT; i++){\n")
+		fd.write("\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\tvector.data[i] = inputs[sample][i];\n")
+		fd.write("\t\t}\n")
+		fd.write("\t\toutputs.write(vector);\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+		# layer processes, a pipelined sample loop would unroll the fold loops of an engine
+		tname_in = "nn_input_t"
+		for first, last in stages:
+			tname_out = "output_" + str(last) + "_t"
+			if first != last and self.is_folded(first):
+				rname = "l" + str(last) + "_resource_matrix_vector"
+			elif first != last:
+				rname = "l" + str(last) + "_resource_multiply_accumulate"
+			else:
+				rname = "l" + str(last) + "_resource_" + self.layers[last].type
+			fd.write("void l" + str(last) + "_process(hls::stream<" + tname_out + "> &outputs, hls::stream<" + tname_in + "> &inputs)\n")
+			fd.write("{\n")
+			fd.write("\tfor(int sample=0; sample<NN_BATCH; sample++){\n")
+			if not self.is_folded(first):
+				fd.write("\t#pragma HLS PIPELINE II=" + str(self.max_execution) + "\n")
+			fd.write("\t\t" + tname_in + " input = inputs.read();\n")
+			fd.write("\t\t" + tname_out + " output;\n")
+			fd.write("\t\t" + rname + "(output.data, input.data);\n")
+			fd.write("\t\toutputs.write(output);\n")
+			fd.write("\t}\n")
+			fd.write("}\n\n")
+			tname_in = tname_out
+
+		# output process
+		fd.write("void nn_write_outputs(nn_t outputs[NN_BATCH][NN_OUTPUT_COUNT], hls::stream<" + tname_in + "> &inputs)\n")
+		fd.write("{\n")
+		fd.write("\tfor(int sample=0; sample<NN_BATCH; sample++){\n")
+		fd.write("\t#pragma HLS PIPELINE II=" + str(self.max_execution) + "\n")
+		fd.write("\t\t" + tname_in + " vector = inputs.read();\n")
+		fd.write("\t\tfor(int i=0; i<NN_OUTPUT_COUNT; i++){\n")
+		fd.write("\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\toutputs[sample][i] = vector.data[i];\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+		# main hw acceleration function
+		fd.write("\n\n\nvoid nn_top(" + self.__gen_top_arguments() + ")\n")
+		fd.write("{\n")
+		self.generate_pragmas_interface(fd)
+		fd.write("#pragma HLS DATAFLOW\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=inputs complete dim=2\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=outputs complete dim=2\n")
+
+		# generate streams
+		snames = ["stream_inputs"] + ["stream_" + str(last) for first, last in stages]
+		tnames = ["nn_input_t"] + ["output_" + str(last) + "_t" for first, last in stages]
+		for sname, tname in zip(snames, tnames):
+			fd.write("\thls::stream<" + tname + "> " + sname + ";\n")
+			fd.write("#pragma HLS STREAM variable=" + sname + " depth=" + str(DATAFLOW_STREAM_DEPTH) + "\n")
+			fd.write("#pragma HLS DATA_PACK variable=" + sname + "\n")
+
+		# generate process calls
+		fd.write("\n\tnn_read_inputs(" + snames[0] + ", inputs);\n")
+		for stage in range(0, len(stages)):
+			fd.write("\tl" + str(stages[stage][1]) + "_process(" + snames[stage+1] + ", " + snames[stage] + ");\n")
+		fd.write("\tnn_write_outputs(outputs, " + snames[-1] + ");\n")
+		fd.write("}\n")
+
+	def __gen_argmax_ports(self):
+		# (declaration, name) of the argmax stage ports, one word each
+		ports = [("int *class_index", "class_index")]
+		if self.argmax_rotations > 1:
+			ports.append(("int *rotation_index", "rotation_index"))
+		if self.argmax_score:
+			ports.append(("nn_t *score", "score"))
+		if self.argmax_rotation is not None:
+			ports.append(("bool *rotation_consistent", "rotation_consistent"))
+		return ports
+
+	def __gen_argmax(self, fd, vname):
+		# comparison tree, ties resolve to the lower index like numpy.argmax
+		fd.write("\n\tnn_t argmax_value[NN_OUTPUT_COUNT];\n")
+		fd.write("\tint argmax_index[NN_OUTPUT_COUNT];\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=argmax_value complete dim=0\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=argmax_index complete dim=0\n")
+		fd.write("\tfor(int i=0; i<NN_OUTPUT_COUNT; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\targmax_value[i] = " + vname + "[i];\n")
+		fd.write("\t\targmax_index[i] = i;\n")
+		fd.write("\t}\n")
+		fd.write("\tfor(int stride=1; stride<NN_OUTPUT_COUNT; stride*=2){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tfor(int i=0; i+stride<NN_OUTPUT_COUNT; i+=2*stride){\n")
+		fd.write("\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\tif(argmax_value[i+stride] > argmax_value[i]){\n")
+		fd.write("\t\t\t\targmax_value[i] = argmax_value[i+stride];\n")
+		fd.write("\t\t\t\targmax_index[i] = argmax_index[i+stride];\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("\t*class_index = argmax_index[0] / NN_ROTATION_COUNT;\n")
+		if self.argmax_rotations > 1:
+			fd.write("\t*rotation_index = argmax_index[0] % NN_ROTATION_COUNT;\n")
+		if self.argmax_score:
+			fd.write("\t*score = argmax_value[0];\n")
+		if self.argmax_rotation is not None:
+			fd.write("\t*rotation_consistent = (argmax_index[0] % NN_ROTATION_COUNT) == NN_ROTATION_EXPECTED;\n")
+
+	def __gen_abft_check_column(self, fd, idx, vname):
+		# sum of the addition outputs against the checksum output
+		rname = "l" + str(idx) + "_abft_reference"
+		cname = "l" + str(idx) + "_abft_checksum"
+		tname = "LAYER_" + str(idx) + "_ABFT_TOLERANCE"
+		if self.__abft_is_relative():
+			tname = "(" + tname + " * l" + str(idx) + "_abft_magnitude)"
+		fd.write("\tabft_t " + rname + " = 0;\n")
+		fd.write("\tfor(int i=0; i<LAYER_" + str(idx) + "_OUTPUTS; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\t" + rname + " += " + vname + "[i];\n")
+		fd.write("\t}\n")
+		fd.write("\tif((" + rname + " - " + cname + " > " + tname + ") || (" + cname + " - " + rname + " > " + tname + ")){\n")
+		fd.write("\t\tabft_error_flag = true;\n")
+		fd.write("\t}\n")
+
+	def __gen_abft_check_row(self, fd, idx, vname):
+		# every column of the partial products against its checksum product
+		rname = "l" + str(idx) + "_abft_reference"
+		cname = "l" + str(idx) + "_abft_checksum"
+		tname = "LAYER_" + str(idx) + "_ABFT_TOLERANCE"
+		if self.__abft_is_relative():
+			tname = "(" + tname + " * l" + str(idx) + "_abft_magnitude[j])"
+		fd.write("\tfor(int j=0; j<LAYER_" + str(idx) + "_OUTPUTS_INNER; j++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tabft_t " + rname + " = 0;\n")
+		fd.write("\t\tfor(int i=0; i<LAYER_" + str(idx) + "_OUTPUTS_OUTER; i++){\n")
+		fd.write("\t\t\t" + rname + " += " + vname + "[i][j];\n")
+		fd.write("\t\t}\n")
+		fd.write("\t\tif((" + rname + " - " + cname + "[j] > " + tname + ") || (" + cname + "[j] - " + rname + " > " + tname + ")){\n")
+		fd.write("\t\t\tabft_error_flag = true;\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+
+	def __gen_lut_tanh_fname(self):
+		return "lut_tanh_" + str(self.width_lut_output) + "_" + str(self.width_lut_output_whole) + "__" + str(self.width_lut_input) + "_" + str(self.width_lut_input_whole) + ".dat"
+
+	def __has_lut_tanh(self):
+		for idx in range(0, self.current_layer):
+			if self.layers[idx].kind.operation == "tanh_lut":
+				return True
+		return False
+
+	def __gen_shift_add_support(self, fd):
+		# value times sign*2^shift; shifts stay in the type of value, the negation is converted back to it
+		fd.write("template<typename T> T nn_shift_term(T value, int sign, int shift)\n")
+		fd.write("{\n")
+		fd.write("#pragma HLS INLINE\n")
+		fd.write("\tT term = shift >= 0 ? (T)(value << shift) : (T)(value >> -shift);\n")
+		fd.write("\tif(sign > 0){\n")
+		fd.write("\t\treturn term;\n")
+		fd.write("\t}else if(sign < 0){\n")
+		fd.write("\t\treturn -term;\n")
+		fd.write("\t}\n")
+		fd.write("\treturn 0;\n")
+		fd.write("}\n\n")
+
+	def __gen_product(self, fd, indent, idx, declaration, vname, input, element):
+		# declaration = input times the coefficient element of multiplication idx, by the multiplier or term by term
+		cname = "l" + str(idx) + "_coef_multiplication"
+		if not self.is_shift_add(idx):
+			fd.write(indent + declaration + " = " + input + " * " + cname + element + ";\n")
+			return
+		for term in range(0, self.shift_terms):
+			operands = "(" + input + ", " + cname + "_sign" + str(term) + element + ", " + cname + "_shift" + str(term) + element + ")"
+			if term == 0:
+				fd.write(indent + declaration + " = nn_shift_term" + operands + ";\n")
+			else:
+				fd.write(indent + vname + " += nn_shift_term" + operands + ";\n")
 
 	def __gen_tansig_lut_support(self, fd):
 		# saturate
@@ -563,7 +1779,7 @@ class nn:
 		fd.write("}\n\n")
 
 		# LUT abstraction
-		fname_lut_data = "lut_tanh_" + str(self.width_lut_output) + "_" + str(self.width_lut_output_whole) + "__" + str(self.width_lut_input) + "_" + str(self.width_lut_input_whole) + ".dat"
+		fname_lut_data = self.__gen_lut_tanh_fname()
 		fd.write("lut_out_t tanh(lut_in_t input)\n")
 		fd.write("{\n")
 		fd.write("\tlut_out_t lut_tanh[] = {\n")
@@ -574,150 +1790,160 @@ class nn:
 		fd.write("\treturn lut_tanh[address];\n")
 		fd.write("}\n\n")
 
-	def __gen_resource(self, fd, idx, layer):
-		if layer["type"] == "normalization_input_offset":
-			self.__gen_resource_normalization_input_offset(fd, idx, layer)
-		elif layer["type"] == "normalization_input_gain":
-			self.__gen_resource_normalization_input_gain(fd, idx, layer)
-		elif layer["type"] == "normalization_input_min":
-			self.__gen_resource_normalization_input_min(fd, idx, layer)
-		elif layer["type"] == "normalization_output_offset":
-			self.__gen_resource_normalization_output_offset(fd, idx, layer)
-		elif layer["type"] == "normalization_output_gain":
-			self.__gen_resource_normalization_output_gain(fd, idx, layer)
-		elif layer["type"] == "normalization_output_min":
-			self.__gen_resource_normalization_output_min(fd, idx, layer)
-		elif layer["type"] == "multiplication":
-			self.__gen_resource_multiplication(fd, idx, layer)
-		elif layer["type"] == "addition":
-			self.__gen_resource_addition(fd, idx, layer)
-		elif layer["type"] == "activation_tansig":
-			self.__gen_resource_activation_tansig(fd, idx, layer)
-		elif layer["type"] == "activation_tansig_lut":
-			self.__gen_resource_activation_tansig_lut(fd, idx, layer)
-		elif layer["type"] == "activation_linear":
-			self.__gen_resource_activation_linear(fd, idx, layer)
-		else:
-			raise ValueError('This layer type is not supported')
-
+	@_resource_generator("normalization_input_offset")
 	def __gen_resource_normalization_input_offset(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_input_offset"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_input_offset"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] - " + cname + "[i];\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("normalization_input_gain")
 	def __gen_resource_normalization_input_gain(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_input_gain"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_input_gain"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=mul limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=mul limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] * " + cname + "[i];\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("normalization_input_min")
 	def __gen_resource_normalization_input_min(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_input_min"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_input_min"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] + " + cname + ";\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("normalization_output_offset")
 	def __gen_resource_normalization_output_offset(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_output_offset"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_output_offset"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] - " + cname + "[i];\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("normalization_output_gain")
 	def __gen_resource_normalization_output_gain(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_output_gain"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_output_gain"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=mul limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=mul limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] * " + cname + "[i];\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("normalization_output_min")
 	def __gen_resource_normalization_output_min(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_normalization_output_min"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_normalization_output_min"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] - " + cname + ";\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("multiplication")
 	def __gen_resource_multiplication(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_multiplication"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS_OUTER"
 		dname1 = "LAYER_" + str(idx) + "_OUTPUTS_INNER"
 		dname2 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_multiplication"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "][" + dname1 + "], nn_t inputs[" + dname2 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "][" + dname1 + "], " + tname + " inputs[" + dname2 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer['resources']) + " operation\n")
+		if self.is_shift_add(idx):
+			fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources * self.shift_terms) + " operation\n")
+		else:
+			fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\tfor(int j=0; j<" + dname1 + "; j++){\n" )
-		fd.write("\t\t\toutputs[i][j] = inputs[j] * " + cname + "[i][j];\n")
+		if self.is_sparse(idx):
+			# pruned products are constant zeros, only the stored coefficients are multiplied
+			fd.write("\t\t\toutputs[i][j] = 0;\n")
+			fd.write("\t\t}\n")
+			fd.write("\t}\n")
+			for i, start, stop in self.__gen_sparse_rows(idx):
+				fd.write("\tfor(int k=" + str(start) + "; k<" + str(stop) + "; k++){\n")
+				fd.write("\t#pragma HLS UNROLL\n")
+				fd.write("\t\toutputs[" + str(i) + "][" + cname + "_columns[k]] = inputs[" + cname + "_columns[k]] * " + cname + "[k];\n")
+				fd.write("\t}\n")
+			fd.write("}\n\n")
+			return
+		self.__gen_product(fd, "\t\t\t", idx, "outputs[i][j]", "outputs[i][j]", "inputs[j]", "[i][j]")
 		fd.write("\t\t}\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	def __gen_sparse_rows(self, idx):
+		# (row, first, last+1) nonzero of every row, the bounds of the unrolled loops are constants
+		rows = sparse_coefficients(self.layers[idx].coef)[2]
+		return [(i, int(rows[i]), int(rows[i+1])) for i in range(0, len(rows)-1)]
+
+	@_resource_generator("addition")
 	def __gen_resource_addition(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_addition"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_INPUTS_OUTER"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS_INNER"
 		dname2 = "LAYER_" + str(idx) + "_OUTPUTS"
 		cname  = "l" + str(idx) + "_coef_addition"
-		fd.write("void " + rname + "(nn_t outputs[" + dname2 + "], nn_t inputs[" + dname0 + "][" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname2 + "], " + tname + " inputs[" + dname0 + "][" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = " + cname + "[i];\n" )
@@ -727,12 +1953,187 @@ class nn:
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	def __gen_resource_multiply_accumulate(self, fd, idx, layer_multiplication, layer_addition):
+		# products are rounded to the multiplication type before accumulation, exactly as the separate layers do
+		rname  = "l" + str(idx+1) + "_resource_multiply_accumulate"
+		tname0 = self.__gen_type(idx)
+		tname1 = self.__gen_type(idx+1)
+		dname0 = "LAYER_" + str(idx+1) + "_INPUTS_OUTER"
+		dname1 = "LAYER_" + str(idx+1) + "_INPUTS_INNER"
+		dname2 = "LAYER_" + str(idx+1) + "_OUTPUTS"
+		dname3 = "LAYER_" + str(idx) + "_INPUTS"
+		cname0 = "l" + str(idx) + "_coef_multiplication"
+		cname1 = "l" + str(idx+1) + "_coef_addition"
+		fd.write("void " + rname + "(" + tname1 + " outputs[" + dname2 + "], " + tname0 + " inputs[" + dname3 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		if self.is_integer(idx):
+			self.__gen_integer_accumulate(fd, idx, layer_multiplication, layer_addition)
+			fd.write("}\n\n")
+			return
+		if self.is_shift_add(idx):
+			fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer_addition.resources + layer_multiplication.resources * self.shift_terms) + " operation\n")
+		else:
+			fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer_multiplication.resources) + " operation\n")
+			fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer_addition.resources) + " operation\n")
+		if self.is_sparse(idx):
+			# skipped zero products leave the accumulator unchanged, the stored ones are added in column order
+			for i, start, stop in self.__gen_sparse_rows(idx):
+				fd.write("\t" + tname1 + " accumulator_" + str(i) + " = " + cname1 + "[" + str(i) + "];\n")
+				fd.write("\tfor(int k=" + str(start) + "; k<" + str(stop) + "; k++){\n")
+				fd.write("\t#pragma HLS UNROLL\n")
+				fd.write("\t\t" + tname0 + " product = inputs[" + cname0 + "_columns[k]] * " + cname0 + "[k];\n")
+				fd.write("\t\taccumulator_" + str(i) + " += " + self.__gen_cast_expression(idx, idx+1, "product") + ";\n")
+				fd.write("\t}\n")
+				fd.write("\toutputs[" + str(i) + "] = accumulator_" + str(i) + ";\n")
+			fd.write("}\n\n")
+			return
+		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\t" + tname1 + " accumulator = " + cname1 + "[i];\n")
+		fd.write("\t\tfor(int j=0; j<" + dname1 + "; j++){\n")
+		self.__gen_product(fd, "\t\t\t", idx, tname0 + " product", "product", "inputs[j]", "[i][j]")
+		fd.write("\t\t\taccumulator += " + self.__gen_cast_expression(idx, idx+1, "product") + ";\n")
+		fd.write("\t\t}\n")
+		fd.write("\t\toutputs[i] = accumulator;\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+	def __gen_integer_accumulate(self, fd, idx, layer_multiplication, layer_addition):
+		# inputs are rounded and saturated to integers once, the integer products are summed in the accumulator
+		# and scaled back to nn_t by the per output multiplier, the bits of the product carry the binary point
+		tname  = "l" + str(idx)
+		dname0 = "LAYER_" + str(idx+1) + "_INPUTS_OUTER"
+		dname1 = "LAYER_" + str(idx+1) + "_INPUTS_INNER"
+		dname3 = "LAYER_" + str(idx) + "_INPUTS"
+		cname0 = "l" + str(idx) + "_coef_multiplication"
+		cname1 = "l" + str(idx+1) + "_coef_addition"
+		cname2 = "l" + str(idx+1) + "_coef_requantization"
+		requantization = min(layer_addition.resources, layer_addition.outputs_count)
+		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer_multiplication.resources + requantization) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer_addition.resources) + " operation\n")
+		fd.write("\t" + tname + "_int_t quantized[" + dname3 + "];\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=quantized complete dim=1\n")
+		fd.write("\tfor(int j=0; j<" + dname3 + "; j++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\t" + tname + "_quantize_t input = inputs[j];\n")
+		fd.write("\t\tquantized[j].range() = input.range();\n")
+		fd.write("\t}\n")
+		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\t" + tname + "_accumulator_t accumulator = " + cname1 + "[i];\n")
+		fd.write("\t\tfor(int j=0; j<" + dname1 + "; j++){\n")
+		fd.write("\t\t\taccumulator += quantized[j] * " + cname0 + "[i][j];\n")
+		fd.write("\t\t}\n")
+		fd.write("\t\t" + tname + "_product_t product = accumulator * " + cname2 + "[i];\n")
+		fd.write("\t\t" + tname + "_requantize_t scaled;\n")
+		fd.write("\t\tscaled.range() = product.range();\n")
+		fd.write("\t\toutputs[i] = scaled;\n")
+		fd.write("\t}\n")
+
+	def __gen_resource_matrix_vector(self, fd, idx, layer_multiplication, layer_addition):
+		# PE outputs by SIMD inputs per pipelined fold, coefficient rows and columns banked cyclically by the factors;
+		# products are accumulated in input order, so the results match the unfolded layers
+		rname  = "l" + str(idx+1) + "_resource_matrix_vector"
+		tname0 = self.__gen_type(idx)
+		tname1 = self.__gen_type(idx+1)
+		dname0 = "LAYER_" + str(idx+1) + "_INPUTS_OUTER"
+		dname1 = "LAYER_" + str(idx+1) + "_INPUTS_INNER"
+		dname2 = "LAYER_" + str(idx+1) + "_OUTPUTS"
+		dname3 = "LAYER_" + str(idx) + "_INPUTS"
+		fname0 = "LAYER_" + str(idx) + "_SIMD"
+		fname1 = "LAYER_" + str(idx) + "_PE"
+		cname0 = "l" + str(idx) + "_coef_multiplication"
+		cname1 = "l" + str(idx+1) + "_coef_addition"
+		fd.write("void " + rname + "(" + tname1 + " outputs[" + dname2 + "], " + tname0 + " inputs[" + dname3 + "])\n")
+		fd.write("{\n")
+		cnames = [cname0]
+		if self.is_shift_add(idx):
+			cnames = [cname0 + table + str(term) for term in range(0, self.shift_terms) for table in ("_sign", "_shift")]
+		for cname in cnames:
+			fd.write("#pragma HLS ARRAY_PARTITION variable=" + cname + " cyclic factor=" + str(layer_multiplication.pe) + " dim=1\n")
+			fd.write("#pragma HLS ARRAY_PARTITION variable=" + cname + " cyclic factor=" + str(layer_multiplication.simd) + " dim=2\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=" + cname1 + " cyclic factor=" + str(layer_multiplication.pe) + " dim=1\n")
+		fd.write("\t" + tname1 + " accumulator[" + fname1 + "];\n")
+		fd.write("#pragma HLS ARRAY_PARTITION variable=accumulator complete dim=1\n")
+		fd.write("\tfor(int nf=0; nf<" + dname0 + "/" + fname1 + "; nf++){\n")
+		fd.write("\t\tfor(int sf=0; sf<" + dname1 + "/" + fname0 + "; sf++){\n")
+		fd.write("\t\t#pragma HLS PIPELINE II=" + str(self.get_folded_interval(idx, layer_multiplication.simd)) + "\n")
+		fd.write("\t\t\tfor(int pe=0; pe<" + fname1 + "; pe++){\n")
+		fd.write("\t\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\t\tint i = nf*" + fname1 + " + pe;\n")
+		fd.write("\t\t\t\tif(sf == 0){\n")
+		fd.write("\t\t\t\t\taccumulator[pe] = " + cname1 + "[i];\n")
+		fd.write("\t\t\t\t}\n")
+		fd.write("\t\t\t\tfor(int simd=0; simd<" + fname0 + "; simd++){\n")
+		fd.write("\t\t\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\t\t\tint j = sf*" + fname0 + " + simd;\n")
+		self.__gen_product(fd, "\t\t\t\t\t", idx, tname0 + " product", "product", "inputs[j]", "[i][j]")
+		fd.write("\t\t\t\t\taccumulator[pe] += " + self.__gen_cast_expression(idx, idx+1, "product") + ";\n")
+		fd.write("\t\t\t\t}\n")
+		fd.write("\t\t\t\tif(sf == " + dname1 + "/" + fname0 + "-1){\n")
+		fd.write("\t\t\t\t\toutputs[i] = accumulator[pe];\n")
+		fd.write("\t\t\t\t}\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+	def __gen_resource_abft_checksum_multiplication(self, fd, idx, layer):
+		rname  = "l" + str(idx) + "_resource_abft_checksum"
+		dname0 = "LAYER_" + str(idx) + "_OUTPUTS_INNER"
+		dname1 = "LAYER_" + str(idx) + "_INPUTS"
+		cname  = "l" + str(idx) + "_coef_checksum"
+		mname  = "l" + str(idx) + "_coef_checksum_magnitude"
+		if self.__abft_is_relative():
+			fd.write("void " + rname + "(abft_t outputs[" + dname0 + "], abft_t magnitudes[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		else:
+			fd.write("void " + rname + "(abft_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer.resources) + " operation\n")
+		fd.write("\tfor(int j=0; j<" + dname0 + "; j++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\toutputs[j] = inputs[j] * " + cname + "[j];\n")
+		if self.__abft_is_relative():
+			fd.write("\t\tmagnitudes[j] = (inputs[j] < 0 ? (nn_t)-inputs[j] : inputs[j]) * " + mname + "[j];\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+	def __gen_resource_abft_checksum_addition(self, fd, idx, layer):
+		rname  = "l" + str(idx) + "_resource_abft_checksum"
+		dname0 = "LAYER_" + str(idx) + "_INPUTS_INNER"
+		cname  = "l" + str(idx) + "_coef_checksum"
+		mname  = "l" + str(idx) + "_coef_checksum_magnitude"
+		if self.__abft_is_relative():
+			fd.write("void " + rname + "(abft_t *output, abft_t *magnitude, abft_t inputs[" + dname0 + "], abft_t magnitudes[" + dname0 + "])\n")
+		else:
+			fd.write("void " + rname + "(abft_t *output, abft_t inputs[" + dname0 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		fd.write("#pragma HLS ALLOCATION instances=add limit=" + str(layer.resources) + " operation\n")
+		fd.write("\tabft_t sum = " + cname + ";\n")
+		if self.__abft_is_relative():
+			fd.write("\tabft_t sum_magnitude = " + mname + ";\n")
+		fd.write("\tfor(int j=0; j<" + dname0 + "; j++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tsum += inputs[j];\n")
+		if self.__abft_is_relative():
+			fd.write("\t\tsum_magnitude += magnitudes[j];\n")
+		fd.write("\t}\n")
+		fd.write("\t*output = sum;\n")
+		if self.__abft_is_relative():
+			fd.write("\t*magnitude = sum_magnitude;\n")
+		fd.write("}\n\n")
+
+	@_resource_generator("activation_tansig")
 	def __gen_resource_activation_tansig(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_activation_tansig"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_activation_tansig"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
@@ -741,15 +2142,17 @@ class nn:
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("activation_tansig_lut")
 	def __gen_resource_activation_tansig_lut(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_activation_tansig_lut"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=tanh limit=" + str(layer['resources']) + " function\n")
-		fd.write("#pragma HLS ALLOCATION instances=tanh_saturate limit=" + str(layer['resources']) + " function\n")
+		fd.write("#pragma HLS ALLOCATION instances=tanh limit=" + str(layer.resources) + " function\n")
+		fd.write("#pragma HLS ALLOCATION instances=tanh_saturate limit=" + str(layer.resources) + " function\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\tlut_in_t input_saturated = tanh_saturate(inputs[i]);\n")
@@ -757,179 +2160,206 @@ class nn:
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("activation_linear")
 	def __gen_resource_activation_linear(self, fd, idx, layer):
 		rname  = "l" + str(idx) + "_resource_activation_linear"
+		tname  = self.__gen_type(idx)
 		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
 		dname1 = "LAYER_" + str(idx) + "_INPUTS"
 		cname  = "l" + str(idx) + "_coef_activation_linear"
-		fd.write("void " + rname + "(nn_t outputs[" + dname0 + "], nn_t inputs[" + dname1 + "])\n")
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
 		fd.write("{\n")
 		self.generate_pragmas_pipeline(fd)
-		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer['resources']) + " operation\n")
+		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer.resources) + " operation\n")
 		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
 		fd.write("\t#pragma HLS UNROLL\n")
 		fd.write("\t\toutputs[i] = inputs[i] * " + cname + "[i];\n")
 		fd.write("\t}\n")
 		fd.write("}\n\n")
 
+	@_resource_generator("activation_relu")
+	def __gen_resource_activation_relu(self, fd, idx, layer):
+		rname  = "l" + str(idx) + "_resource_activation_relu"
+		tname  = self.__gen_type(idx)
+		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
+		dname1 = "LAYER_" + str(idx) + "_INPUTS"
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tif(inputs[i] > (" + tname + ")0){\n")
+		fd.write("\t\t\toutputs[i] = inputs[i];\n")
+		fd.write("\t\t}else{\n")
+		fd.write("\t\t\toutputs[i] = (" + tname + ")0;\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+	@_resource_generator("activation_hardtanh")
+	def __gen_resource_activation_hardtanh(self, fd, idx, layer):
+		rname  = "l" + str(idx) + "_resource_activation_hardtanh"
+		tname  = self.__gen_type(idx)
+		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
+		dname1 = "LAYER_" + str(idx) + "_INPUTS"
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tif(inputs[i] > (" + tname + ")1.0){\n")
+		fd.write("\t\t\toutputs[i] = (" + tname + ")1.0;\n")
+		fd.write("\t\t}else if(inputs[i] < (" + tname + ")-1.0){\n")
+		fd.write("\t\t\toutputs[i] = (" + tname + ")-1.0;\n")
+		fd.write("\t\t}else{\n")
+		fd.write("\t\t\toutputs[i] = inputs[i];\n")
+		fd.write("\t\t}\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
+	@_resource_generator("activation_pwl")
+	def __gen_resource_activation_pwl(self, fd, idx, layer):
+		rname  = "l" + str(idx) + "_resource_activation_pwl"
+		tname  = self.__gen_type(idx)
+		dname0 = "LAYER_" + str(idx) + "_OUTPUTS"
+		dname1 = "LAYER_" + str(idx) + "_INPUTS"
+		cname  = "l" + str(idx) + "_coef_activation_pwl"
+		fd.write("void " + rname + "(" + tname + " outputs[" + dname0 + "], " + tname + " inputs[" + dname1 + "])\n")
+		fd.write("{\n")
+		self.generate_pragmas_pipeline(fd)
+		fd.write("#pragma HLS ALLOCATION instances=Mul limit=" + str(layer.resources) + " operation\n")
+		fd.write("\tfor(int i=0; i<" + dname0 + "; i++){\n")
+		fd.write("\t#pragma HLS UNROLL\n")
+		fd.write("\t\tint segment = 0;\n")
+		fd.write("\t\tfor(int k=1; k<" + str(len(layer.coef)) + "; k++){\n")
+		fd.write("\t\t#pragma HLS UNROLL\n")
+		fd.write("\t\t\tif(inputs[i] >= " + cname + "[k][0]){\n")
+		fd.write("\t\t\t\tsegment = k;\n")
+		fd.write("\t\t\t}\n")
+		fd.write("\t\t}\n")
+		fd.write("\t\t" + tname + " product = inputs[i] * " + cname + "[segment][1];\n")
+		fd.write("\t\toutputs[i] = product + " + cname + "[segment][2];\n")
+		fd.write("\t}\n")
+		fd.write("}\n\n")
+
 	def __parse_configuration_layers(self):
-		for layer in self.json:
-			self.layers[str(self.current_layer)] = {
-			'type'     : layer['type'], 
-			'inputs'   : layer['inputs'], 
-			'outputs'  : layer['outputs'], 
-			'resources': DEFAULT_RESOURCE_COUNT,
-			'coef'     : layer['coefficients'],
-			'execution': 0}
+		for entry in self.json:
+			self.layers.append(layer(
+				entry['type'],
+				entry['inputs'],
+				entry['outputs'],
+				entry.get('coefficients'),
+				entry.get('coefficients_file')))
 
 			self.__increment_current_layer()
 
 	def __increment_current_layer(self):
 		self.current_layer = self.current_layer + 1
 
-	def __get_inout_count(self, input_string):
-		if input_string.find('x') == -1:
-			return int(input_string)
-		else:
-			return int(input_string.split('x')[0])*int(input_string.split('x')[1])
-
-	def __type_should_have_coefficients(self, type):
-		if type == "normalization_input_offset":
-			return True
-		if type == "normalization_input_gain":
-			return True
-		if type == "normalization_input_min":
-			return True
-		if type == "normalization_output_offset":
-			return True
-		if type == "normalization_output_gain":
-			return True
-		if type == "normalization_output_min":
-			return True
-		if type == "multiplication":
-			return True
-		if type == "addition":
-			return True
-		if type == "activation_linear":
-			return True
-		
-		return False
-
-
-	def __get_min_execution_time(self, layer):
-		if layer['type'] == "normalization_input_offset":
-			return 1
-		elif layer['type'] == "normalization_input_gain":
-			return 1
-		elif layer['type'] == "normalization_input_min":
-			return 1
-		elif layer['type'] == "normalization_output_offset":
-			return 1
-		elif layer['type'] == "normalization_output_gain":
-			return 1
-		elif layer['type'] == "normalization_output_min":
-			return 1
-		elif layer['type'] == "multiplication":
-			return 1
-		elif layer['type'] == "addition":
-			return math.ceil(math.log(int(layer['inputs'].split('x')[1]) + 1,2))
-		elif layer['type'] == "activation_tansig":
-			return 1
-		elif layer['type'] == "activation_tansig_lut":
-			return 1
-		elif layer['type'] == "activation_linear":
-			return 1
+	def __abft_is_relative(self):
+		# floating point checks scale their tolerance with the magnitude of the compared terms
+		return self.dtype in ("float", "double")
+
+	def __abft_coefficients(self, idx):
+		# (layer index, name, kind, values) of the checksum coefficients guarding the multiplication at idx
+		if not self.is_abft_checked(idx):
+			return []
+		coef = self.layers[idx].coef
+		bias = self.layers[idx+1].coef
+		if not self.__abft_is_relative():
+			# sums of the coefficients as nn_t holds them are exact, the products remain the only rounding
+			format = parse_fixed_format(self.dtype)
+			coef   = format.quantize(coef)
+			bias   = format.quantize(bias)
+
+		coefficients = [(idx, "checksum", "array_1D", np.sum(coef, axis=0))]
+		if self.__abft_is_relative():
+			coefficients.append((idx, "checksum_magnitude", "array_1D", np.sum(np.abs(coef), axis=0)))
+		if self.abft == "column":
+			coefficients.append((idx+1, "checksum", "value", float(np.sum(bias))))
+			if self.__abft_is_relative():
+				coefficients.append((idx+1, "checksum_magnitude", "value", float(np.sum(np.abs(bias)))))
+		return coefficients
+
+	def __abft_tolerance(self, idx):
+		if self.abft_tolerance is not None:
+			return self.abft_tolerance
+
+		# roundings on the reference and on the checksum side of one comparison, row: the outer products
+		# of one column against one checksum product, column: every product against every checksum product
+		outer, inner = self.layers[idx].outputs_shape
+		if self.abft == "column":
+			reference, checksum = outer * inner, inner
 		else:
-			raise ValueError('This layer type is not supported')
-
+			reference, checksum = outer, 1
+
+		# float/double: every product, addition and checksum coefficient rounds by at most eps/2 of the
+		# magnitude of the terms, generated code multiplies the bound by that magnitude
+		if self.dtype == "float":
+			return ABFT_EPSILON_FLOAT * (outer + checksum + 2)
+		elif self.dtype == "double":
+			return ABFT_EPSILON_DOUBLE * (outer + checksum + 2)
+
+		# fixed point additions are exact, each product truncates by less than one ulp on the same side
+		# or rounds by at most half an ulp either way
+		format = parse_fixed_format(self.dtype)
+		if format.quantization == "AP_RND":
+			return (reference + checksum) * 0.5 / format.scale
+		return max(reference, checksum) / format.scale
+
+	def __get_min_execution_time_abft(self, idx):
+		# comparison tree behind the checked layer
+		if self.abft == "row" and self.is_abft_checked(idx):
+			return math.ceil(math.log(self.layers[idx].outputs_shape[0] + 1, 2)) + 1
+		if self.abft == "column" and idx > 0 and self.is_abft_checked(idx-1):
+			return math.ceil(math.log(self.layers[idx].outputs_count + 1, 2)) + 1
+		return 0
+
+	def __parse_configuration_get_execution_time_abft(self, idx, layer, resources):
+		# checksum row shares the layer's operators, the comparison follows it
+		# float/double checks additionally compute the magnitude of their terms
+		words = 2 if self.__abft_is_relative() else 1
+		if self.is_abft_checked(idx):
+			inner = layer.outputs_shape[1]
+			return RESOURCE_EXECUTION_MULTIPLICATION * words * inner / resources + self.__get_min_execution_time_abft(idx)
+		if self.abft == "column" and idx > 0 and self.is_abft_checked(idx-1):
+			inner = layer.inputs_shape[1]
+			return RESOURCE_EXECUTION_ADDITION * words * (inner + 1) / resources + self.__get_min_execution_time_abft(idx)
+		return 0
 
 	def __parse_configuration_set_execution_time(self):
-		for idx in self.layers:
+		self.__update_nonzeros()
+		for idx in range(0, self.current_layer):
 			layer = self.layers[idx]
-			input_count  = self.__get_inout_count(layer['inputs'])
-			output_count = self.__get_inout_count(layer['outputs'])
-			if layer['type'] == "normalization_input_offset":
-				layer['execution'] = self.__parse_configuration_get_execution_time_offset(input_count, output_count, layer['resources'])
-			elif layer['type'] == "normalization_input_gain":
-				layer['execution'] = self.__parse_configuration_get_execution_time_mulitplication(input_count, output_count, layer['resources'])
-			elif layer['type'] == "normalization_input_min":
-				layer['execution'] = self.__parse_configuration_get_execution_time_offset(input_count, output_count, layer['resources'])
-			elif layer['type'] == "normalization_output_offset":
-				layer['execution'] = self.__parse_configuration_get_execution_time_offset(input_count, output_count, layer['resources'])
-			elif layer['type'] == "normalization_output_gain":
-				layer['execution'] = self.__parse_configuration_get_execution_time_mulitplication(input_count, output_count, layer['resources'])
-			elif layer['type'] == "normalization_output_min":
-				layer['execution'] = self.__parse_configuration_get_execution_time_offset(input_count, output_count, layer['resources'])
-			elif layer['type'] == "multiplication":
-				layer['execution'] = self.__parse_configuration_get_execution_time_mulitplication(input_count, output_count, layer['resources'])
-			elif layer['type'] == "addition":
-				layer['execution'] = self.__parse_configuration_get_execution_time_addition(layer['inputs'], layer['resources'])
-			elif layer['type'] == "activation_tansig":
-				layer['execution'] = self.__parse_configuration_get_execution_time_activation_tansig(input_count, output_count, layer['resources'])
-			elif layer['type'] == "activation_tansig_lut":
-				layer['execution'] = self.__parse_configuration_get_execution_time_activation_tansig_lut(input_count, output_count, layer['resources'])
-			elif layer['type'] == "activation_linear":
-				layer['execution'] = self.__parse_configuration_get_execution_time_activation_linear(input_count, output_count, layer['resources'])
-			else:
-				raise ValueError('This layer type is not supported')
-
-	def __parse_configuration_get_execution_time_addition(self, inputs, resources):
-		inputs_outer = int(inputs.split('x')[1])
-		inputs_inner = int(inputs.split('x')[0])
-
-		input_array = np.repeat(inputs_inner+1, inputs_outer)
-		return self.__parse_configuration_execution_time_addition_recursive(input_array, resources, 0)
-
-
-	def __parse_configuration_execution_time_addition_recursive(self, inputs_array, resources_max, resources_carry):
-		resources_used = resources_carry
-		for i in range(0, len(inputs_array)):
-			if inputs_array[i] == 1:
-				continue
+			layer.execution = self.__get_execution_time(idx, layer, layer.resources)
 
-			# update resources, input/output count
-			resources_used = resources_used + inputs_array[i]/2
-			inputs_array[i] = inputs_array[i] - inputs_array[i]/2
+	def __get_execution_time(self, idx, layer, resources):
+		if self.is_folded(idx):
+			return layer.get_folded_execution_time(layer.simd, layer.pe, self.get_folded_interval(idx, layer.simd)) + self.__parse_configuration_get_execution_time_abft(idx, layer, resources)
+		if idx > 0 and self.is_folded(idx-1):
+			# adder chain of one fold, pipelined behind the products
+			return RESOURCE_EXECUTION_ADDITION * self.layers[idx-1].simd + self.__parse_configuration_get_execution_time_abft(idx, layer, resources)
+		return layer.get_execution_time(resources) + self.__parse_configuration_get_execution_time_abft(idx, layer, resources)
 
-		# calculate delay
-		delay = resources_used / resources_max
-		resources_carry = resources_used % resources_max
-		
-		# check if recursive call
-		for i in inputs_array:
-			if i != 1:
-				return delay + self.__parse_configuration_execution_time_addition_recursive(inputs_array, resources_max, resources_carry)
-
-		# no recursion, return
-		if resources_carry == 0:
-			return delay
+	def generate_pragmas_interface(self, fd):
+		if self.argmax_rotations is not None:
+			outputs = [name for declaration, name in self.__gen_argmax_ports()]
 		else:
-			return delay + 1
-
-
-	def __parse_configuration_get_execution_time_mulitplication(self, inputs, outputs, resources):
-		return RESOURCE_EXECUTION_MULTIPLICATION *outputs / resources
-
-	def __parse_configuration_get_execution_time_offset(self, inputs, outputs, resources):
-		return RESOURCE_EXECUTION_ADDITION * inputs / resources
+			outputs = ["outputs"]
 
-	def __parse_configuration_get_execution_time_activation_tansig(self, inputs, outputs, resources):
-		return RESOURCE_EXECUTION_ACTIVATION_TANSIG * inputs / resources
-
-	def __parse_configuration_get_execution_time_activation_tansig_lut(self, inputs, outputs, resources):
-		return RESOURCE_EXECUTION_ACTIVATION_TANSIG_LUT * inputs / resources
-
-	def __parse_configuration_get_execution_time_activation_linear(self, inputs, outputs, resources):
-		return RESOURCE_EXECUTION_ACTIVATION_LINEAR *outputs / resources
-
-	def generate_pragmas_interface(self, fd):
 		if self.interface == "s_axilite":
-			fd.write("#pragma HLS INTERFACE s_axilite port=outputs\n")
+			for name in outputs:
+				fd.write("#pragma HLS INTERFACE s_axilite port=" + name + "\n")
 			fd.write("#pragma HLS INTERFACE s_axilite port=inputs\n")
+			if self.abft != "none":
+				fd.write("#pragma HLS INTERFACE s_axilite port=abft_error\n")
 			fd.write("#pragma HLS INTERFACE s_axilite port=return\n")
 		elif self.interface == "s_axis":
-			fd.write("#pragma HLS INTERFACE axis register both port=outputs\n")
+			for name in outputs:
+				fd.write("#pragma HLS INTERFACE axis register both port=" + name + "\n")
 			fd.write("#pragma HLS INTERFACE axis register both port=input\n")
+			if self.abft != "none":
+				fd.write("#pragma HLS INTERFACE ap_none port=abft_error\n")
 			fd.write("#pragma HLS INTERFACE ap_ctrl_none port=return\n")
 		else:
 			raise ValueError('Interface type is not supported')
@@ -0,0 +1,418 @@
+import os
+import json
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from c_nn_fixed import *
+
+# repr: values exactly as given by the topology
+# nn_t: values rounded to nn_t, shortest decimal that reads back to the same nn_t
+# hex:  values rounded to nn_t, fixed width hexadecimal floating point literals formatted entirely in numpy
+COEF_FORMATS        = ("repr", "nn_t", "hex")
+DEFAULT_COEF_FORMAT = "repr"
+DATA_CHUNK_ELEMENTS = 1 << 16
+DATA_PARALLEL_MIN   = 1 << 20
+DEFAULT_TEST_CHUNK  = 1024
+
+# text: literals #included by nn.cpp and main.cpp
+# binary: additionally raw little-endian blobs, loaded through mmap by csim and numpy.memmap by Python
+DATA_FORMATS        = ("text", "binary")
+DEFAULT_DATA_FORMAT = "text"
+
+BLOB_MAGIC   = b"NNDT"
+BLOB_VERSION = 1
+BLOB_KINDS   = ("float", "double", "fixed")
+BLOB_DIMS    = 4
+BLOB_HEADER  = np.dtype([
+	('magic',        'S4'),
+	('version',      '<u4'),
+	('kind',         '<u4'),
+	('dims',         '<u4'),
+	('shape',        '<u4', (BLOB_DIMS,)),
+	('width',        '<i4'),
+	('width_whole',  '<i4'),
+	('signed',       '<i4'),
+	('quantization', '<i4'),
+	('overflow',     '<i4'),
+	('reserved',     'V12')])
+BLOB_ELEMENT = {"float": '<f4', "double": '<f8', "fixed": '<i8'}
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+MANIFEST_NAME    = '.nn_manifest.json'
+MANIFEST_VERSION = 1
+
+
+class output_manifest:
+	# content hashes of every generated file, a file is only rewritten when its content changes
+	def __init__(self, path):
+		self.path      = path
+		self.fpath     = path + "/" + MANIFEST_NAME
+		self.entries   = {}
+		self.written   = []
+		self.unchanged = []
+		if os.path.exists(self.fpath):
+			with open(self.fpath) as fd:
+				manifest = json.load(fd)
+			if manifest.get('version') == MANIFEST_VERSION:
+				self.entries = manifest['files']
+
+	def is_current(self, fpath, source):
+		# source digest of the inputs a file was generated from, lets callers skip formatting entirely
+		entry = self.entries.get(self.__key(fpath))
+		if entry is None or entry['source'] is None or entry['source'] != source or not self.__is_intact(fpath, entry):
+			return False
+		self.unchanged.append(fpath)
+		return True
+
+	def write(self, fpath, data, source=None):
+		if isinstance(data, str):
+			data = data.encode()
+		digest = hashlib.sha256(data).hexdigest()
+		key    = self.__key(fpath)
+		if self.__get_digest(fpath, self.entries.get(key)) == digest:
+			self.__set_entry(key, fpath, digest, source)
+			self.unchanged.append(fpath)
+			return False
+
+		with open(fpath, "wb") as fd:
+			fd.write(data)
+		self.__set_entry(key, fpath, digest, source)
+		self.written.append(fpath)
+		return True
+
+	def save(self):
+		with open(self.fpath + ".tmp", "w") as fd:
+			json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, fd, indent=1, sort_keys=True)
+		os.replace(self.fpath + ".tmp", self.fpath)
+
+	def show_summary(self):
+		print("files written: " + str(len(self.written)) + ", unchanged: " + str(len(self.unchanged)))
+		for fpath in self.written:
+			print("  changed \"" + fpath + "\"")
+
+	def __key(self, fpath):
+		return os.path.relpath(fpath, self.path)
+
+	def __is_intact(self, fpath, entry):
+		# a file edited or removed behind the generator's back is regenerated
+		if not os.path.exists(fpath):
+			return False
+		stat = os.stat(fpath)
+		return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime']
+
+	def __get_digest(self, fpath, entry):
+		# digest of the file on disk, hashed again only when it was touched since the last run
+		if entry is not None and self.__is_intact(fpath, entry):
+			return entry['digest']
+		if not os.path.exists(fpath):
+			return None
+		with open(fpath, "rb") as fd:
+			return hashlib.sha256(fd.read()).hexdigest()
+
+	def __set_entry(self, key, fpath, digest, source):
+		stat = os.stat(fpath)
+		self.entries[key] = {'digest': digest, 'source': source, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def format_coef(values, coef_format, dtype):
+	# list of C literals for a 1D sequence of values
+	if coef_format == "repr":
+		if isinstance(values, np.ndarray):
+			values = values.tolist()
+		return list(map(str, values))
+	elif coef_format not in COEF_FORMATS:
+		raise ValueError('Coefficient format is not supported')
+
+	values, suffix = _round_nn_t(values, dtype)
+	if coef_format == "hex":
+		return [literal.tobytes().decode() for literal in _format_hex(values, dtype)]
+	literals = values.astype(str).tolist()
+	if suffix:
+		literals = [literal + suffix for literal in literals]
+	return literals
+
+
+def format_data(kind, values, coef_format, dtype):
+	# text of one .dat file, kind is "value", "array_1D" or "array_2D"
+	if coef_format == "hex" and kind != "value":
+		return _format_data_hex(kind, values, dtype)
+	if kind == "value":
+		return format_coef([values], coef_format, dtype)[0] + "\n"
+	elif kind == "array_1D":
+		return _format_row(values, coef_format, dtype) + "\n"
+	elif kind == "array_2D":
+		return _format_rows(values, coef_format, dtype) + "\n"
+	else:
+		raise ValueError('Data file kind is not supported')
+
+
+def write_data_files(files, coef_format, dtype, workers=None, manifest=None):
+	# files: list of (fpath, kind, values), every file is written with a single buffered write
+	# files generated from the same values in the same format are not formatted again
+	sources = [None] * len(files)
+	if manifest is not None:
+		sources = [_source_digest(kind, values, coef_format, dtype) for fpath, kind, values in files]
+		current = [manifest.is_current(fpath, source) for (fpath, kind, values), source in zip(files, sources)]
+		sources = [source for source, skip in zip(sources, current) if not skip]
+		files   = [file for file, skip in zip(files, current) if not skip]
+
+	for fpath, kind, values in files:
+		print("generating \"" + fpath + "\"")
+
+	if workers is None:
+		workers = os.cpu_count()
+	elements = sum(_count_elements(kind, values) for fpath, kind, values in files)
+
+	if workers == 1 or elements < DATA_PARALLEL_MIN:
+		texts = [format_data(kind, values, coef_format, dtype) for fpath, kind, values in files]
+	else:
+		# large 2D arrays are split into row chunks so a single layer is formatted in parallel too
+		tasks = []
+		owner = []
+		for idx in range(0, len(files)):
+			fpath, kind, values = files[idx]
+			if kind != "array_2D":
+				tasks.append((kind, values))
+				owner.append(idx)
+				continue
+			step = max(1, DATA_CHUNK_ELEMENTS // max(1, _count_elements(kind, values[:1])))
+			for start in range(0, len(values), step):
+				tasks.append(("rows", values[start:start+step]))
+				owner.append(idx)
+
+		with ProcessPoolExecutor(max_workers=workers, initializer=_data_worker_init, initargs=(coef_format, dtype)) as pool:
+			parts = list(pool.map(_data_worker, tasks))
+
+		chunks = [[] for idx in range(0, len(files))]
+		for idx, part in zip(owner, parts):
+			chunks[idx].append(part)
+		for idx in range(0, len(files)):
+			if files[idx][1] == "array_2D":
+				chunks[idx].append("\n")
+		texts = ["".join(chunk) for chunk in chunks]
+
+	for (fpath, kind, values), text, source in zip(files, texts, sources):
+		_write_output(fpath, text, source, manifest)
+
+
+def write_blob_files(files, dtype, manifest=None):
+	# files: list of (fpath, kind, values) as for write_data_files
+	for fpath, kind, values in files:
+		print("generating \"" + fpath + "\"")
+		source = None
+		if manifest is not None:
+			source = _source_digest(kind, values, "blob", dtype)
+			if manifest.is_current(fpath, source):
+				continue
+		_write_output(fpath, format_blob(values, dtype), source, manifest)
+
+
+def write_blob(fpath, values, dtype):
+	with open(fpath, "wb") as fd:
+		fd.write(format_blob(values, dtype))
+
+
+def format_blob(values, dtype):
+	# header followed by the values converted to nn_t, fixed point as raw two's complement int64
+	values = np.asarray(values, dtype=np.float64)
+	return _blob_header(values.shape, dtype).tobytes() + _blob_data(values, dtype).tobytes()
+
+
+class blob_writer:
+	# blob appended row by row along its first dimension, close() completes the row count in the header
+	def __init__(self, fpath, row_shape, dtype):
+		self.fd        = open(fpath, "wb")
+		self.row_shape = tuple(row_shape)
+		self.dtype     = dtype
+		self.rows      = 0
+		self.fd.write(_blob_header((0,) + self.row_shape, dtype).tobytes())
+
+	def write(self, values):
+		values = np.asarray(values, dtype=np.float64).reshape((-1,) + self.row_shape)
+		self.fd.write(_blob_data(values, self.dtype).tobytes())
+		self.rows = self.rows + values.shape[0]
+
+	def close(self):
+		self.fd.seek(0)
+		self.fd.write(_blob_header((self.rows,) + self.row_shape, self.dtype).tobytes())
+		self.fd.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+def write_test_vectors(fpath, inputs, outputs, targets, dtype, chunk=DEFAULT_TEST_CHUNK):
+	# one blob row per test vector, its inputs followed by the expected outputs and the targets, converted to nn_t
+	# chunk by chunk; memory stays bounded for memmapped arrays of any length
+	print("generating \"" + fpath + "\"")
+	count = len(inputs)
+	if len(outputs) != count or len(targets) != count:
+		raise ValueError('Test inputs, outputs and targets must have the same count')
+	width = sum(int(np.prod(np.shape(values)[1:])) for values in (inputs, outputs, targets))
+	with blob_writer(fpath, (width,), dtype) as writer:
+		for start in range(0, count, chunk):
+			stop = min(start + chunk, count)
+			writer.write(np.concatenate([np.asarray(values[start:stop], dtype=np.float64).reshape(stop - start, -1)
+				for values in (inputs, outputs, targets)], axis=1))
+	return count
+
+
+def _blob_header(shape, dtype):
+	if len(shape) > BLOB_DIMS:
+		raise ValueError('Blobs support up to ' + str(BLOB_DIMS) + ' dimensions')
+	header = np.zeros(1, dtype=BLOB_HEADER)
+	header['magic']   = BLOB_MAGIC
+	header['version'] = BLOB_VERSION
+	header['dims']    = len(shape)
+	header['shape'][0, :len(shape)] = shape
+	if dtype == "float" or dtype == "double":
+		kind = dtype
+	else:
+		kind   = "fixed"
+		fixed  = parse_fixed_format(dtype)
+		header['width']        = fixed.width
+		header['width_whole']  = fixed.width_whole
+		header['signed']       = fixed.signed
+		header['quantization'] = QUANTIZATION_MODES.index(fixed.quantization)
+		header['overflow']     = OVERFLOW_MODES.index(fixed.overflow)
+	header['kind'] = BLOB_KINDS.index(kind)
+	return header
+
+
+def _blob_data(values, dtype):
+	if dtype == "float" or dtype == "double":
+		return values.astype(BLOB_ELEMENT[dtype])
+	return parse_fixed_format(dtype).to_raw(values).astype(BLOB_ELEMENT["fixed"])
+
+
+def load_blob(fpath):
+	# zero-copy view of a blob, fixed point values are returned raw, see blob_to_real
+	header = np.fromfile(fpath, dtype=BLOB_HEADER, count=1)
+	if len(header) == 0 or header['magic'][0] != BLOB_MAGIC:
+		raise ValueError('File is not a data blob')
+	if header['version'][0] != BLOB_VERSION:
+		raise ValueError('Blob version is not supported')
+
+	kind  = BLOB_KINDS[header['kind'][0]]
+	shape = tuple(int(i) for i in header['shape'][0, :header['dims'][0]])
+	info  = {'kind': kind, 'shape': shape, 'format': None}
+	if kind == "fixed":
+		info['format'] = fixed_format(int(header['width'][0]), int(header['width_whole'][0]), bool(header['signed'][0]),
+			QUANTIZATION_MODES[header['quantization'][0]], OVERFLOW_MODES[header['overflow'][0]])
+
+	if int(np.prod(shape)) == 0:
+		return np.zeros(shape, dtype=BLOB_ELEMENT[kind]), info
+	return np.memmap(fpath, dtype=BLOB_ELEMENT[kind], mode='r', offset=BLOB_HEADER.itemsize, shape=shape), info
+
+
+def blob_to_real(values, info):
+	if info['kind'] == "fixed":
+		return info['format'].to_real(values)
+	return np.asarray(values, dtype=np.float64)
+
+
+def _write_output(fpath, data, source, manifest):
+	if manifest is not None:
+		manifest.write(fpath, data, source)
+		return
+	if isinstance(data, str):
+		data = data.encode()
+	with open(fpath, "wb") as fd:
+		fd.write(data)
+
+
+def _source_digest(kind, values, coef_format, dtype):
+	values = np.asarray(values, dtype=np.float64)
+	digest = hashlib.sha256((kind + "|" + coef_format + "|" + dtype + "|" + str(values.shape) + "|").encode())
+	digest.update(values.tobytes())
+	return digest.hexdigest()
+
+
+def _round_nn_t(values, dtype):
+	values = np.asarray(values, dtype=np.float64)
+	if dtype == "float":
+		# float literals, a double literal would be rounded twice
+		return values.astype(np.float32), "f"
+	elif dtype == "double":
+		return values, ""
+	return parse_fixed_format(dtype).quantize(values), ""
+
+
+def _format_hex(values, dtype):
+	# uint8 array (..., width) of literals [+-]0x1.<mantissa>p[+-]<exponent>
+	bits     = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+	exponent = ((bits >> np.uint64(52)) & np.uint64(0x7ff)).astype(np.int64)
+	mantissa = bits & np.uint64((1 << 52) - 1)
+	normal   = exponent != 0
+	exponent = np.where(normal, exponent - 1023, np.where(mantissa != 0, -1022, 0))
+
+	# a float keeps 24 significant bits, its literal needs 6 digits instead of 13
+	digits  = 6 if dtype == "float" else 13
+	columns = [
+		np.where(bits >> np.uint64(63), ord('-'), ord('+')),
+		np.full(bits.shape, ord('0')),
+		np.full(bits.shape, ord('x')),
+		np.where(normal, ord('1'), ord('0')),
+		np.full(bits.shape, ord('.'))]
+	for digit in range(0, digits):
+		columns.append(_HEX_DIGITS[(mantissa >> np.uint64(48 - 4 * digit)) & np.uint64(0xf)])
+	columns.append(np.full(bits.shape, ord('p')))
+	columns.append(np.where(exponent < 0, ord('-'), ord('+')))
+	for digit in (1000, 100, 10, 1):
+		columns.append(ord('0') + np.abs(exponent) // digit % 10)
+	if dtype == "float":
+		columns.append(np.full(bits.shape, ord('f')))
+	return np.stack(columns, axis=-1).astype(np.uint8)
+
+
+def _format_data_hex(kind, values, dtype):
+	values, suffix = _round_nn_t(values, dtype)
+	literals = _format_hex(values, dtype)
+	literals = np.concatenate([literals, np.full(literals.shape[:-1] + (1,), ord(','), dtype=np.uint8)], axis=-1)
+	if kind == "array_1D":
+		return literals.tobytes().decode() + "\n"
+
+	# every row becomes {<literals>},\n in one contiguous buffer
+	rows = literals.reshape(literals.shape[0], -1)
+	rows = np.concatenate([
+		np.full((rows.shape[0], 1), ord('{'), dtype=np.uint8),
+		rows,
+		np.tile(np.frombuffer(b"},\n", dtype=np.uint8), (rows.shape[0], 1))], axis=-1)
+	return rows.tobytes().decode() + "\n"
+
+
+def _count_elements(kind, values):
+	if kind == "value":
+		return 1
+	elif kind == "array_1D":
+		return len(values)
+	return sum(len(row) for row in values)
+
+
+def _format_row(values, coef_format, dtype):
+	literals = format_coef(values, coef_format, dtype)
+	if len(literals) == 0:
+		return ""
+	return ",".join(literals) + ","
+
+
+def _format_rows(rows, coef_format, dtype):
+	return "".join(["{" + _format_row(row, coef_format, dtype) + "},\n" for row in rows])
+
+
+_data_worker_args = None
+
+def _data_worker_init(coef_format, dtype):
+	global _data_worker_args
+	_data_worker_args = (coef_format, dtype)
+
+def _data_worker(task):
+	coef_format, dtype = _data_worker_args
+	kind, values = task
+	if kind == "rows":
+		return _format_rows(values, coef_format, dtype)
+	return format_data(kind, values, coef_format, dtype)
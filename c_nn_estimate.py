@@ -0,0 +1,288 @@
+import math
+import numpy as np
+from c_nn_fixed import *
+from c_nn_layer import DATAFLOW_STREAM_DEPTH
+
+# per operator instance, floating point cores as reported by Vivado HLS for 7-series at 100 MHz
+ESTIMATE_OPERATOR_FLOAT = {
+	'mul' : {'dsp': 3,  'lut': 128,  'ff': 143},
+	'add' : {'dsp': 2,  'lut': 214,  'ff': 227},
+	'cmp' : {'dsp': 0,  'lut': 66,   'ff': 0},
+	'tanh': {'dsp': 11, 'lut': 4800, 'ff': 3000}}
+ESTIMATE_OPERATOR_DOUBLE = {
+	'mul' : {'dsp': 11, 'lut': 299,   'ff': 260},
+	'add' : {'dsp': 3,  'lut': 445,   'ff': 627},
+	'cmp' : {'dsp': 0,  'lut': 130,   'ff': 0},
+	'tanh': {'dsp': 40, 'lut': 14000, 'ff': 9000}}
+# fixed point tanh of hls_math, per instance
+ESTIMATE_OPERATOR_FIXED_TANH = {'dsp': 4, 'lut': 1500, 'ff': 1200}
+
+ESTIMATE_DSP_WIDTH_A    = 25
+ESTIMATE_DSP_WIDTH_B    = 18
+ESTIMATE_BRAM_BITS      = 18432
+ESTIMATE_BRAM_PORTS     = 2
+ESTIMATE_LUTROM_BITS    = 64
+ESTIMATE_LUTROM_MAX     = 16384
+ESTIMATE_MUX_INPUTS_LUT = 4
+# narrow integer multipliers sharing one DSP, operands packed side by side into the wide input
+ESTIMATE_DSP_INTEGER_PACKING = {4: 4, 8: 2}
+
+# resource budgets, BRAM in 18Kb blocks
+DEVICES = {
+	"xc7z007s": {'dsp': 66,   'lut': 14400,  'ff': 28800,  'bram': 100},
+	"xc7z010" : {'dsp': 80,   'lut': 17600,  'ff': 35200,  'bram': 120},
+	"xc7z020" : {'dsp': 220,  'lut': 53200,  'ff': 106400, 'bram': 280},
+	"xc7a35t" : {'dsp': 90,   'lut': 20800,  'ff': 41600,  'bram': 100},
+	"xc7a100t": {'dsp': 240,  'lut': 63400,  'ff': 126800, 'bram': 270},
+	"xczu3eg" : {'dsp': 360,  'lut': 70560,  'ff': 141120, 'bram': 432},
+	"xczu9eg" : {'dsp': 2520, 'lut': 274080, 'ff': 548160, 'bram': 1824}}
+
+ESTIMATE_KEYS = ('dsp', 'lut', 'ff', 'bram')
+
+
+class estimator:
+	def __init__(self, network):
+		self.network = network
+		self.layers  = list(network.layers[0:network.current_layer])
+
+		if network.dtype == "float":
+			self.width     = 32
+			self.operators = ESTIMATE_OPERATOR_FLOAT
+		elif network.dtype == "double":
+			self.width     = 64
+			self.operators = ESTIMATE_OPERATOR_DOUBLE
+		else:
+			self.width     = parse_fixed_format(network.dtype).width
+			self.operators = self.__gen_operators_fixed(self.width)
+
+		# operators and containers of layers with their own data type are sized by it
+		self.layer_widths = []
+		for idx in range(0, len(self.layers)):
+			if self.layers[idx].dtype is None:
+				self.layer_widths.append((self.width, self.operators))
+			else:
+				width = parse_fixed_format(self.layers[idx].dtype).width
+				self.layer_widths.append((width, self.__gen_operators_fixed(width)))
+
+		# integer multiplications work on their narrow words, their additions keep nn_t outputs
+		for idx in range(0, len(self.layers)):
+			if network.is_integer(idx):
+				self.layer_widths[idx] = (network.integer_bits, self.__gen_operators_fixed(network.integer_bits))
+
+	def estimate(self):
+		# one entry per layer, registers of its output container included
+		estimates = []
+		width, operators = self.width, self.operators
+		for idx in range(0, len(self.layers)):
+			self.width, self.operators = self.layer_widths[idx]
+			estimates.append(self.__estimate_layer(idx, self.layers[idx]))
+		self.width, self.operators = width, operators
+
+		# partitioned input port, and the stream behind it in dataflow generation
+		estimates[0]['ff'] = estimates[0]['ff'] + self.layers[0].inputs_count * self.width
+		if self.network.dataflow_batch is not None:
+			estimates[0]['ff'] = estimates[0]['ff'] + DATAFLOW_STREAM_DEPTH * self.layers[0].inputs_count * self.width
+
+		# argmax output stage behind the last layer
+		if self.network.argmax_rotations is not None:
+			self.__add_argmax(estimates[-1], self.layers[-1].outputs_count)
+		return estimates
+
+	def total(self, estimates=None):
+		if estimates is None:
+			estimates = self.estimate()
+		total = dict.fromkeys(ESTIMATE_KEYS, 0)
+		for estimate in estimates:
+			for key in ESTIMATE_KEYS:
+				total[key] = total[key] + estimate[key]
+		return total
+
+	def check(self, device):
+		# names of the budgets exceeded on the device, empty when the configuration fits
+		if device not in DEVICES:
+			raise ValueError('Device is not supported')
+		total = self.total()
+		return [key for key in ESTIMATE_KEYS if total[key] > DEVICES[device][key]]
+
+	def show(self, device=None):
+		estimates = self.estimate()
+		print("| NUMBER |                     LAYER TYPE | RESOURCES | EXECUTION |    DSP |     LUT |      FF |   BRAM |")
+		for idx in range(0, len(self.layers)):
+			print("| %6.1d | %30s | %9d | %9d | %6d | %7d | %7d | %6d |"
+				%(idx,
+				self.layers[idx].type,
+				self.layers[idx].resources,
+				self.layers[idx].execution,
+				estimates[idx]['dsp'],
+				estimates[idx]['lut'],
+				estimates[idx]['ff'],
+				estimates[idx]['bram']))
+
+		total = self.total(estimates)
+		execution = sum(layer.execution for layer in self.layers)
+		print("| %6s | %30s | %9s | %9d | %6d | %7d | %7d | %6d |" %("", "total", "", execution, total['dsp'], total['lut'], total['ff'], total['bram']))
+		if device is not None:
+			budget = DEVICES[device]
+			print("| %6s | %30s | %9s | %9s | %6d | %7d | %7d | %6d |" %("", device, "", "", budget['dsp'], budget['lut'], budget['ff'], budget['bram']))
+			exceeded = self.check(device)
+			if len(exceeded) > 0:
+				print("WARNING: configuration does not fit " + device + " (" + ", ".join(exceeded) + ")")
+
+	def __gen_operators_fixed(self, width):
+		dsp = math.ceil(width / ESTIMATE_DSP_WIDTH_A) * math.ceil(width / ESTIMATE_DSP_WIDTH_B)
+		return {
+			'mul' : {'dsp': dsp, 'lut': width, 'ff': 2 * width},
+			'add' : {'dsp': 0,   'lut': width, 'ff': width},
+			'cmp' : {'dsp': 0,   'lut': width, 'ff': 0},
+			'tanh': ESTIMATE_OPERATOR_FIXED_TANH}
+
+	def __estimate_layer(self, idx, layer):
+		estimate = dict.fromkeys(ESTIMATE_KEYS, 0)
+		if self.network.is_folded(idx):
+			# every multiplier reads its own coefficient bank, only the inputs are multiplexed over the folds
+			if self.network.is_shift_add(idx):
+				self.__add_shift_add(estimate, layer.resources, layer.resources)
+			else:
+				self.__add_operator(estimate, 'mul', layer.resources, layer.resources)
+			fan_in = math.ceil(layer.outputs_shape[1] / layer.simd)
+			if fan_in > 1:
+				estimate['lut'] = estimate['lut'] + layer.resources * self.width * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1))
+		elif idx > 0 and self.network.is_folded(idx-1):
+			# one chained accumulator adder per multiplier of the engine
+			self.__add_operator(estimate, 'add', layer.resources, layer.resources)
+		elif self.network.is_integer(idx):
+			# packed multipliers, and the rounding and saturation of every input to an integer
+			self.__add_operator(estimate, 'mul', layer.resources, layer.get_operation_count())
+			estimate['dsp'] = math.ceil(layer.resources / ESTIMATE_DSP_INTEGER_PACKING[self.network.integer_bits])
+			estimate['lut'] = estimate['lut'] + layer.outputs_shape[1] * self.width
+		elif idx > 0 and self.network.is_integer(idx-1):
+			self.__add_integer_accumulate(estimate, layer)
+		elif layer.kind.operator == "tanh_lut":
+			self.__add_lut_tanh(estimate, layer.resources, layer.get_operation_count())
+		elif layer.kind.operator in ("relu", "hardtanh", "pwl"):
+			self.__add_compare(estimate, layer, layer.resources, layer.get_operation_count())
+		elif self.network.is_shift_add(idx):
+			self.__add_shift_add(estimate, layer.resources, layer.get_operation_count())
+		else:
+			self.__add_operator(estimate, layer.kind.operator, layer.resources, layer.get_operation_count())
+
+		# coefficient ROM, read by every operator instance in parallel, or one bank per multiplier of a folded engine;
+		# sparse layers hold their nonzero values only, the indices and shift-add terms become constants of the unrolled loops
+		shift_add = self.network.is_shift_add(idx)
+		if self.network.is_folded(idx) and not shift_add:
+			for bank in range(0, layer.resources):
+				self.__add_rom(estimate, math.ceil(int(np.size(layer.coef)) / layer.resources), self.width, 1)
+		elif layer.nonzeros is not None:
+			self.__add_rom(estimate, layer.nonzeros, self.width, layer.resources)
+		elif idx > 0 and self.network.is_integer(idx-1):
+			self.__add_rom(estimate, int(np.size(layer.coef)), INTEGER_ACCUMULATOR_WIDTH, layer.resources)
+			self.__add_rom(estimate, int(np.size(layer.coef)), INTEGER_MULTIPLIER_WIDTH, layer.resources)
+		elif layer.kind.coefficients in ("array_1D", "array_2D") and not shift_add:
+			self.__add_rom(estimate, int(np.size(layer.coef)), self.width, layer.resources)
+
+		# checksum row and comparators of the ABFT check guarding this layer, fixed point checks in abft_t
+		width_abft = self.width
+		if self.network.dtype not in ("float", "double"):
+			width_abft = self.width + self.network.get_abft_guard_bits()
+		if self.network.is_abft_checked(idx):
+			inner = layer.outputs_shape[1]
+			self.__add_rom(estimate, inner, width_abft, layer.resources)
+			if self.network.dtype in ("float", "double"):
+				# absolute checksum row scaling the tolerance
+				self.__add_rom(estimate, inner, width_abft, layer.resources)
+			if self.network.abft == "row":
+				estimate['lut'] = estimate['lut'] + inner * 2 * width_abft
+		if self.network.abft == "column" and idx > 0 and self.network.is_abft_checked(idx-1):
+			estimate['lut'] = estimate['lut'] + 2 * width_abft
+
+		# fully partitioned output_N container, fused multiplications accumulate without one
+		if not self.network.is_fused(idx):
+			estimate['ff'] = estimate['ff'] + layer.outputs_count * self.width
+			if self.network.dataflow_batch is not None:
+				estimate['ff'] = estimate['ff'] + DATAFLOW_STREAM_DEPTH * layer.outputs_count * self.width
+		return estimate
+
+	def __add_operator(self, estimate, operator, resources, operations):
+		cost = self.operators[operator]
+		for key in ('dsp', 'lut', 'ff'):
+			estimate[key] = estimate[key] + resources * cost[key]
+
+		# two operand multiplexers in front of every shared instance
+		fan_in = math.ceil(operations / resources)
+		if fan_in > 1:
+			estimate['lut'] = estimate['lut'] + 2 * resources * self.width * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1))
+
+	def __add_shift_add(self, estimate, resources, operations):
+		# one adder or negation per power of two term instead of a multiplier; a shared instance
+		# shifts by the amount of the coefficient at hand and multiplexes only the input operand
+		terms = self.network.shift_terms
+		cost  = self.operators['add']
+		for key in ('dsp', 'lut', 'ff'):
+			estimate[key] = estimate[key] + resources * terms * cost[key]
+
+		fan_in = math.ceil(operations / resources)
+		if fan_in > 1:
+			shifter = terms * self.width * math.ceil(math.log(self.width, 2))
+			estimate['lut'] = estimate['lut'] + resources * (shifter + self.width * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1)))
+
+	def __add_integer_accumulate(self, estimate, layer):
+		# INTEGER_ACCUMULATOR_WIDTH bit adders, and the requantization multipliers scaling the outputs back to nn_t,
+		# at most one per adder
+		resources  = layer.resources
+		operations = layer.get_operation_count()
+		adder = self.__gen_operators_fixed(INTEGER_ACCUMULATOR_WIDTH)['add']
+		for key in ('dsp', 'lut', 'ff'):
+			estimate[key] = estimate[key] + resources * adder[key]
+		dsp = math.ceil(INTEGER_ACCUMULATOR_WIDTH / ESTIMATE_DSP_WIDTH_A) * math.ceil(INTEGER_MULTIPLIER_WIDTH / ESTIMATE_DSP_WIDTH_B)
+		estimate['dsp'] = estimate['dsp'] + min(resources, layer.outputs_count) * dsp
+
+		fan_in = math.ceil(operations / resources)
+		if fan_in > 1:
+			estimate['lut'] = estimate['lut'] + 2 * resources * INTEGER_ACCUMULATOR_WIDTH * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1))
+
+	def __add_rom(self, estimate, elements, width, ports):
+		bits = elements * width
+		if bits <= ESTIMATE_LUTROM_MAX:
+			estimate['lut'] = estimate['lut'] + math.ceil(bits / ESTIMATE_LUTROM_BITS)
+		else:
+			estimate['bram'] = estimate['bram'] + max(math.ceil(bits / ESTIMATE_BRAM_BITS), math.ceil(ports / ESTIMATE_BRAM_PORTS))
+
+	def __add_lut_tanh(self, estimate, resources, operations):
+		network = self.network
+
+		# one ROM_1P_BRAM per tanh() instance plus the saturation comparators
+		for instance in range(0, resources):
+			self.__add_rom(estimate, 1 << network.width_lut_input, network.width_lut_output, 1)
+		estimate['lut'] = estimate['lut'] + resources * 2 * self.width
+
+		fan_in = math.ceil(operations / resources)
+		if fan_in > 1:
+			estimate['lut'] = estimate['lut'] + resources * self.width * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1))
+
+	def __add_compare(self, estimate, layer, resources, operations):
+		# comparators and an output multiplexer per instance, plus the multiply-add of a piecewise linear segment
+		if layer.kind.operator == "relu":
+			compares = 1
+		elif layer.kind.operator == "hardtanh":
+			compares = 2
+		else:
+			compares = len(layer.coef) - 1
+			for operator in ('mul', 'add'):
+				for key in ('dsp', 'lut', 'ff'):
+					estimate[key] = estimate[key] + resources * self.operators[operator][key]
+
+		cost = self.operators['cmp']
+		for key in ('dsp', 'lut', 'ff'):
+			estimate[key] = estimate[key] + resources * compares * cost[key]
+		estimate['lut'] = estimate['lut'] + resources * self.width * math.ceil(compares / (ESTIMATE_MUX_INPUTS_LUT - 1))
+
+		fan_in = math.ceil(operations / resources)
+		if fan_in > 1:
+			estimate['lut'] = estimate['lut'] + resources * self.width * math.ceil((fan_in - 1) / (ESTIMATE_MUX_INPUTS_LUT - 1))
+
+	def __add_argmax(self, estimate, count):
+		# comparison tree of count-1 comparators, each selecting a value and its index
+		index_width = max(1, math.ceil(math.log(count, 2)))
+		for key in ('dsp', 'lut', 'ff'):
+			estimate[key] = estimate[key] + (count - 1) * self.operators['cmp'][key]
+		estimate['lut'] = estimate['lut'] + (count - 1) * (self.width + index_width)
@@ -0,0 +1,226 @@
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from c_nn import *
+from c_nn_estimate import *
+
+DEFAULT_EXPLORE_CACHE = '.nn_explore_cache'
+EXPLORE_CACHE_VERSION = 2
+DEFAULT_SEARCH_WIDTH_MIN = 2
+
+
+class explorer:
+	def __init__(self, fname, inputs=None, labels=None, cache=DEFAULT_EXPLORE_CACHE, workers=None, device=None):
+		if device is not None and device not in DEVICES:
+			raise ValueError('Device is not supported')
+
+		self.fname   = fname
+		self.inputs  = inputs
+		self.labels  = labels
+		self.cache   = cache
+		self.workers = workers
+		self.device  = device
+
+		# every cached point is keyed by the topology and the calibration data it was evaluated on
+		digest = topology_digest(fname)
+		digest.update(str(EXPLORE_CACHE_VERSION).encode())
+		if inputs is not None:
+			digest.update(np.ascontiguousarray(inputs, dtype=np.float64).tobytes())
+			digest.update(np.ascontiguousarray(labels, dtype=np.int64).tobytes())
+		self.digest = digest.hexdigest()
+
+	def sweep(self, ii, dtypes=["float"], lut_inputs=[None], lut_outputs=[None], interfaces=[DEFAULT_INTERFACE]):
+		configurations = []
+		for point in itertools.product(ii, dtypes, lut_inputs, lut_outputs, interfaces):
+			configurations.append({
+				'ii'        : int(point[0]),
+				'dtype'     : point[1],
+				'lut_input' : point[2],
+				'lut_output': point[3],
+				'interface' : point[4]})
+
+		# only points missing from the cache are computed
+		results = [self.__cache_load(configuration) for configuration in configurations]
+		missing = [idx for idx in range(0, len(results)) if results[idx] is None]
+		print("sweep: " + str(len(configurations)) + " points, " + str(len(missing)) + " to compute")
+
+		if len(missing) > 0:
+			workers = self.workers
+			if workers is None:
+				workers = os.cpu_count()
+			tasks = [configurations[idx] for idx in missing]
+			if workers == 1:
+				computed = [explore_point(self.fname, task, self.inputs, self.labels) for task in tasks]
+			else:
+				with ProcessPoolExecutor(max_workers=workers, initializer=_explore_worker_init, initargs=(self.fname, self.inputs, self.labels)) as pool:
+					computed = list(pool.map(_explore_worker, tasks))
+			for idx, result in zip(missing, computed):
+				self.__cache_store(configurations[idx], result)
+				results[idx] = result
+
+		# points exceeding the device budget are never worth a synthesis run
+		if self.device is not None:
+			feasible = [result for result in results if _fits_device(result, self.device)]
+			print("sweep: " + str(len(results) - len(feasible)) + " points do not fit " + self.device)
+			results = feasible
+		return results
+
+	def search_widths(self, ii, dtype, max_loss, width_min=DEFAULT_SEARCH_WIDTH_MIN):
+		# walks the layers in order and narrows the fraction of each while the simulated accuracy on the
+		# calibration set stays within max_loss of the uniform dtype, narrowed layers stay narrowed
+		if self.inputs is None:
+			raise ValueError('Width search needs calibration inputs and labels')
+		obj = nn(self.fname)
+		obj.parse_configuration()
+		obj.update_configuration_max_execution(ii)
+		obj.set_dtype_fixed(dtype[0], dtype[1])
+		estimate  = estimator(obj).total()
+		reference = _accuracy(obj, self.inputs, self.labels)
+
+		for idx in range(0, obj.current_layer):
+			# accuracy is taken as monotone in the width, the narrowest passing one is bisected;
+			# the uniform width always passes as every earlier layer was narrowed against it
+			low  = max(width_min, dtype[1])
+			high = dtype[0]
+			while low < high:
+				width = (low + high) // 2
+				obj.set_layer_dtype_fixed(idx, width, dtype[1])
+				if _accuracy(obj, self.inputs, self.labels) >= reference - max_loss:
+					high = width
+				else:
+					low = width + 1
+			obj.set_layer_dtype_fixed(idx, high if high != dtype[0] else None, dtype[1])
+			print("search: layer " + str(idx) + " " + obj.get_layer_dtype(idx))
+
+		result = {
+			'ii'                : int(ii),
+			'dtype'             : list(dtype),
+			'widths'            : [parse_fixed_format(obj.get_layer_dtype(idx)).width for idx in range(0, obj.current_layer)],
+			'types'             : [obj.get_layer_dtype(idx) for idx in range(0, obj.current_layer)],
+			'accuracy_reference': reference,
+			'accuracy'          : _accuracy(obj, self.inputs, self.labels),
+			'estimate_reference': estimate,
+			'estimate'          : estimator(obj).total()}
+		return result
+
+	def __cache_path(self, configuration):
+		key = hashlib.sha256((self.digest + json.dumps(configuration, sort_keys=True)).encode()).hexdigest()
+		return self.cache + "/" + key + ".json"
+
+	def __cache_load(self, configuration):
+		fpath = self.__cache_path(configuration)
+		if not os.path.exists(fpath):
+			return None
+		with open(fpath) as fd:
+			return json.load(fd)
+
+	def __cache_store(self, configuration, result):
+		if not os.path.exists(self.cache):
+			os.makedirs(self.cache)
+		fpath = self.__cache_path(configuration)
+		with open(fpath + ".tmp", "w") as fd:
+			json.dump(result, fd)
+		os.replace(fpath + ".tmp", fpath)
+
+
+def explore_point(fname, configuration, inputs=None, labels=None):
+	obj = nn(fname)
+	obj.parse_configuration()
+	obj.update_configuration_max_execution(configuration['ii'])
+
+	dtype = configuration['dtype']
+	if dtype == "float" or dtype == "double":
+		obj.set_dtype(dtype)
+	else:
+		obj.set_dtype_fixed(dtype[0], dtype[1])
+	if configuration['lut_input'] is not None:
+		obj.set_dtype_fixed_LUT_input(configuration['lut_input'][0], configuration['lut_input'][1])
+	if configuration['lut_output'] is not None:
+		obj.set_dtype_fixed_LUT_output(configuration['lut_output'][0], configuration['lut_output'][1])
+	obj.set_interface(configuration['interface'])
+
+	layers = obj.layers[0:obj.current_layer]
+	result = dict(configuration)
+	result['execution'] = float(sum(layer.execution for layer in layers))
+	result['resources'] = [int(layer.resources) for layer in layers]
+	result['resources_total'] = int(sum(result['resources']))
+	result['estimate'] = estimator(obj).total()
+	result['accuracy'] = None
+	if inputs is not None:
+		result['accuracy'] = _accuracy(obj, inputs, labels)
+	return result
+
+
+def pareto_front(results):
+	# latency and resources are minimized, accuracy is maximized
+	def cost(result):
+		accuracy = result['accuracy'] if result['accuracy'] is not None else 0.0
+		return (result['execution'], result['resources_total'], -accuracy)
+
+	front = []
+	for result in results:
+		dominated = False
+		for other in results:
+			a = cost(other)
+			b = cost(result)
+			if all(x <= y for x, y in zip(a, b)) and a != b:
+				dominated = True
+				break
+		if not dominated:
+			front.append(result)
+	return sorted(front, key=cost)
+
+
+def show_pareto_front(front):
+	print("|   II | DATA TYPE | LUT INPUT | LUT OUTPUT | INTERFACE | EXECUTION | RESOURCES | ACCURACY |")
+	for result in front:
+		accuracy = "-" if result['accuracy'] is None else "%.4f" % result['accuracy']
+		print("| %4d | %9s | %9s | %10s | %9s | %9d | %9d | %8s |"
+			%(result['ii'],
+			_format_width(result['dtype']),
+			_format_width(result['lut_input']),
+			_format_width(result['lut_output']),
+			result['interface'],
+			result['execution'],
+			result['resources_total'],
+			accuracy))
+
+
+def show_widths(result):
+	print("| NUMBER |                                DATA TYPE |")
+	for idx in range(0, len(result['types'])):
+		print("| %6.1d | %40s |" %(idx, result['types'][idx]))
+	print("Accuracy: %.4f (uniform %.4f)" %(result['accuracy'], result['accuracy_reference']))
+	for key in ESTIMATE_KEYS:
+		print("%4s: %7d (uniform %7d)" %(key.upper(), result['estimate'][key], result['estimate_reference'][key]))
+
+
+def _accuracy(obj, inputs, labels):
+	# simulated classification accuracy, batched over the calibration set
+	return float(np.mean(np.argmax(obj.simulate(inputs), axis=-1) == labels))
+
+
+def _fits_device(result, device):
+	return all(result['estimate'][key] <= DEVICES[device][key] for key in ESTIMATE_KEYS)
+
+
+def _format_width(width):
+	if width is None:
+		return "default"
+	if isinstance(width, str):
+		return width
+	return str(width[0]) + ":" + str(width[1])
+
+
+_explore_worker_args = None
+
+def _explore_worker_init(fname, inputs, labels):
+	global _explore_worker_args
+	_explore_worker_args = (fname, inputs, labels)
+
+def _explore_worker(configuration):
+	fname, inputs, labels = _explore_worker_args
+	return explore_point(fname, configuration, inputs, labels)
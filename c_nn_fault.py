@@ -0,0 +1,136 @@
+import os
+import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from c_nn_simulation import *
+
+FAULT_TARGETS        = ("coefficients", "activations", "all")
+DEFAULT_FAULT_TARGET = "all"
+DEFAULT_FAULT_TRIALS = 1000
+DEFAULT_FAULT_SEED   = 0
+DEFAULT_FAULT_CHUNK  = 64
+
+
+class fault_injector:
+	def __init__(self, network, inputs, labels, target=DEFAULT_FAULT_TARGET, layers=None, seed=DEFAULT_FAULT_SEED, workers=None, batch=DEFAULT_SIMULATION_BATCH):
+		if target not in FAULT_TARGETS:
+			raise ValueError('Fault target is not supported')
+
+		self.simulator = simulator(network, batch)
+		self.inputs    = self.simulator.from_real(np.atleast_2d(inputs))
+		self.labels    = np.asarray(labels)
+		self.target    = target
+		self.seed      = seed
+		self.workers   = workers
+		self.batch     = batch
+		if layers is None:
+			layers = range(0, len(self.simulator.layers))
+		self.layers = set(layers)
+
+		# number of bits in one nn_t word
+		if self.simulator.kind == "fixed":
+			self.width = self.simulator.format.width
+		else:
+			self.width = 8 * np.dtype(self.simulator.np_dtype).itemsize
+
+	def run(self, ber, trials=DEFAULT_FAULT_TRIALS):
+		return self.sweep([ber], trials)[0]
+
+	def sweep(self, bers, trials=DEFAULT_FAULT_TRIALS):
+		# accuracy of every trial at every bit error rate, shape (len(bers), trials)
+		tasks = []
+		seeds = np.random.SeedSequence(self.seed).spawn(len(bers) * math.ceil(trials / DEFAULT_FAULT_CHUNK))
+		for ber in bers:
+			for start in range(0, trials, DEFAULT_FAULT_CHUNK):
+				tasks.append((ber, min(DEFAULT_FAULT_CHUNK, trials - start), seeds[len(tasks)]))
+
+		workers = self.workers
+		if workers is None:
+			workers = os.cpu_count()
+
+		if workers == 1:
+			results = [self.evaluate(*task) for task in tasks]
+		else:
+			with ProcessPoolExecutor(max_workers=workers, initializer=_fault_worker_init, initargs=(self,)) as pool:
+				results = list(pool.map(_fault_worker, tasks))
+
+		return np.concatenate(results).reshape(len(bers), trials)
+
+	def evaluate(self, ber, trials, seed):
+		rng     = np.random.default_rng(seed)
+		samples = self.inputs.shape[0]
+		correct = np.zeros(trials, dtype=np.int64)
+
+		# trials and samples share the simulator batch
+		trials_chunk  = max(1, self.batch // samples)
+		samples_chunk = min(samples, self.batch)
+
+		hook = None
+		if self.target != "coefficients":
+			hook = lambda idx, values: self.__hook_activations(idx, values, ber, rng)
+
+		for trial in range(0, trials, trials_chunk):
+			count = min(trials_chunk, trials - trial)
+			coef  = self.__gen_coefficients(count, ber, rng)
+			for start in range(0, samples, samples_chunk):
+				stop    = min(start + samples_chunk, samples)
+				values  = np.broadcast_to(self.inputs[start:stop], (count, stop - start, self.inputs.shape[1]))
+				# flipped exponent bits legitimately produce inf/nan in floating point networks
+				with np.errstate(over='ignore', invalid='ignore'):
+					outputs = self.simulator.forward(values, coef, hook)
+				correct[trial:trial+count] += np.sum(np.argmax(outputs, axis=-1) == self.labels[start:stop], axis=-1)
+
+		return correct / samples
+
+	def __gen_coefficients(self, trials, ber, rng):
+		coef = []
+		for idx in range(0, len(self.simulator.coef)):
+			base = self.simulator.coef[idx]
+			if base is None or self.target == "activations" or idx not in self.layers:
+				coef.append(base)
+				continue
+
+			# one faulty copy of the layer's coefficients per trial, broadcast over samples
+			faulty = np.repeat(base[None], trials, axis=0)
+			self.__flip_bits(faulty, ber, rng)
+			coef.append(faulty.reshape((trials, 1) + base.shape))
+		return coef
+
+	def __hook_activations(self, idx, values, ber, rng):
+		# only the output_N containers between layers are exposed
+		if idx in self.layers and idx < len(self.simulator.layers) - 1:
+			values = np.ascontiguousarray(values)
+			self.__flip_bits(values, ber, rng)
+		return values
+
+	def __flip_bits(self, values, ber, rng):
+		flat  = values.reshape(-1)
+		bits  = flat.size * self.width
+		count = rng.binomial(bits, ber)
+		if count == 0:
+			return
+
+		position = rng.integers(0, bits, count)
+		element  = position // self.width
+		bit      = position % self.width
+
+		if self.simulator.kind == "fixed":
+			np.bitwise_xor.at(flat, element, np.left_shift(1, bit))
+
+			# sign extend the nn_t word back into int64
+			flat[element] &= self.simulator.format.mask
+			flat[element] -= (flat[element] >> (self.width - 1)) << self.width
+		elif self.simulator.kind == "float":
+			np.bitwise_xor.at(flat.view(np.uint32), element, np.left_shift(1, bit).astype(np.uint32))
+		else:
+			np.bitwise_xor.at(flat.view(np.uint64), element, np.left_shift(1, bit).astype(np.uint64))
+
+
+_fault_worker_injector = None
+
+def _fault_worker_init(injector):
+	global _fault_worker_injector
+	_fault_worker_injector = injector
+
+def _fault_worker(task):
+	return _fault_worker_injector.evaluate(*task)
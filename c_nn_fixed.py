@@ -0,0 +1,178 @@
+import numpy as np
+
+QUANTIZATION_MODES   = ("AP_TRN", "AP_RND")
+OVERFLOW_MODES       = ("AP_WRAP", "AP_SAT")
+DEFAULT_QUANTIZATION = "AP_TRN"
+DEFAULT_OVERFLOW     = "AP_WRAP"
+FIXED_WIDTH_MAX      = 62
+
+# integer pipelines accumulate in ap_int and requantize through unsigned ap_uint multipliers
+INTEGER_ACCUMULATOR_WIDTH = 32
+INTEGER_MULTIPLIER_WIDTH  = 16
+
+
+class fixed_format:
+	def __init__(self, width, width_whole, signed=True, quantization=DEFAULT_QUANTIZATION, overflow=DEFAULT_OVERFLOW):
+		if width < 1 or width > FIXED_WIDTH_MAX:
+			raise ValueError('Fixed point width must be between 1 and ' + str(FIXED_WIDTH_MAX))
+		if quantization not in QUANTIZATION_MODES:
+			raise ValueError('Quantization mode is not supported')
+		if overflow not in OVERFLOW_MODES:
+			raise ValueError('Overflow mode is not supported')
+
+		self.width        = width
+		self.width_whole  = width_whole
+		self.width_frac   = width - width_whole
+		self.signed       = signed
+		self.quantization = quantization
+		self.overflow     = overflow
+		self.scale        = 2.0 ** self.width_frac
+		self.mask         = (1 << width) - 1
+		if signed:
+			self.raw_min = -(1 << (width - 1))
+			self.raw_max = (1 << (width - 1)) - 1
+		else:
+			self.raw_min = 0
+			self.raw_max = (1 << width) - 1
+
+	def type_string(self, width=None, width_whole=None):
+		# width names may be given as macros, e.g. WIDTH_LUT_INPUT
+		if width is None:
+			width = self.width
+		if width_whole is None:
+			width_whole = self.width_whole
+		if self.signed:
+			name = 'ap_fixed<'
+		else:
+			name = 'ap_ufixed<'
+		name = name + str(width) + ',' + str(width_whole)
+		if self.overflow != DEFAULT_OVERFLOW:
+			name = name + ',' + self.quantization + ',' + self.overflow
+		elif self.quantization != DEFAULT_QUANTIZATION:
+			name = name + ',' + self.quantization
+		return name + '>'
+
+	def value_min(self):
+		return self.raw_min / self.scale
+
+	def value_max(self):
+		return self.raw_max / self.scale
+
+	def quantize(self, values, out=None):
+		# real -> real on the grid of this format, float64 in place when out is values
+		out = self.__to_raw_float(values, out)
+		out /= self.scale
+		return out
+
+	def to_raw(self, values, out=None):
+		# real -> int64 raw value
+		scaled = self.__to_raw_float(values, None)
+		if out is None:
+			return scaled.astype(np.int64)
+		out[...] = scaled
+		return out
+
+	def to_real(self, raw, out=None):
+		return np.divide(raw, self.scale, out=out)
+
+	def requantize(self, raw, width_frac, out=None):
+		# int64 raw value with width_frac fractional bits -> int64 raw value of this format
+		if out is None:
+			out = np.array(raw, dtype=np.int64)
+		elif out is not raw:
+			np.copyto(out, raw)
+		shift = width_frac - self.width_frac
+		if shift > 0:
+			if self.quantization == "AP_RND":
+				out += 1 << (shift - 1)
+			out >>= shift
+		elif shift < 0:
+			out <<= -shift
+		return self.apply_overflow(out)
+
+	def apply_overflow(self, raw):
+		# int64 raw value in place
+		if self.overflow == "AP_SAT":
+			return np.clip(raw, self.raw_min, self.raw_max, out=raw)
+		if self.signed:
+			raw -= self.raw_min
+			raw &= self.mask
+			raw += self.raw_min
+		else:
+			raw &= self.mask
+		return raw
+
+	def __to_raw_float(self, values, out):
+		values = np.asarray(values, dtype=np.float64)
+		if out is None:
+			out = np.empty(values.shape, dtype=np.float64)
+		np.multiply(values, self.scale, out=out)
+		if self.quantization == "AP_RND":
+			out += 0.5
+		np.floor(out, out=out)
+		if self.overflow == "AP_SAT":
+			np.clip(out, self.raw_min, self.raw_max, out=out)
+		else:
+			out -= self.raw_min
+			np.mod(out, float(1 << self.width), out=out)
+			out += self.raw_min
+		return out
+
+
+def parse_fixed_format(dtype):
+	if dtype.startswith("ap_fixed<"):
+		signed = True
+		params = dtype[len("ap_fixed<"):-1].split(',')
+	elif dtype.startswith("ap_ufixed<"):
+		signed = False
+		params = dtype[len("ap_ufixed<"):-1].split(',')
+	else:
+		raise ValueError('Data type is not a fixed point type')
+
+	params = [param.strip() for param in params]
+	quantization = DEFAULT_QUANTIZATION
+	overflow     = DEFAULT_OVERFLOW
+	if len(params) > 2:
+		quantization = params[2]
+	if len(params) > 3:
+		overflow = params[3]
+	return fixed_format(int(params[0]), int(params[1]), signed, quantization, overflow)
+
+
+def power_of_two_terms(values, terms, exponent_min, exponent_max):
+	# values -> (signs, exponents) of shape values.shape + (terms,), each term the signed power of two nearest to
+	# what the terms before it left over; signs of 0 mark terms that are left out
+	residual  = np.array(values, dtype=np.float64)
+	signs     = np.zeros(residual.shape + (terms,), dtype=np.int64)
+	exponents = np.zeros(residual.shape + (terms,), dtype=np.int64)
+	for term in range(0, terms):
+		magnitude = np.abs(residual)
+		with np.errstate(divide='ignore'):
+			exponent = np.floor(np.log2(magnitude))
+		# the upper power is the nearer one from 1.5 times the lower one on
+		exponent = np.clip(np.where(magnitude >= 1.5 * 2.0 ** exponent, exponent + 1, exponent), exponent_min, exponent_max)
+		sign     = np.where(magnitude > 2.0 ** exponent_min / 2, np.sign(residual), 0).astype(np.int64)
+		signs[..., term]     = sign
+		exponents[..., term] = np.where(sign != 0, exponent, 0)
+		residual = residual - sign * 2.0 ** exponents[..., term]
+	return signs, exponents
+
+
+def integer_quantization(coef, bias, bits, input_width_frac, accumulator_width, multiplier_width):
+	# symmetric bits wide weights of coef (outputs x inputs) with one scale per output, the bias at the scale of
+	# the accumulator and unsigned multipliers with a common shift, real = accumulator * multiplier / 2**shift
+	coef    = np.asarray(coef, dtype=np.float64)
+	bias    = np.asarray(bias, dtype=np.float64)
+	limit   = (1 << (bits - 1)) - 1
+	scale   = np.max(np.abs(coef), axis=1) / limit
+	scale   = np.where(scale > 0, scale, 1.0)
+	weights = np.clip(np.round(coef / scale[:, None]), -limit, limit).astype(np.int64)
+
+	# inputs carry input_width_frac fractional bits, so one accumulator step is worth scale/2**input_width_frac
+	scale = scale / 2.0 ** input_width_frac
+	bias  = np.clip(np.round(bias / scale), -(1 << (accumulator_width - 1)), (1 << (accumulator_width - 1)) - 1).astype(np.int64)
+
+	# the largest scale takes all multiplier bits
+	shift       = int(np.floor(np.log2(((1 << multiplier_width) - 1) / np.max(scale))))
+	multipliers = np.round(scale * 2.0 ** shift).astype(np.int64)
+	return weights, bias, multipliers, shift
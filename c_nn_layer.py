@@ -0,0 +1,218 @@
+import math
+import numpy as np
+
+DEFAULT_RESOURCE_COUNT = 1
+
+RESOURCE_EXECUTION_MULTIPLICATION        = 1.0
+RESOURCE_EXECUTION_ADDITION              = 1.0
+RESOURCE_EXECUTION_ACTIVATION_TANSIG     = 58.0
+RESOURCE_EXECUTION_ACTIVATION_TANSIG_LUT = 1.0
+RESOURCE_EXECUTION_ACTIVATION_LINEAR     = 1.0
+RESOURCE_EXECUTION_ACTIVATION_RELU       = 1.0
+RESOURCE_EXECUTION_ACTIVATION_HARDTANH   = 1.0
+RESOURCE_EXECUTION_ACTIVATION_PWL        = 2.0
+
+# cycles until a floating point sum can be added to again, accumulations carried across pipeline iterations wait for it
+RESOURCE_LATENCY_ADDITION = {"float": 4, "double": 5}
+
+# vectors buffered between two dataflow processes
+DATAFLOW_STREAM_DEPTH = 2
+
+# registry of the supported layer types, by name
+LAYER_TYPES = {}
+
+# adder tree delay by (inputs shape, resources), shared by every layer
+_addition_delay_cache = {}
+
+
+class layer_type:
+	# coefficients: layout of the coefficient array, None, "value", "array_1D" or "array_2D"
+	# operation:    element-wise semantics as evaluated by the simulator
+	# operator:     hardware operator instantiated per resource
+	# operations:   operand count the work scales with, "inputs" or "outputs"
+	# reduction:    adder tree over the inputs instead of independent operations
+	__slots__ = ('name', 'coefficients', 'operation', 'operator', 'operations', 'execution_resource', 'reduction')
+
+	def __init__(self, name, coefficients, operation, operator, operations, execution_resource, reduction=False):
+		self.name               = name
+		self.coefficients       = coefficients
+		self.operation          = operation
+		self.operator           = operator
+		self.operations         = operations
+		self.execution_resource = execution_resource
+		self.reduction          = reduction
+
+
+def register_layer_type(name, coefficients, operation, operator, operations, execution_resource, reduction=False):
+	LAYER_TYPES[name] = layer_type(name, coefficients, operation, operator, operations, execution_resource, reduction)
+	return LAYER_TYPES[name]
+
+
+register_layer_type("normalization_input_offset",  "array_1D", "sub",        "add",      "inputs",  RESOURCE_EXECUTION_ADDITION)
+register_layer_type("normalization_input_gain",    "array_1D", "mul",        "mul",      "outputs", RESOURCE_EXECUTION_MULTIPLICATION)
+register_layer_type("normalization_input_min",     "value",    "add_scalar", "add",      "inputs",  RESOURCE_EXECUTION_ADDITION)
+register_layer_type("normalization_output_offset", "array_1D", "sub",        "add",      "inputs",  RESOURCE_EXECUTION_ADDITION)
+register_layer_type("normalization_output_gain",   "array_1D", "mul",        "mul",      "outputs", RESOURCE_EXECUTION_MULTIPLICATION)
+register_layer_type("normalization_output_min",    "value",    "sub_scalar", "add",      "inputs",  RESOURCE_EXECUTION_ADDITION)
+register_layer_type("multiplication",              "array_2D", "outer",      "mul",      "outputs", RESOURCE_EXECUTION_MULTIPLICATION)
+register_layer_type("addition",                    "array_1D", "sum",        "add",      "inputs",  RESOURCE_EXECUTION_ADDITION, True)
+register_layer_type("activation_tansig",           None,       "tanh",       "tanh",     "inputs",  RESOURCE_EXECUTION_ACTIVATION_TANSIG)
+register_layer_type("activation_tansig_lut",       None,       "tanh_lut",   "tanh_lut", "inputs",  RESOURCE_EXECUTION_ACTIVATION_TANSIG_LUT)
+register_layer_type("activation_linear",           "array_1D", "mul",        "mul",      "outputs", RESOURCE_EXECUTION_ACTIVATION_LINEAR)
+register_layer_type("activation_relu",             None,       "relu",       "relu",     "inputs",  RESOURCE_EXECUTION_ACTIVATION_RELU)
+register_layer_type("activation_hardtanh",         None,       "hardtanh",   "hardtanh", "inputs",  RESOURCE_EXECUTION_ACTIVATION_HARDTANH)
+register_layer_type("activation_pwl",              "array_2D", "pwl",        "pwl",      "inputs",  RESOURCE_EXECUTION_ACTIVATION_PWL)
+
+
+class layer:
+	__slots__ = ('type', 'kind', 'inputs', 'outputs', 'inputs_shape', 'outputs_shape', 'inputs_count', 'outputs_count',
+		'resources', 'execution', 'simd', 'pe', 'dtype', 'nonzeros', '_coef', '_coef_file')
+
+	def __init__(self, type, inputs, outputs, coef=None, coef_file=None, resources=DEFAULT_RESOURCE_COUNT):
+		if type not in LAYER_TYPES:
+			raise ValueError('This layer type is not supported')
+
+		self.type          = type
+		self.kind          = LAYER_TYPES[type]
+		self.inputs        = inputs
+		self.outputs       = outputs
+		self.inputs_shape  = parse_shape(inputs)
+		self.outputs_shape = parse_shape(outputs)
+		self.inputs_count  = int(np.prod(self.inputs_shape))
+		self.outputs_count = int(np.prod(self.outputs_shape))
+		self.resources     = resources
+		self.execution     = 0
+
+		# input (SIMD) and output (PE) parallelism of a folded matrix-vector engine
+		self.simd          = 1
+		self.pe            = 1
+
+		# fixed point type of the outputs and coefficients, None computes in nn_t
+		self.dtype         = None
+
+		# coefficients a sparse layer stores and multiplies, None when dense
+		self.nonzeros      = None
+
+		# arrays are held as contiguous float64, directory topologies map them on first access
+		self._coef_file = coef_file
+		if self.kind.coefficients is None:
+			self._coef = None
+		elif isinstance(coef, (list, np.ndarray)):
+			self._coef = np.ascontiguousarray(coef, dtype=np.float64)
+		else:
+			self._coef = coef
+
+		# segments are selected by the last start not above the input
+		if type == "activation_pwl" and self._coef is not None:
+			if np.ndim(self._coef) != 2 or np.shape(self._coef)[1] != 3 or np.any(np.diff(self._coef[:, 0]) < 0):
+				raise ValueError('Piecewise linear coefficients must be rows of (start, slope, intercept) sorted by start')
+
+	@property
+	def coef(self):
+		if self._coef_file is not None:
+			self._coef      = np.load(self._coef_file, mmap_mode='r')
+			self._coef_file = None
+		return self._coef
+
+	@coef.setter
+	def coef(self, coef):
+		self._coef_file = None
+		self._coef      = coef
+
+	def is_loaded(self):
+		return self._coef_file is None
+
+	def get_min_execution_time(self):
+		if self.kind.reduction:
+			return math.ceil(math.log(self.inputs_shape[1] + 1, 2))
+		return 1
+
+	def get_execution_time(self, resources):
+		if self.kind.reduction:
+			key = (self.inputs_shape, resources)
+			if key not in _addition_delay_cache:
+				_addition_delay_cache[key] = _execution_time_addition_tree(self.inputs_shape[0]+1, self.inputs_shape[1], resources)
+			return _addition_delay_cache[key]
+		return self.kind.execution_resource * self.get_operation_count() / resources
+
+	def get_execution_work(self):
+		# operator-cycles of the layer, execution is never below work/resources
+		if self.kind.reduction:
+			work  = 0.0
+			count = self.inputs_shape[0]+1
+			while count != 1:
+				work  = work + self.inputs_shape[1] * (count / 2)
+				count = int(count - count / 2)
+			return work
+		return self.kind.execution_resource * self.get_operation_count()
+
+	def get_folded_execution_time(self, simd, pe, interval=1):
+		# one fold of PE outputs by SIMD inputs every interval cycles
+		outer, inner = self.outputs_shape
+		return math.ceil(outer / pe) * math.ceil(inner / simd) * interval
+
+	def get_operation_count(self):
+		if self.nonzeros is not None:
+			return self.nonzeros
+		if self.kind.operations == "inputs":
+			return self.inputs_count
+		return self.outputs_count
+
+
+def pwl_coefficients(breakpoints):
+	# (x, y) breakpoints -> activation_pwl rows of (start, slope, intercept), constant outside the breakpoints
+	breakpoints = np.asarray(breakpoints, dtype=np.float64)
+	x, y = breakpoints[:, 0], breakpoints[:, 1]
+	if len(x) < 2 or np.any(np.diff(x) <= 0):
+		raise ValueError('Piecewise linear breakpoints must be at least two with increasing x')
+
+	slope     = np.diff(y) / np.diff(x)
+	intercept = y[:-1] - slope * x[:-1]
+	# the first start is never compared, it only keeps the rows sorted
+	rows = [(x[0] - 1.0, 0.0, y[0])] + list(zip(x[:-1], slope, intercept)) + [(x[-1], 0.0, y[-1])]
+	return np.asarray(rows, dtype=np.float64)
+
+
+def folding_factors(count):
+	# factors a loop of count iterations folds into evenly, ascending
+	return [factor for factor in range(1, count+1) if count % factor == 0]
+
+
+def sparse_coefficients(coef):
+	# 2D coefficients -> (nonzero values, their columns, row pointers) in row-major order, as compressed sparse rows
+	coef    = np.asarray(coef, dtype=np.float64)
+	nonzero = coef != 0
+	rows    = np.concatenate(([0], np.cumsum(np.count_nonzero(nonzero, axis=1)))).astype(np.int64)
+	return coef[nonzero], np.nonzero(nonzero)[1].astype(np.int64), rows
+
+
+def parse_shape(shape_string):
+	# "8x784" -> (8, 784)
+	return tuple(int(dim) for dim in shape_string.split('x'))
+
+
+def _execution_time_addition_tree(count, trees, resources_max):
+	# every tree has the same input count, so one level reduces all of them alike
+	delays          = []
+	resources_carry = 0
+	while True:
+		# update resources, input/output count
+		resources_used = resources_carry + trees * (count / 2)
+		count = int(count - count / 2)
+
+		# calculate delay
+		delays.append(resources_used / resources_max)
+		resources_carry = resources_used % resources_max
+
+		if count == 1:
+			break
+
+	if resources_carry == 0:
+		delay = delays.pop()
+	else:
+		delay = delays.pop() + 1
+
+	# levels are summed from the last one up
+	while len(delays) > 0:
+		delay = delays.pop() + delay
+	return delay
@@ -0,0 +1,68 @@
+import math
+import numpy as np
+from c_nn_fixed import *
+from c_nn_estimate import ESTIMATE_BRAM_BITS, ESTIMATE_LUTROM_BITS, ESTIMATE_LUTROM_MAX
+
+# evaluation points per LUT input step for the approximation error
+LUT_ERROR_OVERSAMPLING = 16
+
+# tanh tables by (lut_in_t, lut_out_t), shared by the generator, the simulator and the sweeps
+_lut_tanh_cache = {}
+
+
+def lut_tanh(dtype_in, dtype_out):
+	# lut_out_t contents addressed by the two's complement bit pattern of lut_in_t, as in the generated tanh()
+	key = (dtype_in, dtype_out)
+	if key not in _lut_tanh_cache:
+		lut_in  = parse_fixed_format(dtype_in)
+		lut_out = parse_fixed_format(dtype_out)
+
+		address = np.arange(1 << lut_in.width, dtype=np.int64)
+		address[address > lut_in.raw_max] -= 1 << lut_in.width
+		table = lut_out.quantize(np.tanh(lut_in.to_real(address)))
+		table.flags.writeable = False
+		_lut_tanh_cache[key] = table
+	return _lut_tanh_cache[key]
+
+
+def lut_tanh_lookup(values, dtype_in, dtype_out):
+	# tanh_saturate() followed by the table read, real in and out
+	lut_in    = parse_fixed_format(dtype_in)
+	saturated = np.clip(values, lut_in.value_min(), lut_in.value_max())
+	return lut_tanh(dtype_in, dtype_out)[lut_in.to_raw(saturated) & lut_in.mask]
+
+
+def lut_tanh_report(dtype_in, dtype_out, limit=None):
+	# footprint of one table and its error against tanh() over [-limit, limit], the saturation range by default
+	lut_in  = parse_fixed_format(dtype_in)
+	lut_out = parse_fixed_format(dtype_out)
+	if limit is None:
+		limit = -lut_in.value_min()
+
+	entries = 1 << lut_in.width
+	bits    = entries * lut_out.width
+	inputs  = np.linspace(-limit, limit, int(2 * limit * lut_in.scale * LUT_ERROR_OVERSAMPLING) + 1)
+	error   = np.abs(lut_tanh_lookup(inputs, dtype_in, dtype_out) - np.tanh(inputs))
+
+	report = {'entries': entries, 'bits': bits, 'lut': 0, 'bram': 0,
+		'error_max': float(np.max(error)), 'error_mean': float(np.mean(error))}
+	if bits <= ESTIMATE_LUTROM_MAX:
+		report['lut'] = math.ceil(bits / ESTIMATE_LUTROM_BITS)
+	else:
+		report['bram'] = math.ceil(bits / ESTIMATE_BRAM_BITS)
+	return report
+
+
+def show_lut_tanh_report(dtypes_in, dtypes_out, limit=None):
+	print("|                   LUT INPUT |                  LUT OUTPUT | ENTRIES |   BRAM |    LUT |  ERROR MAX | ERROR MEAN |")
+	for dtype_in in dtypes_in:
+		for dtype_out in dtypes_out:
+			report = lut_tanh_report(dtype_in, dtype_out, limit)
+			print("| %27s | %27s | %7d | %6d | %6d | %10.3e | %10.3e |"
+				%(dtype_in,
+				dtype_out,
+				report['entries'],
+				report['bram'],
+				report['lut'],
+				report['error_max'],
+				report['error_mean']))
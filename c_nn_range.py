@@ -0,0 +1,176 @@
+import math
+import numpy as np
+from c_nn_fixed import *
+from c_nn_simulation import *
+
+# magnitude histogram bins by binary exponent, |x| < 2**e falls into bin e; zero and smaller go to the first
+RANGE_EXPONENT_MIN = -64
+RANGE_EXPONENT_MAX = 64
+DEFAULT_RANGE_PERCENTILE = 100.0
+
+
+class range_statistics:
+	# one-pass min/max and magnitude histogram of a tensor, constant memory in the sample count
+	def __init__(self):
+		self.count     = 0
+		self.min       = math.inf
+		self.max       = -math.inf
+		self.histogram = np.zeros(RANGE_EXPONENT_MAX - RANGE_EXPONENT_MIN + 1, dtype=np.int64)
+
+	def update(self, values):
+		values = np.asarray(values, dtype=np.float64)
+		if values.size == 0:
+			return
+		self.count = self.count + values.size
+		self.min   = min(self.min, float(np.min(values)))
+		self.max   = max(self.max, float(np.max(values)))
+		exponent   = np.clip(np.frexp(np.abs(values))[1], RANGE_EXPONENT_MIN, RANGE_EXPONENT_MAX)
+		self.histogram += np.bincount((exponent - RANGE_EXPONENT_MIN).ravel(), minlength=len(self.histogram))
+
+	def width_whole(self, percentile=DEFAULT_RANGE_PERCENTILE):
+		# integer bits of a signed fixed point type holding the given percent of the samples, sign bit included;
+		# exact at 100, from the power of two bounding the histogram bin below
+		if self.count == 0:
+			return 1
+		if percentile >= 100.0:
+			return _width_whole(max(abs(self.min), abs(self.max)))
+		covered = np.cumsum(self.histogram) >= self.count * percentile / 100.0
+		return max(1, int(np.argmax(covered)) + RANGE_EXPONENT_MIN + 1)
+
+
+class range_profiler:
+	# streams calibration data through the unquantized network and records every tensor a layer computes in:
+	# its inputs, its outputs, the running sums of an addition and its coefficients
+	def __init__(self, network, batch=DEFAULT_SIMULATION_BATCH):
+		self.network   = network
+		self.batch     = batch
+		self.simulator = simulator(network, batch, "double")
+		self.layers    = self.simulator.layers
+
+		self.inputs       = range_statistics()
+		self.outputs      = [range_statistics() for layer in self.layers]
+		self.accumulators = [range_statistics() if layer.kind.reduction else None for layer in self.layers]
+		self.coefficients = [None] * len(self.layers)
+		for idx in range(0, len(self.layers)):
+			if self.layers[idx].kind.coefficients is not None:
+				self.coefficients[idx] = range_statistics()
+				self.coefficients[idx].update(self.layers[idx].coef)
+
+	def profile(self, inputs):
+		inputs = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+		for start in range(0, inputs.shape[0], self.batch):
+			self.update(inputs[start:min(start + self.batch, inputs.shape[0])])
+		return self
+
+	def update(self, inputs):
+		# one batch of samples, nothing of it is kept
+		values = self.simulator.from_real(np.atleast_2d(inputs))
+		self.inputs.update(self.simulator.to_real(values))
+		previous = [values]
+
+		def hook(idx, values):
+			if self.accumulators[idx] is not None:
+				# partial sums in the order of the generated accumulation loop, bias first
+				coef = self.simulator.to_real(self.simulator.coef[idx])
+				self.accumulators[idx].update(coef[..., None] + np.cumsum(self.simulator.to_real(previous[0]), axis=-1))
+			self.outputs[idx].update(self.simulator.to_real(values))
+			previous[0] = values
+			return values
+
+		self.simulator.forward(values, hook=hook)
+
+	def get_input_statistics(self, idx):
+		# layer inputs are the outputs of the layer before, the first one takes the network inputs
+		if idx == 0:
+			return self.inputs
+		return self.outputs[idx-1]
+
+	def report(self, percentile=DEFAULT_RANGE_PERCENTILE, width=None):
+		# proposed integer/fractional split per tensor, per layer type and for nn_t and lut_in_t;
+		# current is the integer bits the configured types give the tensor, None for floating point
+		if width is None:
+			width = self.network.width_network
+
+		tensors = []
+		layers  = []
+		for idx in range(0, len(self.layers)):
+			current = self.__current_width_whole(idx)
+			named   = [("inputs", self.get_input_statistics(idx)), ("accumulators", self.accumulators[idx]),
+				("outputs", self.outputs[idx]), ("coefficients", self.coefficients[idx])]
+			whole = 1
+			for name, statistics in named:
+				if statistics is None:
+					continue
+				tensors.append({
+					'layer'  : idx,
+					'type'   : self.layers[idx].type,
+					'tensor' : name,
+					'count'  : int(statistics.count),
+					'min'    : statistics.min,
+					'max'    : statistics.max,
+					'whole'  : statistics.width_whole(percentile),
+					'current': current})
+				whole = max(whole, tensors[-1]['whole'])
+			layers.append(whole)
+
+		# tanh_saturate() clips to lut_in_t, past the point where the table holds its last value clipping is free
+		lut_input = None
+		lut_width = self.network.width_lut_input
+		for idx in range(0, len(self.layers)):
+			if self.layers[idx].type == "activation_tansig_lut":
+				whole = min(self.get_input_statistics(idx).width_whole(percentile), self.__lut_saturation_width_whole())
+				lut_input = whole if lut_input is None else max(lut_input, whole)
+
+		report = {
+			'percentile'      : percentile,
+			'width'           : width,
+			'tensors'         : tensors,
+			'widths_whole'    : layers,
+			'types'           : [fixed_format(width, min(whole, width)).type_string() for whole in layers],
+			'dtype'           : fixed_format(width, min(max(layers), width)).type_string(),
+			'lut_input_whole' : lut_input,
+			'lut_input'       : None if lut_input is None else fixed_format(lut_width, min(lut_input, lut_width)).type_string(),
+			'overflow'        : [tensor for tensor in tensors if tensor['current'] is not None and tensor['whole'] > tensor['current']]}
+		return report
+
+	def __current_width_whole(self, idx):
+		dtype = self.network.get_layer_dtype(idx)
+		if not dtype.startswith("ap_"):
+			return None
+		return parse_fixed_format(dtype).width_whole
+
+	def __lut_saturation_width_whole(self):
+		# tanh is within one lut_out_t step of its limit from here on
+		lut_out = parse_fixed_format(self.network.dtype_LUT_out)
+		return _width_whole(math.atanh(1.0 - 2.0 ** -min(lut_out.width_frac, 52)))
+
+
+def show_range_report(report):
+	print("| NUMBER |                        TYPE |       TENSOR |          MIN |          MAX | WHOLE | CURRENT |")
+	for tensor in report['tensors']:
+		current = "-" if tensor['current'] is None else str(tensor['current'])
+		flag    = " <" if tensor in report['overflow'] else ""
+		print("| %6.1d | %27s | %12s | %12.5g | %12.5g | %5d | %7s |%s"
+			%(tensor['layer'],
+			tensor['type'],
+			tensor['tensor'],
+			tensor['min'],
+			tensor['max'],
+			tensor['whole'],
+			current,
+			flag))
+	print("Integer bits at percentile %g, %d bit words" %(report['percentile'], report['width']))
+	print("nn_t: " + report['dtype'])
+	for idx in range(0, len(report['types'])):
+		print("layer %d: %s" %(idx, report['types'][idx]))
+	if report['lut_input'] is not None:
+		print("lut_in_t: " + report['lut_input'])
+	if len(report['overflow']) > 0:
+		print("WARNING: " + str(len(report['overflow'])) + " tensors exceed the integer bits of their current type")
+
+
+def _width_whole(magnitude):
+	# |x| < 2**e needs e integer bits and the sign bit, at least the sign bit
+	if magnitude <= 0.0:
+		return 1
+	return max(1, int(np.frexp(magnitude)[1]) + 1)
@@ -0,0 +1,321 @@
+import numpy as np
+from c_nn_fixed import *
+from c_nn_lut import *
+
+DEFAULT_SIMULATION_BATCH = 1024
+SIMULATION_FIXED_WIDTH_MAX = 32
+
+
+class simulator:
+	def __init__(self, network, batch=DEFAULT_SIMULATION_BATCH, dtype=None):
+		# dtype replaces nn_t and every per-layer type, "double" gives the unquantized reference
+		self.network = network
+		self.batch   = batch
+		self.layers  = list(network.layers[0:network.current_layer])
+		self.__parse_dtype(network.dtype if dtype is None else dtype)
+
+		# per-layer fixed point types, the layer computes in its own and converts its inputs on entry
+		if dtype is None:
+			network.check_layer_dtypes()
+		self.dtypes = [network.get_layer_dtype(idx) if dtype is None else dtype for idx in range(0, len(self.layers))]
+		self.formats_layer = None
+		if dtype is None and network.has_layer_dtypes():
+			self.formats_layer = [parse_fixed_format(dtype) for dtype in self.dtypes]
+			if max(format.width for format in self.formats_layer) > SIMULATION_FIXED_WIDTH_MAX:
+				raise ValueError('Fixed point simulation supports widths up to ' + str(SIMULATION_FIXED_WIDTH_MAX) + ' bits')
+
+		# coefficients are converted to their layer's type once, exactly as the generated initializers do
+		self.coef = []
+		for idx in range(0, len(self.layers)):
+			layer = self.layers[idx]
+			if layer.kind.coefficients is not None:
+				self.__select_format(idx)
+				self.coef.append(self.from_real(layer.coef))
+			else:
+				self.coef.append(None)
+		self.__select_format(-1)
+
+		# shift-add multiplications have no coefficient words, only the sign and shift of every term
+		self.shift_terms = [None] * len(self.layers)
+		if dtype is None:
+			network.check_shift_add()
+			for idx in range(0, len(self.layers)):
+				if network.is_shift_add(idx):
+					self.shift_terms[idx] = network.get_shift_add_terms(idx)
+
+		# integer pairs, the multiplication passes its inputs on and the addition computes the whole pair
+		self.integer = [None] * len(self.layers)
+		if dtype is None:
+			network.check_integer()
+			for idx in range(0, len(self.layers)):
+				if network.is_integer(idx):
+					self.integer[idx] = network.get_integer_quantization(idx) + (network.get_integer_input_format(idx),)
+
+		# ABFT checksum rows and bias checksums, as emitted by the generator, with the magnitudes of their terms;
+		# fixed point sums of the quantized coefficients are exact in abft_t, nn_t with the guard bits of the network
+		self.abft          = network.abft
+		self.abft_checksum = {}
+		self.format_abft   = None
+		if self.kind == "fixed":
+			guard = network.get_abft_guard_bits()
+			self.format_abft = fixed_format(self.format.width + guard, self.format.width_whole + guard, self.format.signed, self.format.quantization, self.format.overflow)
+		for idx in range(0, len(self.layers)):
+			if self.network.is_abft_checked(idx):
+				coef = self.layers[idx].coef
+				bias = self.layers[idx+1].coef
+				if self.kind == "fixed":
+					checksums = (self.format_abft.apply_overflow(np.sum(self.from_real(coef), axis=0)), self.format_abft.apply_overflow(np.array(np.sum(self.from_real(bias)))), None, None)
+				else:
+					checksums = (self.from_real(np.sum(coef, axis=0)), self.from_real(np.sum(bias)), self.from_real(np.sum(np.abs(coef), axis=0)), self.from_real(np.sum(np.abs(bias))))
+				self.abft_checksum[idx] = checksums + (network.get_abft_tolerance(idx),)
+
+	def run(self, inputs):
+		inputs  = np.asarray(inputs, dtype=np.float64)
+		single  = inputs.ndim == 1
+		inputs  = np.atleast_2d(inputs)
+		outputs = np.empty((inputs.shape[0], self.layers[-1].outputs_count))
+
+		# whole network per chunk keeps the materialized partial products bounded
+		for start in range(0, inputs.shape[0], self.batch):
+			stop = min(start + self.batch, inputs.shape[0])
+			outputs[start:stop] = self.to_real(self.forward(self.from_real(inputs[start:stop])))
+
+		if single:
+			return outputs[0]
+		return outputs
+
+	def run_checked(self, inputs):
+		# outputs together with the abft_error port of nn_top
+		inputs  = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+		outputs = np.empty((inputs.shape[0], self.layers[-1].outputs_count))
+		error   = np.zeros(inputs.shape[0], dtype=bool)
+		for start in range(0, inputs.shape[0], self.batch):
+			stop = min(start + self.batch, inputs.shape[0])
+			values, error[start:stop] = self.forward_checked(self.from_real(inputs[start:stop]))
+			outputs[start:stop] = self.to_real(values)
+		return outputs, error
+
+	def run_argmax(self, inputs, rotations=1, expected_rotation=None):
+		# argmax output stage on the nn_t outputs, first index wins ties as in the generated comparison tree
+		inputs = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+		index  = np.empty(inputs.shape[0], dtype=np.int64)
+		score  = np.empty(inputs.shape[0])
+		for start in range(0, inputs.shape[0], self.batch):
+			stop   = min(start + self.batch, inputs.shape[0])
+			values = self.forward(self.from_real(inputs[start:stop]))
+			index[start:stop] = np.argmax(values, axis=-1)
+			score[start:stop] = self.to_real(np.take_along_axis(values, index[start:stop, None], axis=-1)[:, 0])
+
+		consistent = None
+		if expected_rotation is not None:
+			consistent = index % rotations == expected_rotation
+		return index // rotations, index % rotations, score, consistent
+
+	def forward(self, values, coef=None, hook=None):
+		# values: nn_t array (..., NN_INPUT_COUNT); coef may replace the per-layer coefficients
+		# with arrays broadcastable against the leading dimensions of values
+		return self.__forward(values, coef, hook, False)[0]
+
+	def forward_checked(self, values, coef=None, hook=None):
+		return self.__forward(values, coef, hook, True)
+
+	def __forward(self, values, coef, hook, check):
+		if coef is None:
+			coef = self.coef
+		error     = np.zeros(values.shape[:-1], dtype=bool)
+		checksum  = None
+		magnitude = None
+		for idx in range(0, len(self.layers)):
+			values    = self.__cast(values, idx-1, idx)
+			values_in = values
+			self.__select_format(idx)
+			if self.integer[idx] is not None:
+				pass
+			elif idx > 0 and self.integer[idx-1] is not None:
+				values = self.__integer_accumulate(values, *self.integer[idx-1])
+			elif self.shift_terms[idx] is not None:
+				values = self.__shift_add(values[..., None, :], *self.shift_terms[idx])
+			else:
+				values = self.__layer(self.layers[idx].kind.operation, values, coef[idx])
+			if hook is not None:
+				values = hook(idx, values)
+
+			# checksums and the sums compared against them are computed in abft_t
+			format = self.format_abft
+			if check and format is not None:
+				format, self.format = self.format, format
+			if check and self.network.is_abft_checked(idx):
+				checksum  = self.__mul_abft(values_in, self.abft_checksum[idx][0])
+				magnitude = None
+				if self.kind != "fixed":
+					magnitude = np.abs(values_in) * self.abft_checksum[idx][2]
+				if self.abft == "row":
+					reference = self.__accumulate(0, np.swapaxes(values, -1, -2))
+					error = error | np.any(self.__abft_compare(reference, checksum, magnitude, self.abft_checksum[idx][4]), axis=-1)
+			if check and self.abft == "column" and idx > 0 and self.network.is_abft_checked(idx-1):
+				reference = self.__accumulate(0, values)
+				checksum  = self.__accumulate(self.abft_checksum[idx-1][1], checksum)
+				if magnitude is not None:
+					magnitude = self.__accumulate(self.abft_checksum[idx-1][3], magnitude)
+				error = error | self.__abft_compare(reference, checksum, magnitude, self.abft_checksum[idx-1][4])
+			if check and format is not None:
+				self.format = format
+		self.__select_format(-1)
+		return self.__cast(values, len(self.layers)-1, -1), error
+
+	def __select_format(self, idx):
+		# nn_t for -1, otherwise the data type of layer idx
+		if self.formats_layer is not None:
+			self.format = self.formats_layer[idx] if idx >= 0 else self.format_network
+
+	def __cast(self, values, idx_source, idx_target):
+		# conversion between the data types of two layers, -1 is nn_t, as the generated casts do
+		if self.formats_layer is None:
+			return values
+		source = self.dtypes[idx_source] if idx_source >= 0 else self.network.dtype
+		target = self.dtypes[idx_target] if idx_target >= 0 else self.network.dtype
+		if source == target:
+			return values
+		source = self.formats_layer[idx_source] if idx_source >= 0 else self.format_network
+		target = self.formats_layer[idx_target] if idx_target >= 0 else self.format_network
+		return target.requantize(values, source.width_frac)
+
+	def __abft_compare(self, reference, checksum, magnitude, tolerance):
+		# the generated comparison subtracts at full precision, float/double scale the tolerance by the magnitude
+		if magnitude is not None:
+			tolerance = tolerance * self.to_real(magnitude)
+		return np.abs(self.to_real(reference - checksum)) > tolerance
+
+	def from_real(self, values):
+		values = np.asarray(values, dtype=np.float64)
+		if self.kind == "fixed":
+			return self.format.to_raw(values)
+		return values.astype(self.np_dtype)
+
+	def to_real(self, values):
+		if self.kind == "fixed":
+			return self.format.to_real(values)
+		return values.astype(np.float64)
+
+	def __parse_dtype(self, dtype):
+		if dtype == "float":
+			self.kind     = "float"
+			self.np_dtype = np.float32
+		elif dtype == "double":
+			self.kind     = "double"
+			self.np_dtype = np.float64
+		elif dtype.startswith("ap_fixed<"):
+			self.kind     = "fixed"
+			self.np_dtype = np.int64
+			self.format   = parse_fixed_format(dtype)
+			self.format_network = self.format
+			if self.format.width > SIMULATION_FIXED_WIDTH_MAX:
+				raise ValueError('Fixed point simulation supports widths up to ' + str(SIMULATION_FIXED_WIDTH_MAX) + ' bits')
+		else:
+			raise ValueError('Data type is not supported')
+
+	def __mul(self, a, b):
+		if self.kind == "fixed":
+			# full precision product, quantized back to nn_t
+			return self.format.requantize(a * b, 2 * self.format.width_frac)
+		return a * b
+
+	def __mul_abft(self, a, b):
+		# nn_t times abft_t into abft_t, b is split at the binary point so no partial product leaves int64
+		if self.kind != "fixed":
+			return a * b
+		frac  = self.format_network.width_frac
+		high  = b >> frac
+		low   = b & ((1 << frac) - 1)
+		carry = 1 << (frac - 1) if self.format.quantization == "AP_RND" and frac > 0 else 0
+		return self.format.apply_overflow(a * high + ((a * low + carry) >> frac))
+
+	def __add(self, a, b):
+		if self.kind == "fixed":
+			return self.format.apply_overflow(a + b)
+		return a + b
+
+	def __sub(self, a, b):
+		if self.kind == "fixed":
+			return self.format.apply_overflow(a - b)
+		return a - b
+
+	def __shift_add(self, values, signs, exponents):
+		# nn_shift_term() per term, shifted within the width of the type, negations and sums converted back to it
+		format  = self.format
+		outputs = None
+		for term in range(0, signs.shape[-1]):
+			shift  = exponents[..., term]
+			left   = np.left_shift(values, np.maximum(shift, 0)) - format.raw_min
+			left  &= format.mask
+			left  += format.raw_min
+			shifted = np.where(shift >= 0, left, np.right_shift(values, np.maximum(-shift, 0)))
+			shifted = np.where(signs[..., term] < 0, format.apply_overflow(-shifted), np.where(signs[..., term] > 0, shifted, 0))
+			outputs = shifted if outputs is None else format.apply_overflow(outputs + shifted)
+		return outputs
+
+	def __integer_accumulate(self, values, weights, bias, multipliers, shift, input_format):
+		# rounded and saturated integer inputs, wrapping accumulator, product with the multiplier read as
+		# a fixed point number with shift fractional bits and converted to nn_t
+		inputs      = input_format.requantize(values, self.format.width_frac)
+		accumulator = fixed_format(INTEGER_ACCUMULATOR_WIDTH, INTEGER_ACCUMULATOR_WIDTH)
+		accumulator = accumulator.apply_overflow(bias + np.sum(inputs[..., None, :] * weights, axis=-1))
+		return self.format.requantize(accumulator * multipliers, shift)
+
+	def __layer(self, operation, values, coef):
+		if operation == "sub":
+			return self.__sub(values, coef)
+		elif operation == "mul":
+			return self.__mul(values, coef)
+		elif operation == "add_scalar":
+			return self.__add(values, coef[..., None])
+		elif operation == "sub_scalar":
+			return self.__sub(values, coef[..., None])
+		elif operation == "outer":
+			return self.__mul(values[..., None, :], coef)
+		elif operation == "sum":
+			return self.__layer_addition(values, coef)
+		elif operation == "tanh":
+			return self.from_real(np.tanh(self.to_real(values)))
+		elif operation == "tanh_lut":
+			return self.__layer_activation_tansig_lut(values)
+		elif operation == "relu":
+			return np.where(values > 0, values, np.zeros_like(values))
+		elif operation == "hardtanh":
+			return np.minimum(np.maximum(values, self.from_real(-1.0)), self.from_real(1.0))
+		elif operation == "pwl":
+			return self.__layer_activation_pwl(values, coef)
+		else:
+			raise ValueError('This layer operation is not supported')
+
+	def __layer_addition(self, values, coef):
+		return self.__accumulate(coef, values)
+
+	def __accumulate(self, initial, values):
+		# initial + sum over the last axis of values, in nn_t
+		if self.kind == "fixed" and self.format.overflow == "AP_WRAP":
+			# wrapping accumulation is associative, the order of the generated loop does not matter
+			return self.format.apply_overflow(initial + values.sum(axis=-1))
+
+		# saturating and floating point accumulation must follow the generated loop order
+		shape   = np.broadcast_shapes(np.shape(initial), values.shape[:-1])
+		outputs = np.array(np.broadcast_to(initial, shape), dtype=self.np_dtype)
+		for j in range(0, values.shape[-1]):
+			outputs = self.__add(outputs, values[..., j])
+		return outputs
+
+	def __layer_activation_tansig_lut(self, values):
+		# table shared with the generated lut_tanh data file, tanh_saturate() takes nn_t
+		if self.formats_layer is not None:
+			values = self.format_network.to_real(self.format_network.requantize(values, self.format.width_frac))
+		else:
+			values = self.to_real(values)
+		return self.from_real(lut_tanh_lookup(values, self.network.dtype_LUT_in, self.network.dtype_LUT_out))
+
+	def __layer_activation_pwl(self, values, coef):
+		# last segment whose start is not above the input, as the generated comparison loop selects it
+		start   = coef[..., None, 1:, 0]
+		segment = np.max(np.where(values[..., None] >= start, np.arange(1, coef.shape[-2]), 0), axis=-1)
+		slope     = np.take_along_axis(np.broadcast_to(coef[..., None, :, 1], values.shape + coef.shape[-2:-1]), segment[..., None], axis=-1)[..., 0]
+		intercept = np.take_along_axis(np.broadcast_to(coef[..., None, :, 2], values.shape + coef.shape[-2:-1]), segment[..., None], axis=-1)[..., 0]
+		return self.__add(self.__mul(values, slope), intercept)
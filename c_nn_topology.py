@@ -0,0 +1,203 @@
+import io
+import os
+import re
+import json
+import hashlib
+import numpy as np
+
+# directory topology: a layer manifest plus one .npy coefficient array per layer
+TOPOLOGY_MANIFEST = 'topology.json'
+TOPOLOGY_VERSION  = 1
+
+# weight exports: one array per file, or several per .npz, taken in natural file name order
+WEIGHT_EXTENSIONS         = ('.csv', '.txt', '.npy', '.npz')
+DEFAULT_IMPORT_ACTIVATION = "activation_tansig"
+
+
+def load_topology(fname, sizes=None):
+	# list of layers with 'type', 'inputs', 'outputs' and either 'coefficients' or 'coefficients_file'
+	if sizes is not None or is_weight_export(fname):
+		return import_weights(fname, sizes)
+
+	topology, path = _load_manifest(fname)
+	if path is None:
+		return topology
+
+	layers = []
+	for layer in topology['layers']:
+		entry = {'type': layer['type'], 'inputs': layer['inputs'], 'outputs': layer['outputs']}
+		if layer.get('coefficients_file') is not None:
+			entry['coefficients_file'] = os.path.join(path, layer['coefficients_file'])
+		else:
+			entry['coefficients'] = layer['coefficients']
+		layers.append(entry)
+	return layers
+
+
+def is_weight_export(fname):
+	# .npz file, or a directory of weight files without a topology manifest
+	if os.path.isdir(fname):
+		return not os.path.exists(os.path.join(fname, TOPOLOGY_MANIFEST))
+	return fname.endswith('.npz')
+
+
+def import_weights(fname, sizes=None, activation=DEFAULT_IMPORT_ACTIVATION):
+	# fully connected layers from weight matrices (outputs x inputs, as torch saves them) and bias vectors,
+	# sizes lists the layer widths from the input on and is inferred from the weights when omitted
+	arrays = [np.asarray(array, dtype=np.float64) for array in _load_weight_arrays(fname)]
+	if sizes is not None:
+		sizes = [int(size) for size in sizes]
+
+	layers  = []
+	inputs  = sizes[0] if sizes is not None else None
+	idx     = 0
+	while idx < len(arrays):
+		weights = arrays[idx]
+		if np.ndim(weights) != 2:
+			raise ValueError('Weight array ' + str(idx) + ' is not a matrix')
+		number = len(layers) // 3
+
+		# torch layout (outputs x inputs) is preferred, keras layout (inputs x outputs) is transposed
+		if sizes is not None:
+			if number+1 >= len(sizes):
+				raise ValueError('More weight matrices than the layer sizes describe')
+			shape = (sizes[number+1], sizes[number])
+		elif inputs is None:
+			# first matrix, its bias tells the output width
+			if idx+1 < len(arrays) and _is_vector(arrays[idx+1]) and np.size(arrays[idx+1]) == weights.shape[1] != weights.shape[0]:
+				shape = weights.shape[::-1]
+			else:
+				shape = weights.shape
+		elif weights.shape[1] == inputs:
+			shape = weights.shape
+		else:
+			shape = (weights.shape[1], inputs)
+		if weights.shape != shape:
+			if weights.shape[::-1] != shape:
+				raise ValueError('Weight array ' + str(idx) + ' does not match layer ' + str(number) + ' (' + str(shape[0]) + 'x' + str(shape[1]) + ')')
+			weights = weights.T
+		outputs, inputs = weights.shape
+		idx = idx + 1
+
+		# a vector of the output width right behind the matrix is its bias
+		if idx < len(arrays) and _is_vector(arrays[idx]) and np.size(arrays[idx]) == outputs:
+			bias = np.ravel(arrays[idx])
+			idx  = idx + 1
+		else:
+			print("WARNING: no bias for layer " + str(number) + ", using zeros")
+			bias = np.zeros(outputs)
+
+		layers.append({'type': "multiplication", 'inputs': str(inputs), 'outputs': str(outputs) + 'x' + str(inputs), 'coefficients': weights})
+		layers.append({'type': "addition", 'inputs': str(outputs) + 'x' + str(inputs), 'outputs': str(outputs), 'coefficients': bias})
+		layers.append(_import_activation(activation, outputs))
+		inputs = outputs
+
+	if len(layers) == 0:
+		raise ValueError('No weight arrays found in "' + fname + '"')
+	if sizes is not None and len(layers) // 3 != len(sizes) - 1:
+		raise ValueError('Fewer weight matrices than the layer sizes describe')
+	return layers
+
+
+def convert_topology(fname, path):
+	# JSON topology -> directory topology, array coefficients are stored as float64 .npy
+	if not os.path.exists(path):
+		os.makedirs(path)
+
+	layers = []
+	for idx, layer in enumerate(json.load(open(fname))):
+		entry = {'type': layer['type'], 'inputs': layer['inputs'], 'outputs': layer['outputs']}
+		if isinstance(layer['coefficients'], list):
+			coef = np.asarray(layer['coefficients'], dtype=np.float64)
+			entry['coefficients_file']  = "l" + str(idx) + "_coefficients.npy"
+			entry['coefficients_shape'] = list(coef.shape)
+			np.save(os.path.join(path, entry['coefficients_file']), coef)
+		else:
+			entry['coefficients'] = layer['coefficients']
+		layers.append(entry)
+
+	with open(os.path.join(path, TOPOLOGY_MANIFEST), "w") as fd:
+		json.dump({'version': TOPOLOGY_VERSION, 'layers': layers}, fd, indent=1)
+	print("converted \"" + fname + "\" to \"" + path + "\"")
+
+
+def topology_digest(fname):
+	# content hash of a topology in any format
+	digest = hashlib.sha256()
+	if is_weight_export(fname):
+		for fpath in _list_weight_files(fname):
+			digest.update(os.path.basename(fpath).encode())
+			with open(fpath, "rb") as fd:
+				digest.update(fd.read())
+		return digest
+
+	manifest, path = _load_manifest(fname)
+	if path is None:
+		with open(fname, "rb") as fd:
+			digest.update(fd.read())
+		return digest
+
+	digest.update(json.dumps(manifest, sort_keys=True).encode())
+	for layer in manifest['layers']:
+		if layer.get('coefficients_file') is not None:
+			with open(os.path.join(path, layer['coefficients_file']), "rb") as fd:
+				digest.update(fd.read())
+	return digest
+
+
+def _load_manifest(fname):
+	# (manifest, directory) for a directory topology, (layers, None) for a JSON topology
+	if os.path.isdir(fname):
+		fname = os.path.join(fname, TOPOLOGY_MANIFEST)
+	with open(fname) as fd:
+		topology = json.load(fd)
+	if not isinstance(topology, dict):
+		return topology, None
+	if topology.get('version') != TOPOLOGY_VERSION:
+		raise ValueError('Topology version is not supported')
+	return topology, os.path.dirname(fname)
+
+
+def _import_activation(activation, count):
+	entry = {'type': activation, 'inputs': str(count), 'outputs': str(count), 'coefficients': ""}
+	if activation == "activation_linear":
+		entry['coefficients'] = np.ones(count)
+	return entry
+
+
+def _is_vector(array):
+	# text exports load vectors as a single row or column
+	return np.ndim(array) == 1 or 1 in np.shape(array)
+
+
+def _list_weight_files(fname):
+	if not os.path.isdir(fname):
+		return [fname]
+
+	# natural order, so that l10 follows l9
+	def key(name):
+		return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+	names = [name for name in os.listdir(fname) if os.path.splitext(name)[1].lower() in WEIGHT_EXTENSIONS]
+	return [os.path.join(fname, name) for name in sorted(names, key=key)]
+
+
+def _load_weight_arrays(fname):
+	arrays = []
+	for fpath in _list_weight_files(fname):
+		extension = os.path.splitext(fpath)[1].lower()
+		if extension == '.npz':
+			with np.load(fpath) as archive:
+				arrays.extend(archive[name] for name in archive.files)
+		elif extension == '.npy':
+			arrays.append(np.load(fpath))
+		else:
+			arrays.append(_load_weight_text(fpath))
+	return arrays
+
+
+def _load_weight_text(fpath):
+	# np.savetxt output, also with the brackets and trailing commas of a pasted array literal
+	with open(fpath) as fd:
+		text = fd.read().translate(str.maketrans('[],', '   '))
+	return np.loadtxt(io.StringIO(text), dtype=np.float64, ndmin=2)
@@ -4,7 +4,11 @@ import sys
 import tty
 import termios
 import argparse
+import json
+import numpy as np
 from c_nn import *
+from c_nn_explore import *
+from c_nn_range import *
 
 # PATH_NN_OBJECT = '../topology_example.json'
 PATH_NN_OBJECT = '../topology_8_16_12_8_4.json'
@@ -12,9 +16,9 @@ PATH_TEST_DATA = '../topology_example_test.json'
 
 
 ############### DEFAULT MODE ###############
-def mode_default(pathOut, pathNN, pathTest, ii, dtype, interface):
+def mode_default(pathOut, pathNN, pathTest, ii, dtype, interface, device, coefFormat, dataFormat, abft, sizes, argmax, argmaxScore, argmaxRotation, fusion, folding, dataflow, layerWidths, pruneThreshold, sparse, shiftTerms, integerBits):
     # load neural network object
-    obj = nn(pathNN)
+    obj = nn(pathNN, sizes)
     
     # parse configuration
     obj.parse_configuration()
@@ -28,8 +32,50 @@ def mode_default(pathOut, pathNN, pathTest, ii, dtype, interface):
     # update configuration
     obj.set_dtype(dtype)
 
+    # per-layer fixed point widths, "default" keeps nn_t
+    if layerWidths != None:
+        for idx in range(0, len(layerWidths)):
+            if layerWidths[idx] != None:
+                obj.set_layer_dtype_fixed(idx, layerWidths[idx][0], layerWidths[idx][1])
+
     # select interface
     obj.set_interface(interface)
+
+    # checksum every multiplication/addition pair and flag mismatches on abft_error
+    obj.set_abft(abft)
+
+    # accumulate products directly instead of materializing them
+    obj.set_fusion(fusion)
+
+    # fold multiplication/addition pairs to meet the initiation interval with fewer multipliers
+    obj.set_folding(folding)
+
+    # zero negligible weights and multiply only the remaining ones
+    if pruneThreshold != None:
+        print("pruned " + str(obj.prune(pruneThreshold)) + " coefficients")
+    obj.set_sparse(sparse)
+
+    # multiply by shifts and adds of power of two coefficients instead of multipliers
+    obj.set_shift_add(shiftTerms)
+
+    # integer multiply-accumulate with per-channel weight scales, input ranges calibrated on the test vectors
+    if integerBits != None:
+        inputsWhole = None
+        if pathTest != None:
+            profiler    = range_profiler(obj).profile(np.asarray(json.load(open(pathTest))["inputs"], dtype=np.float64))
+            inputsWhole = dict((idx, profiler.get_input_statistics(idx).width_whole()) for idx in range(0, obj.current_layer))
+        obj.set_integer(integerBits, inputsWhole)
+
+    # run the layers as concurrent processes on batches of samples
+    obj.set_dataflow(dataflow)
+
+    # reduce the outputs to class and rotation index on chip
+    if argmax != None:
+        obj.set_output_argmax(argmax, argmaxScore, argmaxRotation)
+
+    # select text format of the generated data files
+    obj.set_coef_format(coefFormat)
+    obj.set_data_format(dataFormat)
     
     # set test data object
     obj.set_test_file(pathTest)
@@ -41,10 +87,105 @@ def mode_default(pathOut, pathNN, pathTest, ii, dtype, interface):
     # show final configuration
     obj.show_configuration()
 
+    # show estimated device utilization
+    if device != None:
+        obj.show_resources(device)
+
     # generate sources for the output nn
     obj.generate_implementation()
 
 
+############### SWEEP MODE ###############
+def mode_sweepParseWidths(arg):
+    # comma separated list of "float", "double" or "width:width_whole"
+    widths = []
+    for item in arg.split(','):
+        if item == "float" or item == "double" or item == "default":
+            widths.append(None if item == "default" else item)
+        else:
+            widths.append([int(i) for i in item.split(':')])
+    return widths
+
+def mode_sweep(pathNN, pathTest, ii, dtype, lutInput, lutOutput, interface, cache, device):
+    inputs = None
+    labels = None
+    if pathTest != None:
+        test   = json.load(open(pathTest))
+        inputs = np.asarray(test["inputs"], dtype=np.float64)
+        labels = np.argmax(np.asarray(test["targets"], dtype=np.float64), axis=-1)
+
+    obj = explorer(pathNN, inputs, labels, cache, device=device)
+    results = obj.sweep(
+        [int(i) for i in ii.split(',')],
+        mode_sweepParseWidths(dtype),
+        mode_sweepParseWidths(lutInput),
+        mode_sweepParseWidths(lutOutput),
+        interface.split(','))
+
+    show_pareto_front(pareto_front(results))
+
+
+############### WIDTHS MODE ###############
+def mode_widths(pathNN, pathTest, ii, dtype, maxLoss):
+    # narrowest per-layer widths within the accuracy loss, printed as a --layer-widths argument
+    test   = json.load(open(pathTest))
+    inputs = np.asarray(test["inputs"], dtype=np.float64)
+    labels = np.argmax(np.asarray(test["targets"], dtype=np.float64), axis=-1)
+
+    obj = explorer(pathNN, inputs, labels)
+    result = obj.search_widths(int(ii), mode_sweepParseWidths(dtype)[0], float(maxLoss))
+    show_widths(result)
+
+    widths = [parse_fixed_format(dtype) for dtype in result['types']]
+    print("--layer-widths " + ",".join(str(width.width) + ":" + str(width.width_whole) for width in widths))
+
+
+############### RANGE MODE ###############
+def mode_range(pathNN, pathTest, dtype, percentile):
+    # integer bits every tensor needs on the calibration set, checked against the fixed point --dtype width:width_whole
+    test   = json.load(open(pathTest))
+    inputs = np.asarray(test["inputs"], dtype=np.float64)
+
+    obj = nn(pathNN)
+    obj.parse_configuration()
+    width = mode_sweepParseWidths(dtype)[0]
+    if isinstance(width, list):
+        obj.set_dtype_fixed(width[0], width[1])
+
+    report = range_profiler(obj).profile(inputs).report(float(percentile))
+    show_range_report(report)
+
+    widths = [parse_fixed_format(dtype) for dtype in report['types']]
+    print("--layer-widths " + ",".join(str(width.width) + ":" + str(width.width_whole) for width in widths))
+    if report['lut_input'] is not None:
+        width = parse_fixed_format(report['lut_input'])
+        print("--sweep-lut-input " + str(width.width) + ":" + str(width.width_whole))
+
+
+############### LUT MODE ###############
+def mode_lutParseTypes(arg, default):
+    # ap_fixed types of the "width:width_whole" list, "default" picks the generator's default
+    dtypes = []
+    for width in mode_sweepParseWidths(arg):
+        if width == None:
+            dtypes.append(default)
+        else:
+            dtypes.append(fixed_format(width[0], width[1]).type_string())
+    return dtypes
+
+def mode_lut(lutInput, lutOutput):
+    # footprint and tanh error of every LUT width combination
+    show_lut_tanh_report(
+        mode_lutParseTypes(lutInput, fixed_format(DEFAULT_WIDTH_LUT_INPUT, DEFAULT_WIDTH_LUT_INPUT_WHOLE).type_string()),
+        mode_lutParseTypes(lutOutput, fixed_format(DEFAULT_WIDTH_LUT_OUTPUT, DEFAULT_WIDTH_LUT_OUTPUT_WHOLE).type_string()))
+
+
+############### CONVERT MODE ###############
+def mode_convert(pathOut, pathNN):
+    # JSON topology to a directory topology with lazily mapped coefficients
+    convert_topology(pathNN, pathOut)
+
+
 ############### INTERACTIVE MODE ###############
 MODE_TOP       = 0
 MODE_TOPOLOGY  = 1
@@ -131,9 +272,9 @@ def mode_interactiveGenerate(obj):
     quit()
 
 
-def mode_interactive(pathOut, pathNN, pathTest, ii, dtype, interface):
+def mode_interactive(pathOut, pathNN, pathTest, ii, dtype, interface, sizes):
     # create nn object and parse initial configuration
-    obj = nn(pathNN)
+    obj = nn(pathNN, sizes)
     obj.parse_configuration()
 
     # set default configuration
@@ -183,7 +324,12 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
   '--topology', dest='topology',
   default="topology.json",
-  help='path to the JSON description of the topology')
+  help='path to the JSON description of the topology, or to a converted topology directory')
+
+parser.add_argument(
+  '--sizes', dest='sizes',
+  default=None,
+  help='comma separated layer widths, imports --topology as weight/bias exports (.csv, .npy, .npz)')
 
 parser.add_argument(
   '--dtype', dest='dtype',
@@ -204,7 +350,7 @@ parser.add_argument(
 parser.add_argument(
   '--mode', dest='mode',
   default="default",
-  choices=["default","interactive"],
+  choices=["default","interactive","sweep","convert","lut","widths","range"],
   help='mode in which to explore neural network topology')
 
 parser.add_argument(
@@ -217,6 +363,123 @@ parser.add_argument(
   default=None,
   help='path to the JSON file with test vectors')
 
+parser.add_argument(
+  '--device', dest='device',
+  default=None,
+  choices=sorted(DEVICES.keys()),
+  help='target device, reports estimated utilization and warns when a configuration exceeds it, sweeps skip such points')
+
+parser.add_argument(
+  '--coef-format', dest='coef_format',
+  default=DEFAULT_COEF_FORMAT,
+  choices=COEF_FORMATS,
+  help='literal format of the generated coefficient and test data files')
+
+parser.add_argument(
+  '--data-format', dest='data_format',
+  default=DEFAULT_DATA_FORMAT,
+  choices=DATA_FORMATS,
+  help='text literals only, or additionally binary blobs loaded by csim at run time')
+
+parser.add_argument(
+  '--abft', dest='abft',
+  default=DEFAULT_ABFT,
+  choices=ABFT_MODES,
+  help='checksum multiplication/addition pairs per output sum (column) or per partial product column (row)')
+
+parser.add_argument(
+  '--fuse', dest='fuse',
+  action='store_true',
+  help='fuse multiplication/addition pairs into multiply-accumulate resources')
+
+parser.add_argument(
+  '--fold', dest='fold',
+  action='store_true',
+  help='fold multiplication/addition pairs into SIMD x PE matrix-vector engines sized for the initiation interval')
+
+parser.add_argument(
+  '--prune', dest='prune',
+  type=float,
+  default=None,
+  help='zero multiplication coefficients whose magnitude is at most PRUNE')
+
+parser.add_argument(
+  '--sparse', dest='sparse',
+  action='store_true',
+  help='store multiplication coefficients as compressed rows of their nonzeros and multiply only those')
+
+parser.add_argument(
+  '--shift-add', dest='shift_add',
+  type=int,
+  default=None,
+  choices=SHIFT_TERMS,
+  help='round multiplication coefficients to sums of SHIFT_ADD powers of two, multiplied by shifts and adds, requires --dtype fixed')
+
+parser.add_argument(
+  '--integer', dest='integer',
+  type=int,
+  default=None,
+  choices=INTEGER_BITS,
+  help='multiply INTEGER bit weights with per-channel scales and integer inputs, accumulate in 32 bits and requantize, requires --dtype fixed')
+
+parser.add_argument(
+  '--dataflow', dest='dataflow',
+  type=int,
+  default=None,
+  help='generate the layers as dataflow processes connected by streams, batches of DATAFLOW samples per call')
+
+parser.add_argument(
+  '--argmax', dest='argmax',
+  default=None,
+  type=int,
+  help='argmax output stage over outputs laid out as class*ROTATIONS+rotation, returns class and rotation index')
+
+parser.add_argument(
+  '--argmax-score', dest='argmax_score',
+  action='store_true',
+  help='argmax output stage additionally returns the winning score')
+
+parser.add_argument(
+  '--argmax-rotation', dest='argmax_rotation',
+  default=None,
+  type=int,
+  help='argmax output stage additionally flags whether the winning rotation is this one')
+
+parser.add_argument(
+  '--layer-widths', dest='layer_widths',
+  default=None,
+  help='comma separated per-layer fixed point widths as width:width_whole or default, requires --dtype fixed')
+
+parser.add_argument(
+  '--width-loss', dest='width_loss',
+  default="0.01",
+  help='widths mode: accuracy loss on --test allowed against the uniform --dtype width:width_whole')
+
+parser.add_argument(
+  '--range-percentile', dest='range_percentile',
+  default=str(DEFAULT_RANGE_PERCENTILE),
+  help='range mode: percent of the --test samples every tensor must hold, below 100 relies on saturation')
+
+parser.add_argument(
+  '--sweep-lut-input', dest='sweep_lut_input',
+  default="default",
+  help='sweep and lut modes: comma separated LUT input widths as width:width_whole')
+
+parser.add_argument(
+  '--sweep-lut-output', dest='sweep_lut_output',
+  default="default",
+  help='sweep and lut modes: comma separated LUT output widths as width:width_whole')
+
+parser.add_argument(
+  '--sweep-interface', dest='sweep_interface',
+  default=None,
+  help='sweep mode: comma separated interfaces, defaults to --interface')
+
+parser.add_argument(
+  '--sweep-cache', dest='sweep_cache',
+  default=DEFAULT_EXPLORE_CACHE,
+  help='sweep mode: directory of the persistent result cache')
+
 ############### ACQUIRE ARGUMENTS ###############
 args = parser.parse_args()
 arg_topology  = args.topology
@@ -226,6 +489,10 @@ arg_output    = args.output
 arg_mode      = args.mode
 arg_ii        = args.ii
 arg_test      = args.test
+arg_device    = args.device
+arg_sizes     = None
+if args.sizes != None:
+    arg_sizes = [int(i) for i in args.sizes.split(',')]
 
 print("Running script with the following arguments")
 print("- topology  = " + args.topology)
@@ -234,14 +501,48 @@ print("- interface = " + args.interface)
 print("- output    = " + args.output)
 print("- mode      = " + args.mode)
 
-if arg_mode == "interactive":
+if arg_mode == "sweep":
+    # --ii, --dtype and --interface take comma separated lists in sweep mode
+    mode_sweep(
+        arg_topology,          # path nn input topology
+        arg_test,              # path nn test vector, used for simulated accuracy
+        arg_ii,                # initiation intervals
+        arg_dtype,             # network's base data types
+        args.sweep_lut_input,  # LUT input widths
+        args.sweep_lut_output, # LUT output widths
+        args.sweep_interface or arg_interface, # network's interfaces
+        args.sweep_cache,      # result cache directory
+        arg_device)            # device budget
+elif arg_mode == "widths":
+    mode_widths(
+        arg_topology,    # path nn input topology
+        arg_test,        # path nn test vector, the calibration set
+        arg_ii,          # initiation interval
+        arg_dtype,       # uniform width:width_whole the search starts from
+        args.width_loss) # accuracy loss allowed
+elif arg_mode == "range":
+    mode_range(
+        arg_topology,    # path nn input topology
+        arg_test,        # path nn test vector, the calibration set
+        arg_dtype,       # width:width_whole the proposals and overflow checks use
+        args.range_percentile) # percent of the samples covered
+elif arg_mode == "lut":
+    mode_lut(
+        args.sweep_lut_input,  # LUT input widths
+        args.sweep_lut_output) # LUT output widths
+elif arg_mode == "convert":
+    mode_convert(
+        arg_output,      # path of the converted topology directory
+        arg_topology)    # path nn input topology
+elif arg_mode == "interactive":
     mode_interactive(
         arg_output,      # path output (generated)
         arg_topology,    # path nn input topology
         arg_test,        # path nn test vector
         arg_ii,          # initiation interval
         arg_dtype,       # network's base data type
-        arg_interface)   # network's interface
+        arg_interface,   # network's interface
+        arg_sizes)       # layer widths of imported weights
 else:
     mode_default(
         arg_output,      # path output (generated)
@@ -249,4 +550,20 @@ else:
         arg_test,        # path nn test vector
         arg_ii,          # initiation interval
         arg_dtype,       # network's base data type
-        arg_interface)   # network's interface
+        arg_interface,   # network's interface
+        arg_device,      # target device
+        args.coef_format, # data file literal format
+        args.data_format, # data file container format
+        args.abft,        # algorithm-based fault tolerance checks
+        arg_sizes,        # layer widths of imported weights
+        args.argmax,      # rotation count of the argmax output stage
+        args.argmax_score,    # argmax stage returns the score
+        args.argmax_rotation, # argmax stage flags this rotation
+        args.fuse,            # multiply-accumulate fusion
+        args.fold,            # folded matrix-vector engines
+        args.dataflow,        # dataflow batch size
+        mode_sweepParseWidths(args.layer_widths) if args.layer_widths != None else None, # per-layer widths
+        args.prune,           # pruning threshold
+        args.sparse,          # sparse multiplications
+        args.shift_add,       # power of two terms per coefficient
+        args.integer)         # integer weight and input width